@@ -0,0 +1,268 @@
+"""Local stand-ins for the NIP and ISW report portals.
+
+They reproduce just enough of each portal for the bots to run end to end:
+NIP's main.jspx login, daterangepicker, `window.transactionReportTable` and
+fa-download buttons; ISW's passport login, header/menu/body frameset,
+select#reportTypeId, reportDownload.do links and "Next" pagination.
+
+Run standalone with:  python -m benchmarks.mock_portals --port 8800
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
+from urllib.parse import urlencode
+import argparse
+import asyncio
+import io
+import zipfile
+
+SESSION_COOKIE = "mock_session"
+
+
+@dataclass
+class MockConfig:
+    latency_ms: int = 50           #< added to every request
+    nip_pages: int = 3
+    nip_rows_per_page: int = 10
+    isw_pages: int = 2
+    isw_rows_per_page: int = 10
+    file_kb: int = 256             #< size of each downloaded file
+    isw_empty_types: set = field(default_factory=set)  #< report codes that return no rows
+    legacy_tables: bool = False    #< no DataTables API on NIP, no page-size parameter on ISW
+
+
+def _payload(size_kb: int) -> bytes:
+    # a real ZIP holding one CSV, stored uncompressed so the download is ~size_kb
+    rows = io.StringIO()
+    rows.write("Transaction Date,Amount,Reference\n")
+    day = date(2025, 8, 1)
+    n = 0
+    while rows.tell() < size_kb * 1024:
+        rows.write(f"{(day + timedelta(days=n % 5)).strftime('%d/%m/%Y')},{n * 10.5:.2f},REF{n:010d}\n")
+        n += 1
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as zf:
+        zf.writestr("transactions.csv", rows.getvalue())
+    return buffer.getvalue()
+
+
+def _file_response(payload: bytes, filename: str) -> Response:
+    return Response(payload, media_type="application/zip",
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+NIP_LOGIN = """<!doctype html><html><body>
+<h3>Sign in</h3>
+<input id="email" type="email"><input id="password" type="password">
+<button onclick="fetch('login', {method: 'POST'}).then(() => location.reload())">Login</button>
+</body></html>"""
+
+NIP_DASHBOARD = """<!doctype html><html><body>
+<nav>
+  <a href="#" onclick="document.getElementById('sub').style.display='block'; return false;">Report</a>
+  <div id="sub" style="display:none"><a href="transactions">Transaction Report</a></div>
+</nav>
+</body></html>"""
+
+NIP_TRANSACTIONS = """<!doctype html><html><body>
+<h3>Transaction Report :: List</h3>
+<input id="settlementDateFilter" onclick="document.getElementById('picker').style.display='block'">
+<div id="picker" style="display:none">
+  <input name="daterangepicker_start"><input name="daterangepicker_end">
+  <button onclick="transactionReportTable.apply()">Apply</button>
+</div>
+<table><thead><tr><th>File</th><th>Date</th><th></th></tr></thead><tbody></tbody></table>
+<ul class="pagination"></ul>
+<script>
+// server-side table with the bits of the DataTables API the bots use (page.len, page.info, rows, draw)
+const table = window.transactionReportTable = {
+  current: 0, length: __PAGE_LENGTH__, from: '', to: '', total: 0,
+  page: {
+    len(n) { table.length = n; table.current = 0; return table; },
+    info() {
+      const pages = table.length < 0 ? 1 : Math.ceil(table.total / table.length);
+      return { page: table.current, pages, length: table.length, recordsTotal: table.total, recordsDisplay: table.total, serverSide: true };
+    },
+  },
+  rows() { return { count: () => document.querySelectorAll('tbody tr').length }; },
+  draw() { return this.load(); },
+  apply() {
+    this.from = document.querySelector("input[name='daterangepicker_start']").value;
+    this.to = document.querySelector("input[name='daterangepicker_end']").value;
+    document.getElementById('picker').style.display = 'none';
+    return this.reload();
+  },
+  reload() { this.current = 0; return this.load(); },
+  async load() {
+    const start = this.length < 0 ? 0 : this.current * this.length;
+    const q = new URLSearchParams({from: this.from, to: this.to, start, length: this.length});
+    const data = await (await fetch('api/transactions?' + q)).json();
+    this.total = data.recordsTotal;
+    document.querySelector('tbody').innerHTML = data.rows.map(r =>
+      `<tr><td>${r.filename}</td><td>${r.date}</td><td><a href="${r.url}"><i class="fa fa-download"></i></a></td></tr>`).join('');
+    const last = this.current + 1 >= this.page.info().pages;
+    document.querySelector('ul.pagination').innerHTML =
+      `<li class="paginate_button next${last ? ' disabled' : ''}"><a href="#">Next</a></li>`;
+    document.querySelector('li.next a').onclick = (e) => {
+      e.preventDefault();
+      if (!last) { this.current += 1; this.load(); }
+    };
+  }
+};
+__LEGACY__
+table.load();
+</script>
+</body></html>"""
+
+ISW_LANDING = """<!doctype html><html><body><a class="passport-button" href="passport">Login with Passport</a></body></html>"""
+
+ISW_PASSPORT = """<!doctype html><html><body>
+<form method="post" action="passport">
+  <input id="username" name="username"><input id="password" name="password" type="password">
+  <button class="btn-dark-blue" type="submit">Sign in</button>
+</form></body></html>"""
+
+ISW_FRAMESET = """<!doctype html><html>
+<frameset rows="60,*"><frame name="header" src="header">
+  <frameset cols="200,*"><frame name="menu" src="menu"><frame name="body" src="blank"></frameset>
+</frameset></html>"""
+
+ISW_MENU = """<!doctype html><html><body>
+<table><tr><td class="menuLink" onclick="document.getElementById('sub').style.display='block'">Reports</td></tr></table>
+<div id="sub" style="display:none"><a class="innerLink" href="reports" target="body">Reports Root</a></div>
+</body></html>"""
+
+
+def create_app(config: MockConfig) -> FastAPI:
+    app = FastAPI(title="Mock report portals")
+    payload = _payload(config.file_kb)
+
+    @app.middleware("http")
+    async def latency(request: Request, call_next):
+        if config.latency_ms:
+            await asyncio.sleep(config.latency_ms / 1000)
+        return await call_next(request)
+
+    def logged_in(request: Request) -> bool:
+        return request.cookies.get(SESSION_COOKIE) == "ok"
+
+    def with_session(response: Response) -> Response:
+        response.set_cookie(SESSION_COOKIE, "ok", path="/")
+        return response
+
+    # NIP
+    @app.get("/nip/main.jspx", response_class=HTMLResponse)
+    async def nip_main(request: Request):
+        return NIP_DASHBOARD if logged_in(request) else NIP_LOGIN
+
+    @app.post("/nip/login")
+    async def nip_login():
+        return with_session(JSONResponse({"ok": True}))
+
+    @app.get("/nip/transactions", response_class=HTMLResponse)
+    async def nip_transactions(request: Request):
+        if not logged_in(request):
+            return RedirectResponse("main.jspx")
+        legacy = "delete table.page.len;" if config.legacy_tables else ""
+        return NIP_TRANSACTIONS.replace("__PAGE_LENGTH__", str(config.nip_rows_per_page)).replace("__LEGACY__", legacy)
+
+    @app.get("/nip/api/transactions")
+    async def nip_rows(start: int = 0, length: int = 10):
+        total = config.nip_pages * config.nip_rows_per_page
+        stop = total if length < 0 else min(total, start + length)
+        rows = []
+        for n in range(start, stop):
+            stamp = datetime(2025, 8, 1) + timedelta(hours=n)
+            filename = f"WAYA MFB_{stamp:%Y%m%d_%H%M%S}.zip"
+            rows.append({"filename": filename, "date": f"{stamp:%d/%m/%Y}", "url": f"download/{n}"})
+        return {"recordsTotal": total, "rows": rows}
+
+    @app.get("/nip/download/{item}")
+    async def nip_download(item: int):
+        stamp = datetime(2025, 8, 1) + timedelta(hours=item)
+        return _file_response(payload, f"WAYA MFB_{stamp:%Y%m%d_%H%M%S}.zip")
+
+    # ISW
+    @app.get("/isw/", response_class=HTMLResponse)
+    async def isw_root(request: Request):
+        return ISW_FRAMESET if logged_in(request) else ISW_LANDING
+
+    @app.get("/isw/passport", response_class=HTMLResponse)
+    async def isw_passport_form():
+        return ISW_PASSPORT
+
+    @app.post("/isw/passport")
+    async def isw_passport():  #< any credentials are accepted
+        return with_session(RedirectResponse("./", status_code=303))
+
+    @app.get("/isw/header", response_class=HTMLResponse)
+    async def isw_header():
+        return "<html><body>Mock ISW</body></html>"
+
+    @app.get("/isw/menu", response_class=HTMLResponse)
+    async def isw_menu():
+        return ISW_MENU
+
+    @app.get("/isw/blank", response_class=HTMLResponse)
+    async def isw_blank():
+        return "<html><body></body></html>"
+
+    def isw_form(date_start: str = "", date_end: str = "", report_type: str = "") -> str:
+        options = "".join(f'<option value="{c}"{" selected" if str(c) == report_type else ""}>{c}</option>' for c in range(32))
+        return (f'<form action="reports/search" method="get">'
+                f'<input name="dateStart" value="{date_start}"><input name="dateEnd" value="{date_end}">'
+                f'<select id="reportTypeId" name="reportTypeId">{options}</select>'
+                f'<input type="submit" id="search" value="Search"></form>')
+
+    @app.get("/isw/reports", response_class=HTMLResponse)
+    async def isw_reports():
+        return f"<html><body>{isw_form()}</body></html>"
+
+    @app.get("/isw/reports/search", response_class=HTMLResponse)
+    async def isw_search(dateStart: str = "", dateEnd: str = "", reportTypeId: str = "0", page: int = 1, pageSize: int = 0):
+        form = isw_form(dateStart, dateEnd, reportTypeId).replace('action="reports/search"', 'action="search"')
+        if reportTypeId in config.isw_empty_types:
+            return f"<html><body>{form}<p>No records found</p></body></html>"
+
+        total = config.isw_pages * config.isw_rows_per_page
+        size = config.isw_rows_per_page if config.legacy_tables or pageSize <= 0 else pageSize
+        first = (page - 1) * size
+        rows = "".join(
+            f'<tr><td>{reportTypeId}_{n}.zip</td><td><a href="../reportDownload.do?id={n}&type={reportTypeId}">Download</a></td></tr>'
+            for n in range(first, min(total, first + size))
+        )
+        next_link = ""
+        if first + size < total:
+            query = {"dateStart": dateStart, "dateEnd": dateEnd, "reportTypeId": reportTypeId, "page": page + 1}
+            if not config.legacy_tables:
+                query["pageSize"] = size
+            next_link = f'<a href="search?{urlencode(query)}">Next</a>'
+        return f"<html><body>{form}<table><tbody>{rows}</tbody></table>{next_link}</body></html>"
+
+    @app.get("/isw/reportDownload.do")
+    async def isw_download(id: int, type: str = "0"):
+        return _file_response(payload, f"ISW_{type}_{id:05d}.zip")
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency-ms", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--file-kb", type=int, default=256)
+    parser.add_argument("--legacy-tables", action="store_true", help="only Next-link pagination, no page-size controls")
+    args = parser.parse_args()
+
+    import uvicorn
+    config = MockConfig(latency_ms=args.latency_ms, nip_pages=args.pages, nip_rows_per_page=args.rows,
+                        isw_pages=args.pages, isw_rows_per_page=args.rows, file_kb=args.file_kb,
+                        legacy_tables=args.legacy_tables)
+    uvicorn.run(create_app(config), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""End-to-end benchmark of nip_run / isw_run against the local mock portals.
+
+Starts benchmarks.mock_portals on a free port, points the bots at it, and reports
+wall time, files per second and peak RSS (Python process plus browser children)
+for each run. Nothing touches the live portals or ~/Downloads.
+
+    python -m benchmarks.run_benchmark --portal both --runs 3 --headless
+    python -m benchmarks.run_benchmark --json results.json
+    python -m benchmarks.run_benchmark --baseline results.json --max-regression 0.2
+"""
+from datetime import date, timedelta
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))  #< allow `python benchmarks/run_benchmark.py`
+
+from benchmarks.mock_portals import MockConfig, create_app  # noqa: E402
+from src.utils.memory import tree_rss_bytes  # noqa: E402
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class MockServer:
+    """uvicorn serving the mock portals on a background thread."""
+
+    def __init__(self, config: MockConfig, port: int):
+        import uvicorn
+        self.port = port
+        self._server = uvicorn.Server(uvicorn.Config(create_app(config), host="127.0.0.1", port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "MockServer":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+class PeakRss:
+    """Samples process-tree RSS on a thread; falls back to getrusage where /proc is unavailable."""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, tree_rss_bytes(os.getpid()))
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "PeakRss":
+        if os.path.isdir("/proc"):
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._thread.is_alive():
+            self._stop.set()
+            self._thread.join()
+        else:
+            scale = 1 if sys.platform == "darwin" else 1024  #< ru_maxrss is bytes on macOS, KiB on Linux
+            self.peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * scale
+
+
+def _prepare_env(base_url: str, workdir: Path) -> None:
+    # the bots read these at import time, so set them before importing src.*
+    os.environ.update({
+        "NIP_USER": "bench", "NIP_PW": "bench", "NIP_PORTAL_URL": f"{base_url}/nip",
+        "ISW_USER": "bench", "ISW_PW": "bench", "ISW_PORTAL_URL": f"{base_url}/isw/",
+        "MANIFEST_PATH": str(workdir / "manifest.sqlite3"),
+        "SESSION_CACHE_DIR": str(workdir / "sessions"),
+        "PARQUET_DIR": str(workdir / "parquet"),
+        "LOG_FILE": str(workdir / "bench.log"),
+    })
+
+
+def _reset_state(workdir: Path) -> None:
+    # every run starts cold: no downloads, no manifest entries, no cached session
+    for name in ("downloads", "sessions", "parquet"):
+        shutil.rmtree(workdir / name, ignore_errors=True)
+    (workdir / "downloads").mkdir(parents=True)
+    (workdir / "manifest.sqlite3").unlink(missing_ok=True)
+
+
+async def _run_once(portal: str, args, workdir: Path) -> dict:
+    from src import ISW_bot, NIP_bot
+    from src.enums import DownloadMode
+    from src.utils.logger import configure_logging
+    from src.utils import manifest as manifest_module
+    from src.utils import session_cache as session_module
+    from src.utils.manifest import Manifest
+    from src.utils.session_cache import SessionCache
+
+    configure_logging()  #< the API does this in its lifespan; here the bots are driven directly
+    _reset_state(workdir)
+    NIP_bot.DOWNLOAD_DIR = ISW_bot.DOWNLOAD_DIR = workdir / "downloads"
+    fresh_manifest = Manifest(workdir / "manifest.sqlite3")
+    fresh_sessions = SessionCache(workdir / "sessions")
+    for module in (NIP_bot, ISW_bot, manifest_module):
+        if hasattr(module, "manifest"):
+            module.manifest = fresh_manifest
+    for module in (NIP_bot, ISW_bot, session_module):
+        if hasattr(module, "session_cache"):
+            module.session_cache = fresh_sessions
+
+    mode = DownloadMode(args.mode)
+    end = date.today() - timedelta(days=1)
+    start = end - timedelta(days=args.days - 1)
+
+    with PeakRss() as rss:
+        started = time.perf_counter()
+        if portal == "nip":
+            result = await NIP_bot.nip_run(start, end, headless=args.headless, download_mode=mode)
+        else:
+            result = await ISW_bot.isw_run(start, end, headless=args.headless, download_mode=mode,
+                                           report_codes=args.isw_types, parallel_pages=args.parallel_pages)
+        wall = time.perf_counter() - started
+
+    files = result.get("files_downloaded", result.get("total_saved", 0))
+    return {
+        "portal": portal,
+        "status": result.get("status", "failed"),
+        "wall_s": round(wall, 3),
+        "files": files,
+        "files_per_s": round(files / wall, 3) if wall else 0.0,
+        "peak_rss_mb": round(rss.peak / 2**20, 1),
+        "steps": (result.get("timings") or {}).get("steps", {}),
+    }
+
+
+def _summarise(runs: list[dict]) -> dict:
+    summary = {}
+    for portal in sorted({r["portal"] for r in runs}):
+        mine = [r for r in runs if r["portal"] == portal]
+        summary[portal] = {
+            "runs": len(mine),
+            "failed_runs": sum(r["status"] == "failed" for r in mine),
+            "wall_s_median": round(statistics.median(r["wall_s"] for r in mine), 3),
+            "files_per_s_median": round(statistics.median(r["files_per_s"] for r in mine), 3),
+            "peak_rss_mb_max": max(r["peak_rss_mb"] for r in mine),
+        }
+    return summary
+
+
+def _regressions(summary: dict, baseline: dict, tolerance: float) -> list[str]:
+    problems = []
+    for portal, now in summary.items():
+        before = baseline.get(portal)
+        if not before:
+            continue
+        if now["wall_s_median"] > before["wall_s_median"] * (1 + tolerance):
+            problems.append(f"{portal}: wall time {before['wall_s_median']}s -> {now['wall_s_median']}s")
+        if now["files_per_s_median"] < before["files_per_s_median"] * (1 - tolerance):
+            problems.append(f"{portal}: files/s {before['files_per_s_median']} -> {now['files_per_s_median']}")
+        if now["peak_rss_mb_max"] > before["peak_rss_mb_max"] * (1 + tolerance):
+            problems.append(f"{portal}: peak RSS {before['peak_rss_mb_max']}MB -> {now['peak_rss_mb_max']}MB")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--portal", choices=["nip", "isw", "both"], default="both")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--mode", choices=["click", "http"], default="click")
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--days", type=int, default=7, help="date range length (ISW must stay within 90 days)")
+    parser.add_argument("--isw-types", nargs="+", default=["24"], help="ISW report codes to search")
+    parser.add_argument("--parallel-pages", type=int, default=1)
+    parser.add_argument("--latency-ms", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--file-kb", type=int, default=256)
+    parser.add_argument("--legacy-tables", action="store_true", help="mock tables without page-size controls (click-through pagination)")
+    parser.add_argument("--json", type=Path, help="write the summary and per-run results here")
+    parser.add_argument("--baseline", type=Path, help="summary JSON from an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed slowdown before failing (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    config = MockConfig(latency_ms=args.latency_ms, nip_pages=args.pages, nip_rows_per_page=args.rows,
+                        isw_pages=args.pages, isw_rows_per_page=args.rows, file_kb=args.file_kb,
+                        legacy_tables=args.legacy_tables)
+    portals = ["nip", "isw"] if args.portal == "both" else [args.portal]
+
+    workdir = Path(tempfile.mkdtemp(prefix="bot-bench-"))
+    runs = []
+    try:
+        with MockServer(config, _free_port()) as server:
+            _prepare_env(server.url, workdir)
+            for portal in portals:
+                for i in range(args.runs):
+                    run = asyncio.run(_run_once(portal, args, workdir))
+                    runs.append(run)
+                    print(f"{portal} run {i + 1}/{args.runs}: {run['status']:<8} {run['wall_s']:>8.2f}s "
+                          f"{run['files']:>4} files {run['files_per_s']:>7.2f} files/s {run['peak_rss_mb']:>8.1f} MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = _summarise(runs)
+    print(json.dumps(summary, indent=2))
+    if args.json:
+        args.json.write_text(json.dumps({"config": {**vars(config), "isw_empty_types": sorted(config.isw_empty_types)}, "summary": summary, "runs": runs},
+                                        indent=2))
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text()).get("summary", {})
+        problems = _regressions(summary, baseline, args.max_regression)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,76 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, Query, HTTPException
-from datetime import datetime
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Query, HTTPException, Request
+from cachetools import TTLCache
+from datetime import date, datetime, timedelta, timezone
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from src.NIP_bot import nip_run
-from src.ISW_bot import isw_run
-from src.enums import ReportType
-from src.ISW_bot import DOWNLOAD_DIR as isw_download_dir
-from src.NIP_bot import DOWNLOAD_DIR as nip_download_dir
-import traceback
+from src.enums import ReportType, DownloadMode, JobStatus, ShardUnit
+from src.utils.browser_pool import BROWSER_PREWARM, POOL_HEADLESS, BrowserPool, set_pool
+from src.utils.checkpoints import CheckpointScope, checkpoints
+from src.utils.coalesce import RESULT_CACHE_TTL, coalescer, request_key
+from src.utils.credentials import credential_pools
+from src.utils.jobs import JobQueue, QueueFullError, current_job
+from src.utils.logger import configure_logging
+from src.utils.manifest import manifest
+from src.utils.metrics import registry as metrics_registry
+from src.utils.plugins import PortalUnavailable, bots
+from src.utils.scheduler import SCHEDULER_ENABLED, Scheduler, load_schedules
+from src.utils.sharding import SHARD_PARALLELISM, run_shards, split_range
+from src.utils.storage import storage_location
+from typing import List, Optional
+from contextlib import asynccontextmanager
+import json
+import logging
 import os
 
-print(f"USER: {os.getenv('NIP_USER')},PASSWORD: {os.getenv('NIP_PW')}")
-print(f"ISW_USER:{os.getenv('ISW_USER')}, ISW_PW: {os.getenv('ISW_PW')}")
+# Report listings are kept briefly so callers can check what is available without a scrape each time
+LISTING_CACHE_TTL = int(os.getenv("LISTING_CACHE_TTL_SECONDS", "300"))
+listing_cache = TTLCache(maxsize=int(os.getenv("LISTING_CACHE_SIZE", "128")), ttl=LISTING_CACHE_TTL)
+
+# Job results carry only the last few messages; the full log streams from GET /jobs/{id}/events (env override)
+RESULT_MESSAGES = int(os.getenv("RESULT_MESSAGES", "20"))
+
+# App lifespan: load the enabled bots, keep a pool of warm Chromium instances and the job workers that drive them
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    bots.init()  #< each enabled portal's bot, once; a portal that is not configured is reported by /ready, not fatal
+    checkpoints.interrupt_running()  #< jobs cut off by the previous process become resumable
+    pool = BrowserPool()
+    if BROWSER_PREWARM:
+        pool.warm()  #< Chromium launches in the background; startup does not wait for it
+    set_pool(pool)
+    app.state.browser_pool = pool
+    app.state.jobs = JobQueue()
+    await app.state.jobs.start()
+    schedules = load_schedules() if SCHEDULER_ENABLED else []
+    for schedule in [s for s in schedules if not bots.ready(s.portal)]:
+        logging.warning(f"Schedule {schedule.name} skipped – {schedule.portal.upper()} is not available on this instance")
+        schedules.remove(schedule)
+    for schedule in list(schedules):
+        try:
+            schedule_sync_keys(schedule)  #< unknown ISW report types: drop this schedule, not the scheduler
+        except ValueError as e:
+            logging.error(f"Schedule {schedule.name} skipped – {e}")
+            schedules.remove(schedule)
+    app.state.scheduler = Scheduler(schedules, schedule_sync_keys, submit_scheduled,
+                                    lambda job_id: (job := app.state.jobs.get(job_id)) is not None and not job.finished)
+    app.state.scheduler.start()  #< recurring pulls, with catch-up of days missed while the API was down
+    try:
+        yield
+    finally:
+        await app.state.scheduler.stop()
+        await app.state.jobs.stop()
+        set_pool(None)
+        await pool.stop()
 
 app = FastAPI(
     title="Transaction Reports Downloader API",
     version="1.0.0",
     description="Bots for Downloading Reports",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -30,70 +81,462 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Parse a YYYY-MM-DD query parameter
+def parse_date(value: str, name: str):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be in YYYY-MM-DD format")
+
+# A run counts towards the synced window only if every part of it completed
+def sync_succeeded(result: dict) -> bool:
+    return result.get("status") in ("success", "warning", "no report available")
+
+# Compact message tail for a job result
+def message_tail(messages) -> dict:
+    messages = list(messages)
+    return {"messages": messages[-RESULT_MESSAGES:] if RESULT_MESSAGES > 0 else [], "messages_total": len(messages)}
+
+# Per-shard results for the response, with timings only when asked for
+def shard_summaries(shards: list, include_timings: bool) -> list:
+    if include_timings:
+        return shards
+    return [{k: v for k, v in r.items() if k not in ("timings", "wait_timings")} for r in shards]
+
+# A job ran to the end (nothing left to resume) when it synced or had nothing to fetch
+def run_completed(result: dict) -> bool:
+    return sync_succeeded(result) or result.get("status") == "up to date"
+
+# Skip shards a resumed job already finished; remember the ones that finish now
+def checkpointed_shards(run_range):
+    scope = CheckpointScope("shards")
+
+    async def run_shard(range_start, range_end):
+        key = f"{range_start}:{range_end}"
+        if key in scope.get("done", []):
+            return {"status": "success", "files_downloaded": 0, "files_skipped": 0, "messages": ["Shard already completed before resume"]}
+        result = await run_range(range_start, range_end)
+        if sync_succeeded(result):
+            scope.update(done=scope.get("done", []) + [key])
+        return result
+
+    return run_shard
+
+# NIP job from its stored parameters – used for new requests and for resuming
+def nip_job(params: dict):
+    start_dt = datetime.strptime(params["start_date"], "%Y-%m-%d").date()
+    end_dt = datetime.strptime(params["end_date"], "%Y-%m-%d").date()
+    shard = ShardUnit(params["shard"]) if params["shard"] else None
+    nip = bots.get("nip")
+
+    async def run_range(range_start, range_end):
+        return await nip.nip_run(start_date=range_start, end_date=range_end, headless=params["headless"],
+                                 download_mode=DownloadMode(params["download_mode"]), ingest=params["ingest"])
+
+    async def run():
+        range_start = manifest.incremental_start("nip", [nip.REPORT_TYPE], start_dt) if params["incremental"] else start_dt
+        if range_start > end_dt:
+            return {"status": "up to date", "start_date": str(start_dt), "end_date": str(end_dt), "files_downloaded": 0, "messages": []}
+
+        if shard:
+            result = await run_shards(split_range(range_start, end_dt, shard), checkpointed_shards(run_range), params["shard_parallelism"])
+        else:
+            result = await run_range(range_start, end_dt)
+        if sync_succeeded(result):
+            manifest.mark_synced("nip", nip.REPORT_TYPE, range_start, end_dt)
+
+        content = {
+            "status": result.get("status", "failed"),
+            "start_date": str(range_start),
+            "end_date": str(end_dt),
+            "files_downloaded": result.get("files_downloaded", result.get("total_saved", 0)),
+            "files_skipped": result.get("files_skipped", 0),
+            "files_failed": result.get("files_failed", 0),
+            "download_directory": storage_location(nip.DOWNLOAD_DIR, "nip"),
+            **message_tail(result.get("messages", [])),
+        }
+        if shard:
+            content["shards"] = shard_summaries(result["shards"], params["include_timings"])
+        else:
+            if params["ingest"]:
+                content["ingest"] = result.get("ingest")
+            if params["include_timings"]:
+                content["timings"] = result.get("timings")
+                content["wait_timings"] = result.get("wait_timings")
+        return content
+
+    return run
+
+# ISW job from its stored parameters – used for new requests and for resuming
+def isw_job(params: dict):
+    start_dte = datetime.strptime(params["start_date"], "%Y-%m-%d").date()
+    end_dte = datetime.strptime(params["end_date"], "%Y-%m-%d").date()
+    shard = ShardUnit(params["shard"]) if params["shard"] else None
+    report_codes = params["report_codes"]
+    names = dict(zip(report_codes, params["report_types"]))
+    isw = bots.get("isw")
+
+    def label(per_type: list) -> list:
+        return [dict(r, report_type=names.get(r["report_code"])) for r in per_type]
+
+    async def run_range(range_start, range_end):
+        return await isw.isw_run(start_date=range_start, end_date=range_end, report_codes=report_codes, headless=params["headless"],
+                                 download_mode=DownloadMode(params["download_mode"]), parallel_pages=params["parallel_pages"])
+
+    async def run():
+        range_start = manifest.incremental_start("isw", report_codes, start_dte) if params["incremental"] else start_dte
+        if range_start > end_dte:
+            return {"status": "up to date", "start_date": str(start_dte), "end_date": str(end_dte), "files_downloaded": 0, "messages": []}
+
+        if shard:
+            result = await run_shards(split_range(range_start, end_dte, shard), checkpointed_shards(run_range), params["shard_parallelism"])
+        else:
+            result = await run_range(range_start, end_dte)
+        if sync_succeeded(result):
+            # per-type outcome; for sharded runs merged across shards, so a type that failed in any shard is not synced
+            failed_codes = {r["report_code"] for r in result.get("report_types", []) if r["status"] in ("failed", "partial")}
+            for code in report_codes:
+                if code not in failed_codes:
+                    manifest.mark_synced("isw", code, range_start, end_dte)
+
+        content = {
+            "status": result.get("status", "failed"),
+            "start_date": str(range_start),
+            "end_date": str(end_dte),
+            "report_types": label(result.get("report_types", [])),
+            "files_downloaded": result.get("files_downloaded", result.get("total_saved", 0)),
+            "files_skipped": result.get("files_skipped", 0),
+            "files_failed": result.get("files_failed", 0),
+            "download_directory": storage_location(isw.DOWNLOAD_DIR, "isw"),
+            **message_tail(result.get("messages", [])),
+        }
+        if shard:
+            content["shards"] = [dict(r, report_types=label(r.get("report_types", [])))
+                                 for r in shard_summaries(result["shards"], params["include_timings"])]
+        elif params["include_timings"]:
+            content["timings"] = result.get("timings")
+            content["wait_timings"] = result.get("wait_timings")
+        return content
+
+    return run
+
+JOB_BUILDERS = {"nip": nip_job, "isw": isw_job}
+
+# What makes two download requests the same run: portal, report types and normalized range
+# (plus ingest for NIP, which changes what the run produces)
+def request_identity(portal: str, params: dict) -> tuple:
+    if portal == "nip":
+        return request_key("nip", [bots.get("nip").REPORT_TYPE], params["start_date"], params["end_date"], ingest=params["ingest"])
+    return request_key("isw", params["report_codes"], params["start_date"], params["end_date"])
+
+# Put a bot run on the job queue and return (HTTP status, body) straight away.
+# Raises PortalUnavailable when this instance does not serve the portal, QueueFullError when the queue is full.
+# The job's progress is checkpointed under `checkpoint_id` (its own id unless it resumes another job).
+# A request identical to a queued/running job joins that job; one identical to a run that
+# succeeded in the last RESULT_CACHE_TTL seconds gets its result unless `refresh` is set.
+def submit_job(portal: str, params: dict, checkpoint_id: Optional[str] = None, refresh: bool = False) -> tuple[int, dict]:
+    bots.get(portal)
+    key = request_identity(portal, params)
+    if checkpoint_id is None:
+        running = coalescer.inflight(key)
+        if running is not None:
+            return 202, {"job_id": running.id, "status": running.status.value, "status_url": f"/jobs/{running.id}",
+                         "events_url": f"/jobs/{running.id}/events", "coalesced": True}
+        cached = None if refresh else coalescer.cached(key)
+        if cached is not None:
+            return 200, {"job_id": cached["job_id"], "status": JobStatus.succeeded.value, "status_url": f"/jobs/{cached['job_id']}",
+                         "cached": True, "finished_at": cached["finished_at"], "result": cached["result"]}
+
+    runner = JOB_BUILDERS[portal](params)
+
+    async def checkpointed():
+        job = current_job.get()
+        checkpoints.begin(job.checkpoint_id, portal, params)
+        result = None
+        try:
+            result = await runner()
+            return result
+        finally:
+            completed = result is not None and run_completed(result)
+            checkpoints.finish(job.checkpoint_id, completed=completed)
+            coalescer.finished(key, job, result, cacheable=completed)
+
+    job = app.state.jobs.submit(portal, params, checkpointed, checkpoint_id=checkpoint_id)  #< QueueFullError when full
+    coalescer.started(key, job)
+    return 202, {
+        "job_id": job.id,
+        "status": job.status.value,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+        **({"resumes": checkpoint_id} if checkpoint_id else {}),
+    }
+
+# The HTTP face of submit_job: 503 for a portal this instance does not serve, 429 when the queue is full
+def enqueue(portal: str, params: dict, checkpoint_id: Optional[str] = None, refresh: bool = False):
+    try:
+        status_code, content = submit_job(portal, params, checkpoint_id, refresh)
+    except PortalUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    return JSONResponse(status_code=status_code, content=content)
+
+# ISW report types of a schedule, given as codes ("24") or names ("ATM Detail")
+def schedule_report_types(schedule) -> list[ReportType]:
+    by_code = {t.name.lstrip("_"): t for t in ReportType}
+    by_name = {t.value: t for t in ReportType}
+    types = list(dict.fromkeys(by_code.get(t) or by_name.get(t) for t in schedule.report_types))
+    if not types or None in types:
+        raise ValueError(f"Schedule {schedule.name}: report_types must list ISW report codes or names")
+    return types
+
+# Report types the manifest tracks for a schedule – its coverage is the least synced of them
+def schedule_sync_keys(schedule) -> list[str]:
+    if schedule.portal == "nip":
+        return [bots.get("nip").REPORT_TYPE]
+    return [t.name.lstrip("_") for t in schedule_report_types(schedule)]
+
+# Queue the job a schedule fired for: the whole window in one run, i.e. one portal session
+def submit_scheduled(schedule, start: date, end: date) -> Optional[str]:
+    options = schedule.options
+    if schedule.portal == "isw" and not bots.get("isw").within_retention(start):
+        # older reports are gone from the portal: count those days as covered, or catch-up would stall on them
+        oldest = date.today() - timedelta(days=bots.get("isw").MAX_REPORT_AGE_DAYS)
+        logging.warning(f"Schedule {schedule.name}: {start}..{oldest - timedelta(days=1)} is past ISW retention – skipped")
+        for code in schedule_sync_keys(schedule):
+            manifest.mark_synced("isw", code, start, oldest - timedelta(days=1))
+        start = max(oldest, start)
+        if start > end:
+            return None
+    params = {"start_date": str(start), "end_date": str(end), "headless": options.get("headless", POOL_HEADLESS),
+              "download_mode": DownloadMode(options.get("download_mode", DownloadMode.click.value)).value,
+              "shard": None, "shard_parallelism": SHARD_PARALLELISM, "incremental": False, "include_timings": False}
+    if schedule.portal == "nip":
+        params["ingest"] = bool(options.get("ingest", False))
+    else:
+        report_types = schedule_report_types(schedule)
+        params.update(report_types=[t.value for t in report_types], report_codes=[t.name.lstrip("_") for t in report_types],
+                      parallel_pages=int(options.get("parallel_pages", 1)))
+    try:
+        _, content = submit_job(schedule.portal, params)
+    except (PortalUnavailable, QueueFullError) as e:
+        logging.warning(f"Schedule {schedule.name} not queued – {e}")
+        return None
+    return content["job_id"]
+
+# The bot module of a portal, or 503 when this instance does not serve it
+def portal_bot(portal: str):
+    try:
+        return bots.get(portal)
+    except PortalUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
 # Endpoint to download NIP reports
 @app.post("/download-nip-report")
 async def download_nip_report(
     start_date: str = Query(..., description="Format: YYYY-MM-DD"),
     end_date: str = Query(..., description="Format: YYYY-MM-DD"),
-    headless: bool = False
+    headless: bool = False,
+    download_mode: DownloadMode = Query(DownloadMode.click, description="click: browser downloads, http: direct fetch with session cookies"),
+    shard: Optional[ShardUnit] = Query(None, description="Split the range into day or week shards run in parallel"),
+    shard_parallelism: int = Query(SHARD_PARALLELISM, ge=1, le=16, description="Shards running at once"),
+    incremental: bool = Query(False, description="Only fetch what appeared since the last successful sync"),
+    ingest: bool = Query(False, description="Also convert downloaded ZIPs to date-partitioned Parquet"),
+    include_timings: bool = Query(False, description="Add per-step and per-wait timing breakdowns to the job result"),
+    refresh: bool = Query(False, description=f"Ignore a result cached from an identical run (kept {RESULT_CACHE_TTL}s); identical runs in flight are still joined"),
 ):
-    try:
-        # Convert string to date object
-        start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
-        end_dt   = datetime.strptime(end_date, "%Y-%m-%d").date()
-
-        result = await nip_run(start_date=start_dt, end_date=end_dt, headless=headless)
-
-        status_code = 200
-        status_text = "success" if status_code == 200 else "failed"
-
-        return JSONResponse(
-            status_code=status_code,
-            content={
-                "status": status_text,
-                "start_date": str(start_dt),
-                "end_date": str(end_dt),
-                "files_downloaded": result.get("total_saved", 0),
-                "download_directory": str(nip_download_dir),
-                "messages": result.get("messages", [])
-            }
-        )
-
-    except Exception as e:
-        tb = traceback.format_exc()
-        error_message = f"Error during download: {e}\n{tb}"
-        print(error_message)  # log to console
-        raise HTTPException(status_code=500, detail=error_message)
-
-# Endpoint to download ISW reports
+    portal_bot("nip")
+
+    # Convert string to date object
+    start_dt = parse_date(start_date, "start_date")
+    end_dt   = parse_date(end_date, "end_date")
+
+    params = {"start_date": str(start_dt), "end_date": str(end_dt), "headless": headless, "download_mode": download_mode.value,
+              "shard": shard.value if shard else None, "shard_parallelism": shard_parallelism, "incremental": incremental,
+              "ingest": ingest, "include_timings": include_timings}
+    return enqueue("nip", params, refresh=refresh)
+
+# Endpoint to download ISW reports (one login for any number of report types)
 @app.post("/download-isw-reports")
 async def download_isw_reports(
     start_date: str = Query(..., description="Format: YYYY-MM-DD"),
     end_date: str = Query(..., description="Format: YYYY-MM-DD"),
-    report_type: ReportType = Query(..., description="Select report type"),
+    report_type: Optional[List[ReportType]] = Query(None, description="Select one or more report types"),
+    all_report_types: bool = Query(False, description="Download every report type except 'All Categories'"),
+    parallel_pages: int = Query(1, ge=1, le=4, description="Report types processed at once within the session"),
     headless: bool = False,
+    download_mode: DownloadMode = Query(DownloadMode.click, description="click: browser downloads, http: direct fetch with session cookies"),
+    shard: Optional[ShardUnit] = Query(None, description="Split the range into day or week shards run in parallel"),
+    shard_parallelism: int = Query(SHARD_PARALLELISM, ge=1, le=16, description="Shards running at once"),
+    incremental: bool = Query(False, description="Only fetch what appeared since the last successful sync"),
+    include_timings: bool = Query(False, description="Add per-step and per-wait timing breakdowns to the job result"),
+    refresh: bool = Query(False, description=f"Ignore a result cached from an identical run (kept {RESULT_CACHE_TTL}s); identical runs in flight are still joined"),
 ):
-    try:
-        report_code = report_type.name.lstrip("_")
-        start_dte = datetime.strptime(start_date, "%Y-%m-%d").date()
-        end_dte   = datetime.strptime(end_date, "%Y-%m-%d").date()
-        result = await isw_run(start_date=start_dte, end_date=end_dte, report_code=report_code, headless=headless)
-
-        return JSONResponse(
-            status_code=200,
-            content={
-                "status": "success",
-                "start_date": str(start_dte),
-                "end_date": str(end_dte),
-                "report_type": report_type.value,
-                "files_downloaded": result.get("total_saved", 0),
-                "download_directory": str(isw_download_dir),
-                "messages": result.get("messages", [])
-            }
-        )
-
-    except Exception as e:
-        tb = traceback.format_exc()
-        error_message = f"Error during download: {e}\n{tb}"
-        print(error_message)
+    isw = portal_bot("isw")
+    report_types = [t for t in ReportType if t is not ReportType._0] if all_report_types else list(dict.fromkeys(report_type or []))
+    if not report_types:
+        raise HTTPException(status_code=400, detail="Provide at least one report_type or set all_report_types=true")
+
+    start_dte = parse_date(start_date, "start_date")
+    end_dte   = parse_date(end_date, "end_date")
+    if not isw.within_retention(start_dte):
+        raise HTTPException(status_code=400, detail="You cannot download reports older than 90 days. Enter a date range within the last 90 days.")
+
+    params = {"start_date": str(start_dte), "end_date": str(end_dte), "report_types": [t.value for t in report_types],
+              "report_codes": [t.name.lstrip("_") for t in report_types], "parallel_pages": parallel_pages,
+              "headless": headless, "download_mode": download_mode.value, "shard": shard.value if shard else None,
+              "shard_parallelism": shard_parallelism, "incremental": incremental, "include_timings": include_timings}
+    return enqueue("isw", params, refresh=refresh)
+
+# Serve a listing from the cache, or scrape it and cache it when the scrape succeeded
+async def cached_listing(key: tuple, refresh: bool, scrape):
+    if not refresh and key in listing_cache:
+        return {**listing_cache[key], "cached": True}
+
+    result = await scrape()
+    if result["status"] != "success":
+        return JSONResponse(status_code=502, content=result)
+    result["listed_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    listing_cache[key] = result
+    return {**result, "cached": False}
+
+# Endpoint to list NIP reports available for a date range, without downloading
+@app.get("/nip-reports")
+async def list_nip_reports(
+    start_date: str = Query(..., description="Format: YYYY-MM-DD"),
+    end_date: str = Query(..., description="Format: YYYY-MM-DD"),
+    headless: bool = False,
+    refresh: bool = Query(False, description=f"Ignore a cached listing (kept {LISTING_CACHE_TTL}s)"),
+):
+    nip = portal_bot("nip")
+    start_dt = parse_date(start_date, "start_date")
+    end_dt   = parse_date(end_date, "end_date")
+    return await cached_listing(("nip", start_dt, end_dt), refresh,
+                                lambda: nip.nip_list(start_dt, end_dt, headless=headless))
+
+# Endpoint to list ISW reports available per report type, without downloading
+@app.get("/isw-reports")
+async def list_isw_reports(
+    start_date: str = Query(..., description="Format: YYYY-MM-DD"),
+    end_date: str = Query(..., description="Format: YYYY-MM-DD"),
+    report_type: Optional[List[ReportType]] = Query(None, description="Select one or more report types"),
+    all_report_types: bool = Query(False, description="List every report type except 'All Categories'"),
+    headless: bool = False,
+    refresh: bool = Query(False, description=f"Ignore a cached listing (kept {LISTING_CACHE_TTL}s)"),
+):
+    isw = portal_bot("isw")
+    report_types = [t for t in ReportType if t is not ReportType._0] if all_report_types else list(dict.fromkeys(report_type or []))
+    if not report_types:
+        raise HTTPException(status_code=400, detail="Provide at least one report_type or set all_report_types=true")
+
+    start_dte = parse_date(start_date, "start_date")
+    end_dte   = parse_date(end_date, "end_date")
+    if not isw.within_retention(start_dte):
+        raise HTTPException(status_code=400, detail="You cannot list reports older than 90 days. Enter a date range within the last 90 days.")
+
+    names = {t.name.lstrip("_"): t.value for t in report_types}
+    report_codes = list(names)
+
+    async def scrape():
+        result = await isw.isw_list(start_dte, end_dte, report_codes, headless=headless)
+        result["reports"] = [dict(r, report_type=names.get(r["report_code"])) for r in result["reports"]]
+        return result
+
+    return await cached_listing(("isw", start_dte, end_dte, tuple(sorted(report_codes))), refresh, scrape)
+
+# Readiness per portal: enabled, configured and its bot loaded – plus the browser pool's state.
+# 503 until at least one portal can take requests; /ready/{portal} checks a single portal.
+@app.get("/ready")
+async def ready():
+    portals = bots.status()
+    ok = any(p["ready"] for p in portals.values())
+    return JSONResponse(status_code=200 if ok else 503,
+                        content={"ready": ok, "portals": portals, "browser_pool": app.state.browser_pool.state})
+
+@app.get("/ready/{portal}")
+async def ready_portal(portal: str):
+    if portal not in bots.plugins:
+        raise HTTPException(status_code=404, detail=f"Unknown portal {portal}")
+    status = bots.plugins[portal].status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content={"portal": portal, **status})
+
+# Recurring pulls: cron, coverage (last synced day), the window still missing and the last firing
+@app.get("/schedules")
+async def list_schedules():
+    return {"enabled": SCHEDULER_ENABLED, "schedules": app.state.scheduler.status()}
+
+# Job status endpoints
+@app.get("/jobs/interrupted")
+async def interrupted_jobs():
+    return {"jobs": checkpoints.interrupted()}
+
+@app.post("/jobs/{job_id}/resume")
+async def resume_job(job_id: str):
+    job = app.state.jobs.get(job_id)
+    checkpoint_id = job.checkpoint_id if job is not None else job_id  #< after a restart only the checkpoint is left
+    saved = checkpoints.get(checkpoint_id)
+    if saved is None:
+        raise HTTPException(status_code=404, detail=f"No checkpoint for job {job_id} – it completed or never started")
+    active = app.state.jobs.active_for_checkpoint(checkpoint_id)
+    if active is not None:
+        raise HTTPException(status_code=409, detail=f"Job {active.id} is already {active.status.value} for this checkpoint")
+    return enqueue(saved["portal"], saved["params"], checkpoint_id=checkpoint_id)
+
+# Live progress as Server-Sent Events: every logged message, progress counters (page n of m, files,
+# bytes, ETA) and status changes, ending with a "done" event that carries the job summary.
+# Reconnecting clients resume after the Last-Event-ID they saw.
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request, after: int = Query(0, ge=0, description="Only events with a higher id")):
+    job = app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    last_seen = request.headers.get("last-event-id", "")
+    start = int(last_seen) if last_seen.isdigit() else after
+
+    async def stream():
+        async for event in job.stream(start):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job.to_dict()
+
+@app.get("/jobs")
+async def list_jobs(status: Optional[JobStatus] = Query(None, description="Filter by job status")):
+    jobs = app.state.jobs.list(status)
+    return {
+        "queued": app.state.jobs.queued,
+        "jobs": [j.to_dict(include_result=False) for j in jobs],
+    }
 
+# Prometheus scrape endpoint: per-step durations, bytes, file and retry counters, plus queue/pool state
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    jobs = app.state.jobs
+    pool = app.state.browser_pool
+    extra = {
+        "bot_jobs": ("Jobs known to the API by status.",
+                     [({"status": s.value}, len(jobs.list(s))) for s in JobStatus]),
+        "bot_job_queue_depth": ("Jobs waiting for a worker.", [({}, jobs.queued)]),
+        "bot_browser_contexts_active": ("Open browser contexts in the warm pool.", [({}, pool.active_contexts)]),
+    }
+    browsers = await pool.memory()
+    extra["bot_browser_rss_bytes"] = ("Resident memory of each pooled browser's processes.",
+                                      [({"browser": b["browser"]}, b["rss_bytes"]) for b in browsers if b["rss_bytes"] is not None])
+    extra["bot_browser_contexts_served"] = ("Contexts each pooled browser has served since launch.",
+                                            [({"browser": b["browser"]}, b["served"]) for b in browsers])
+    accounts = [(portal, a) for portal, pool in credential_pools().items() for a in pool.status()]
+    extra["bot_account_runs_active"] = ("Runs currently using each portal account.",
+                                        [({"portal": p, "account": a["account"]}, a["active"]) for p, a in accounts])
+    extra["bot_account_cooldown_seconds"] = ("Seconds until a throttled account is used again.",
+                                             [({"portal": p, "account": a["account"]}, a["cooldown_seconds"]) for p, a in accounts])
+    return PlainTextResponse(metrics_registry.render(extra), media_type="text/plain; version=0.0.4")
@@ -1,233 +1,469 @@
-from playwright.async_api import async_playwright
+from src.enums import DownloadMode
+from src.utils.checkpoints import CheckpointScope, PageCheckpoint
+from src.utils.credentials import AccountThrottled, credential_pool, leased_context
+from src.utils.http_download import fetch_all
+from src.utils.jobs import bump_progress, report_progress
 from datetime import datetime, date
-from dotenv import load_dotenv
-from src.utils.logger import log_and_store
+from src.utils.logger import log_and_store, log_context, new_message_buffer
+from src.utils.manifest import manifest
+from src.utils.metrics import RunTrace
+from src.utils.pagination import jump_to_results_page, show_all_results
+from src.utils.retry import RetryQueue
+from src.utils.route_policy import apply_route_policy
+from src.utils.session_cache import session_cache
+from src.utils.settings import portal_settings
+from src.utils.storage import STORAGE_NAMING, get_storage, save_download
+from src.utils.table_rows import extract_rows
+from src.utils.waits import Waits
 from typing import Optional
 from pathlib import Path
 import traceback
-import logging
+import asyncio
+import hashlib
 import os
 
-# Detect system default Downloads folder or use env override
+# Detect system default Downloads folder (created by storage on the first save)
 DOWNLOAD_DIR = Path.home() / "Downloads"
-DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
-LOG_FILE = Path(__file__).resolve().parent / "log_file.logs"
-LOG_FILE.parent.mkdir(parents=True, exist_ok=True)  # ensure the directory exists
-
-# logging configuration
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
-
-# configure evironment variables
-env_path = Path(__file__).resolve().parent / ".env"
-load_dotenv(dotenv_path=env_path)
-
-USERNAME = os.getenv("ISW_USER")     
-PASSWORD = os.getenv("ISW_PW")
-PORTAL_URL = os.getenv("ISW_PORTAL_URL", "").strip().strip('"').strip("'")
-
-# credentials validation
-if not USERNAME or not PASSWORD:
-    raise ValueError("Missing ISW_USER or ISW_PW. Check your .env file.")
-
-if not PORTAL_URL:
-    raise ValueError("Missing PORTAL_URL. Check your .env file.")
+
+PORTAL_KEY = "isw"
+
+# ISW_PORTAL_URL and ISW_USER/ISW_PW or ISW_ACCOUNTS="user:pass,..." – checked by src/utils/plugins.py before this module loads
+SETTINGS = portal_settings(PORTAL_KEY)
+PORTAL_URL = SETTINGS.portal_url
+ACCOUNTS = credential_pool(PORTAL_KEY)
+
+MAX_PATH = 259
+DOWNLOAD_SELECTOR = "a[href*='reportDownload.do']"
+NEXT_SELECTOR = "a:has-text('Next')"
+
+MAX_REPORT_AGE_DAYS = 90
+
+# True when the portal still holds reports starting on `start_date`
+def within_retention(start_date: date) -> bool:
+    return (datetime.today().date() - start_date).days <= MAX_REPORT_AGE_DAYS
+
+# Keep the saved path under the Windows MAX_PATH limit. Long names keep their start and get a
+# short hash of the full name, so two different reports can never shorten to the same file.
+def _fit_path(filename: str) -> str:
+    name, ext = os.path.splitext(filename)
+    reserved = 13 if STORAGE_NAMING == "content" else 0  #< "_" + 12 hash characters added by content naming
+    if len(str(DOWNLOAD_DIR / filename)) + reserved <= MAX_PATH:
+        return filename
+    tag = hashlib.sha1(filename.encode()).hexdigest()[:8]
+    keep = max(1, MAX_PATH - len(str(DOWNLOAD_DIR)) - 1 - reserved - len(tag) - 1 - len(ext))
+    return f"{name[:keep]}-{tag}{ext}"
+
+# Login, reusing a cached session until the portal shows the passport button again
+async def _ensure_logged_in(page, context, account, has_session: bool, messages: list, waits: Waits) -> None:
+    await page.goto(f"{PORTAL_URL}", timeout=90000)  # Ensure correct login page
+    await page.wait_for_load_state("domcontentloaded", timeout=90000)
+
+    login_button = page.locator("a.passport-button")
+    frameset = page.locator("frame[name='menu']")
+    await login_button.or_(frameset).first.wait_for(state="attached", timeout=90000)
+
+    if await login_button.count() == 0:
+        log_and_store("Reusing cached session – login skipped", messages, level="info")
+        await waits.frame_load(page, "body", name="frameset")  # frameset documents loaded
+        return
+
+    if has_session:
+        log_and_store("Cached session expired – logging in again", messages, level="warning")
+        session_cache.invalidate(PORTAL_KEY, account.user)
+
+    await page.click("a.passport-button", timeout=90000) # Click the login button
+
+    # Wait until the username and password inputs are visible
+    await page.wait_for_selector("#username", timeout=90000)
+    await page.wait_for_selector("#password", timeout=90000)
+    await page.fill("#username", account.user)
+    await page.fill("#password", account.password)
+    await page.click("button.btn-dark-blue:has-text('Sign in')") #< Login
+    try:
+        await frameset.wait_for(state="attached", timeout=90000)
+    except Exception:
+        if await ACCOUNTS.check_lockout(page, account):
+            raise AccountThrottled(f"{account.label} is throttled or locked by the portal – try again after its cooldown")
+        raise
+    await waits.frame_load(page, "body", name="frameset")  # wait for the frameset to load
+    await session_cache.save(PORTAL_KEY, account.user, context)
+
+# Open Reports Root in the body frame through the menu frame
+async def _open_reports_root(page, messages: list):
+    menu_frame = page.frame(name="menu")
+    if not menu_frame:
+        log_and_store("Could not find a frame containing the Reports menu!", messages, level="error")
+        return None
+
+    await menu_frame.wait_for_selector("td.menuLink:has-text('Reports')", timeout=10000)
+    await menu_frame.click("td.menuLink:has-text('Reports')")
+
+    # Wait for and click Reports Root link
+    await menu_frame.wait_for_selector("a.innerLink:has-text('Reports Root')", timeout=10000)
+    await menu_frame.click("a.innerLink:has-text('Reports Root')")
+    return page.frame(name="body")
+
+# Search one report type on an already logged-in page; returns the body frame holding the results
+async def _search_report_type(page, start_date: date, end_date: date, report_code: str,
+                              messages: list, waits: Waits, trace: RunTrace, pagination: Optional[dict] = None):
+    # Reuse the search form left in the body frame by the previous type, else open Reports Root
+    body_frame = page.frame(name="body")
+    if body_frame is None or await body_frame.locator("select#reportTypeId").count() == 0:
+        with trace.step("navigation", report_code):
+            body_frame = await _open_reports_root(page, messages)
+        if body_frame is None:
+            return None
+
+    with trace.step("search", report_code):
+        # Wait for input fields to be available
+        await body_frame.wait_for_selector("input[name='dateStart']", timeout=10000)
+        await body_frame.wait_for_selector("input[name='dateEnd']", timeout=10000)
+    
+        # Fill start and end dates  
+        await body_frame.evaluate(
+            """(date) => {
+                const el = document.querySelector("input[name='dateStart']");
+                el.value = date;
+                el.dispatchEvent(new Event('input', { bubbles: true }));
+                el.dispatchEvent(new Event('change', { bubbles: true }));
+            }""",
+            start_date.strftime("%d/%m/%Y")
+        )
+        await body_frame.evaluate(
+            """(date) => {
+                const el = document.querySelector("input[name='dateEnd']");
+                el.value = date;
+                el.dispatchEvent(new Event('input', { bubbles: true }));
+                el.dispatchEvent(new Event('change', { bubbles: true }));
+            }""",
+            end_date.strftime("%d/%m/%Y")
+        )
+        log_and_store(f"Calendar dates filled and applied", messages, level="info")  # append to logs and messages
+
+        # Wait for the select to be available
+        await body_frame.wait_for_selector("select#reportTypeId", timeout=10000)
+        await body_frame.select_option("select#reportTypeId", value=report_code)
+        await waits.predicate(body_frame, "(code) => document.querySelector('select#reportTypeId').value === code",
+                              arg=report_code, name="report type selected")  # ensure dropdown change is registered
+        log_and_store(f"Report type set to: {report_code}", messages, level="info")
+
+        # Trigger the search
+        await waits.frame_load(page, "body", lambda: body_frame.click("input#search"), name="search")  # Wait for the table to reload
+    log_and_store("Search triggered by button click", messages, level="info")
+
+    # Results on one page instead of clicking Next through every page, when the portal takes a page size
+    if await body_frame.locator(DOWNLOAD_SELECTOR).count():
+        with trace.step("pagination", report_code):
+            strategy = await show_all_results(page, body_frame, waits, "body")
+        log_and_store(f"Pagination strategy: {strategy}", messages, level="info")
+        if pagination is not None:
+            pagination["strategy"] = strategy
+    return body_frame
+
+# Bookkeeping of one stored report – manifest, page checkpoint, counters, trace, log – for the click, HTTP and retry paths
+async def _saved(code: str, key: str, stored, result: dict, pages: Optional[PageCheckpoint], counter: dict,
+                 trace: RunTrace, messages: list, note: str = "") -> None:
+    await manifest.record(PORTAL_KEY, code, key, stored.location, stored.sha256, stored.size)
+    if pages is not None:
+        pages.saved(key)
+    counter["total_saved"] += 1
+    result["files_downloaded"] += 1
+    trace.file("saved", stored.size, report_type=code)
+    bump_progress("files_saved")
+    log_and_store(f"⬇️  {counter['total_saved']:>3} saved {stored.name}{note}", messages, level="info")  # append to logs and messages
+
+# A report that could not be downloaded and will not be retried again
+def _failed(code: str, label: str, error, result: dict, trace: RunTrace, messages: list) -> None:
+    result["files_failed"] += 1
+    trace.file("failed", report_type=code)
+    bump_progress("files_failed")
+    log_and_store(f" ⚠️ Download failed for {label} — {error}", messages, level="warning")  # append to logs and messages
+
+# Search one report type and download every result, on an already logged-in page
+async def _download_report_type(page, context, start_date: date, end_date: date, report_code: str,
+                                download_mode: DownloadMode, messages: list, waits: Waits, counter: dict, trace: RunTrace,
+                                retries: RetryQueue, storage, page_checkpoints: dict) -> dict:
+    result = {"report_code": report_code, "status": "warning", "files_downloaded": 0, "files_skipped": 0, "files_failed": 0}
+    pending_urls = []  #< http mode: (key, url) of every page, fetched after pagination under the row's key
+    checkpoint = CheckpointScope(f"{report_code}:{start_date}:{end_date}")  #< pages done, kept when the job is interrupted
+    pages = page_checkpoints[report_code] = PageCheckpoint(checkpoint)  #< settled again by isw_run after the retries
+    pagination = {}
+
+    body_frame = await _search_report_type(page, start_date, end_date, report_code, messages, waits, trace, pagination)
+    if body_frame is None:
+        result["status"] = "failed"
+        return result
+
+    # Check if any download button is present
+    download_btn = body_frame.locator(DOWNLOAD_SELECTOR)
+    if await download_btn.count() == 0:
+        log_and_store(f"No reports found for type {report_code} and this date range.", messages, level="error")
+        result["status"] = "no report available"
+        return result
+
+    log_and_store("Table reloaded – starting downloads", messages, level="info")
+        
+    # Resumed job: go back to the last page it finished (one page overlap; the manifest skips repeats)
+    page_num = 1
+    pages_done = pages.done
+    if pages_done > 1 and pagination.get("strategy") in ("click_through", "page_size_partial"):
+        with trace.step("pagination", report_code):
+            page_num = await jump_to_results_page(page, body_frame, waits, "body", pages_done, NEXT_SELECTOR)
+        log_and_store(f"Resuming from page {page_num} (checkpoint)", messages, level="info")
+
+    # Download reports 
+    report_progress(page=page_num)
+    while True:
+        # Read every row of this page of the results in one round trip
+        await body_frame.locator(DOWNLOAD_SELECTOR).first.wait_for(state="visible", timeout=60_000)
+        links   = body_frame.locator(DOWNLOAD_SELECTOR)
+        rows    = await extract_rows(body_frame, DOWNLOAD_SELECTOR, report_code)
+        count   = len(rows)
+        if count == 0:
+            log_and_store("⚠️  no download buttons found on this page", messages, level="warning")
+            break
+        
+        log_and_store(f"Page {page_num} – {count} download links found", messages, level="info")  # append to logs and messages
+
+        # Skip reports the manifest says we already have
+        keys = [row["key"] for row in rows]
+        todo = [i for i in range(count) if not manifest.has(PORTAL_KEY, report_code, keys[i])]
+        if len(todo) < count:
+            result["files_skipped"] += count - len(todo)
+            trace.file("skipped", count=count - len(todo), report_type=report_code)
+            bump_progress("files_skipped", count - len(todo))
+            log_and_store(f"Skipping {count - len(todo)} reports already downloaded", messages, level="info")
+        pages.page(page_num, [keys[i] for i in todo])
+
+        # http mode: take every URL on this page in one pass; JS-only links are still clicked
+        if download_mode == DownloadMode.http:
+            urls = [row["url"] for row in rows]
+            pending_urls.extend((keys[i], urls[i]) for i in todo if urls[i])
+            todo = [i for i in todo if not urls[i]]
+
+        for i in todo:
+            link = links.nth(i)
+            try:
+                with trace.step("download", report_code):
+                    await waits.element(link, name="download link")  # give button time to activate
+                    async with page.expect_download(timeout=120_000) as dl_info:
+                        await link.click(force=True)
+                    
+                    dl = await dl_info.value
+                    stored = await save_download(storage, dl, _fit_path(dl.suggested_filename))  #< browser's temp file, hashed on the way
+            except Exception as e:
+                if retries.add(keys[i], rows[i]["url"], report_code, e):
+                    log_and_store(f" ⚠️ Download failed for link {i + 1} — {e} (queued for retry)", messages, level="warning")
+                else:
+                    _failed(report_code, f"link {i + 1}", e, result, trace, messages)
+                continue
+            await _saved(report_code, keys[i], stored, result, pages, counter, trace, messages)
+        pages.settle()  #< pages whose files are queued for the HTTP fetch or a retry stay open
+        report_progress(pages_done=page_num)
+
+        # next page?
+        next_btn = body_frame.locator(NEXT_SELECTOR)
+        if await next_btn.count() == 0:
+            break
+        page_num += 1
+        report_progress(page=page_num)
+        log_and_store(f"➡️  Page {page_num}", messages, level="info")
+        with trace.step("pagination", report_code):
+            await waits.frame_load(page, "body", lambda: next_btn.first.click(), name="next page")
+            await body_frame.locator("tbody tr").first.wait_for(state="visible", timeout=10_000)
+
+    # http mode: fetch everything collected above over pooled connections
+    if pending_urls:
+        log_and_store(f"Fetching {len(pending_urls)} files over HTTP", messages, level="info")
+        with trace.step("download", report_code):
+            fetched_all = await fetch_all(context, [url for _, url in pending_urls], storage, rename=_fit_path, limiter=ACCOUNTS.bucket)
+        for i, ((key, url), (_, fetched)) in enumerate(zip(pending_urls, fetched_all)):
+            if isinstance(fetched, Exception):
+                retries.add(key, url, report_code, fetched)
+                log_and_store(f" ⚠️ Download failed for link {i + 1} — {fetched} (queued for retry)", messages, level="warning")
+                continue
+            await _saved(report_code, key, fetched, result, pages, counter, trace, messages)
+        pages.settle()
+
+    result["status"] = "success" if result["files_downloaded"] + result["files_skipped"] > 0 else "warning"
+    return result
 
 # Main automation
 async def isw_run(
         start_date: date,
         end_date  : date,
         headless: bool = False,
-        report_code: Optional[str] = None
+        report_code: Optional[str] = None,
+        download_mode: DownloadMode = DownloadMode.click,
+        report_codes: Optional[list[str]] = None,
+        parallel_pages: int = 1
 ) -> None:
+    """Download ISW reports for one or more report types in a single login.
 
-    messages = []
-    total_saved = 0
-    max_attempts = 5
-    attempts = 0
+    Types run one after another on the same page, reusing the search form, or
+    across `parallel_pages` pages of the same authenticated context."""
+
+    messages = new_message_buffer()
+    counter = {"total_saved": 0}
+    waits = Waits()
+    report_codes = list(report_codes or [report_code])
+    trace = RunTrace(PORTAL_KEY, report_codes[0] if len(report_codes) == 1 else "multi")  #< per-type events carry their own code
+    retries = RetryQueue()  #< failed downloads of every type, retried once all types are walked
+    page_checkpoints = {}   #< report code -> PageCheckpoint, settled once the retries are done
+    per_type = []
 
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=headless)
-            context = await browser.new_context(accept_downloads=True)
+        # The portal only keeps the last 90 days
+        if not within_retention(start_date):
+            error = f"You cannot download reports older than {MAX_REPORT_AGE_DAYS} days. Enter a date range within the last {MAX_REPORT_AGE_DAYS} days."
+            log_and_store(error, messages, level="error")
+            return {"status": "failed", "error": error, "messages": messages, "total_saved": 0}
+
+        storage = get_storage(DOWNLOAD_DIR, PORTAL_KEY)  #< local directory or S3 bucket (STORAGE_BACKEND)
+
+        # Isolated context from the warm browser pool (or a one-off browser) for a leased account,
+        # seeded with its cached login session when we have one
+        async with leased_context(ACCOUNTS, PORTAL_URL, headless=headless, accept_downloads=True) as (account, context, has_session):
+            await apply_route_policy(context, trace)  #< skip images, fonts, styles and analytics
             page = await context.new_page()
 
             # Login 
-            log_and_store("Navigating to login …", messages, level="info")
-            await page.goto(f"{PORTAL_URL}", timeout=90000)  # Ensure correct login page
-            await page.wait_for_load_state("domcontentloaded", timeout=90000)
-            await page.wait_for_selector("a.passport-button", timeout=90000)
-            await page.click("a.passport-button", timeout=90000) # Click the login button
-            
-            # Wait until the username and password inputs are visible
-            await page.wait_for_selector("#username", timeout=90000)
-            await page.wait_for_selector("#password", timeout=90000)
-            await page.fill("#username", USERNAME)
-            await page.fill("#password", PASSWORD)
-            await page.click("button.btn-dark-blue:has-text('Sign in')") #< Login
-            await page.wait_for_timeout(3000)  # Wait 3 seconds for frameset to load
-
-            # Frames
-            header_frame = page.frame(name="header")
-            menu_frame = page.frame(name="menu")
-            body_frame = page.frame(name="body")
-
-            await page.wait_for_timeout(3000)  # wait for the page to load
-
-            # Navigate to Transaction Report 
-            menu_frame = menu_frame
-            if not menu_frame:
-                log_and_store("Could not find a frame containing the Reports menu!", messages, level="error")
-                return
-            
-            await menu_frame.wait_for_selector("td.menuLink:has-text('Reports')", timeout=10000)
-            await menu_frame.click("td.menuLink:has-text('Reports')")
-
-            # Wait for and click Reports Root link
-            await menu_frame.wait_for_selector("a.innerLink:has-text('Reports Root')", timeout=10000)
-            await menu_frame.click("a.innerLink:has-text('Reports Root')")
-            
-            # Set date range
-            while True:
-                today = datetime.today().date()
-                if (today - start_date).days > 90:
-                    log_and_store("You cannot download reports older than 90 days. Enter a date range within the last 90 days.", messages, level="error")
-                    continue
-                break  # valid dates, exit loop
-
-            # Wait for input fields to be available
-            await body_frame.wait_for_selector("input[name='dateStart']", timeout=10000)
-            await body_frame.wait_for_selector("input[name='dateEnd']", timeout=10000)
-            
-            # Fill start and end dates  
-            await body_frame.evaluate(
-                """(date) => {
-                    const el = document.querySelector("input[name='dateStart']");
-                    el.value = date;
-                    el.dispatchEvent(new Event('input', { bubbles: true }));
-                    el.dispatchEvent(new Event('change', { bubbles: true }));
-                }""",
-                start_date.strftime("%d/%m/%Y")
-            )
-            await body_frame.evaluate(
-                """(date) => {
-                    const el = document.querySelector("input[name='dateEnd']");
-                    el.value = date;
-                    el.dispatchEvent(new Event('input', { bubbles: true }));
-                    el.dispatchEvent(new Event('change', { bubbles: true }));
-                }""",
-                end_date.strftime("%d/%m/%Y")
-            )
-            log_and_store(f"Calendar dates filled and applied", messages, level="info")  # append to logs and messages
-
-            # Wait for the select to be available
-            await body_frame.wait_for_selector("select#reportTypeId", timeout=10000)
-            await body_frame.select_option("select#reportTypeId", value=report_code)
-            await page.wait_for_timeout(500)  # short wait to ensure dropdown change is registered
-            log_and_store(f"Report type set to: {report_code}", messages, level="info")
-
-            # Trigger the search
-            await body_frame.click("input#search")
-            await body_frame.wait_for_timeout(2000)  # Wait for the table to reload
-            log_and_store("Search triggered by button click", messages, level="info") 
-              
-            # Check if any download button is present
-            await body_frame.wait_for_timeout(2000)
-            download_btn = body_frame.locator("a[href*='reportDownload.do']")
-            if await download_btn.count() == 0:
-                attempts += 1
-                log_and_store("No reports found for this type and date range.", messages, level="error")
-
-                if attempts >= max_attempts:
-                    log_and_store("Maximum number of attempts exceeded.", messages, level="error")
-                    await browser.close()
-                    return {
-                        "status": "no report available",
-                        "total_saved": total_saved,
-                        "messages": messages,
-                    }
-                
-                await browser.close()
+            log_and_store(f"Navigating to login as {account.label} …", messages, level="info")
+            with trace.step("login"):
+                await _ensure_logged_in(page, context, account, has_session, messages, waits)
+            report_progress(report_types_total=len(report_codes), report_types_done=0)
+
+            # Fan out over report types: each lane is one page of this logged-in context
+            queue = list(report_codes)
+
+            async def lane(lane_page):
+                while queue:
+                    code = queue.pop(0)
+                    try:
+                        with log_context(report_type=code):
+                            per_type.append(await _download_report_type(lane_page, context, start_date, end_date, code,
+                                                                         download_mode, messages, waits, counter, trace, retries, storage,
+                                                                         page_checkpoints))
+                    except Exception as e:
+                        log_and_store(f"Report type {code} failed — {e}", messages, level="error")
+                        per_type.append({"report_code": code, "status": "failed", "files_downloaded": 0,
+                                         "files_skipped": 0, "files_failed": 0, "error": str(e)})
+                    bump_progress("report_types_done")
+
+            lanes = [lane(page)]
+            for _ in range(min(parallel_pages, len(report_codes)) - 1):
+                extra_page = await context.new_page()
+                await _ensure_logged_in(extra_page, context, account, False, messages, waits)  #< shares the session cookies
+                lanes.append(lane(extra_page))
+            await asyncio.gather(*lanes)
+
+            # Retry queue: failed downloads again, with exponential backoff between rounds
+            failed_items = []
+            if retries:
+                log_and_store(f"Retrying {len(retries)} failed downloads", messages, level="info")
+                with trace.step("retry"):
+                    recovered, failed_items = await retries.drain(context, storage, rename=_fit_path,
+                                                                  on_retry=lambda item: trace.retry(item["report_type"]),
+                                                                  limiter=ACCOUNTS.bucket)
+                by_code = {r["report_code"]: r for r in per_type}
+                for item, stored in recovered:
+                    code = item["report_type"]
+                    await _saved(code, item["key"], stored, by_code[code], page_checkpoints.get(code), counter, trace, messages, " (retry)")
+                    if by_code[code]["status"] != "failed":  #< a type that raised stays failed – it was not walked to the end
+                        by_code[code]["status"] = "success"
+                for item in failed_items:
+                    code = item["report_type"]
+                    _failed(code, item["url"], f"{item['error']} (after {item['attempts']} retries)", by_code[code], trace, messages)
+            for pages in page_checkpoints.values():
+                pages.settle()
+            for r in per_type:
+                if r["files_failed"] and r["status"] != "failed":
+                    r["status"] = "partial"
+
+            total_saved = counter["total_saved"]
+            per_type.sort(key=lambda r: report_codes.index(r["report_code"]))
+            log_and_store(f"Finished – {total_saved} files downloaded.", messages, level="info")  # append to logs and messages
+
+            if all(r["status"] == "no report available" for r in per_type):
                 return {
                     "status": "no report available",
                     "total_saved": 0,
                     "messages": messages,
-                    "prompt": "No reports found. Please choose to either try another report type or a different date range."
+                    "report_types": per_type,
+                    "prompt": "No reports found. Please choose to either try another report type or a different date range.",
+                    "timings": trace.finish("no report available")
                 }
-             
+            total_skipped = sum(r["files_skipped"] for r in per_type)
+            total_failed = sum(r["files_failed"] for r in per_type)
+            types_failed = sum(1 for r in per_type if r["status"] == "failed")
+            if types_failed == len(per_type):
+                status = "failed"
+            elif total_failed or types_failed:
+                status = "partial"  #< not synced; the job stays resumable
             else:
-                log_and_store("Table reloaded – starting downloads", messages, level="info")
-                  #break  # Exit loop and continue with downloads
-                
-            # Download reports 
-            page_num = 1
-            while True:
-                # Collect all download buttons currently visible in this page of the table
-                await body_frame.locator("a[href*='reportDownload.do']").first.wait_for(state="visible", timeout=60_000)   
-                links   = await body_frame.locator("a[href*='reportDownload.do']").all()
-                count   = len(links)
-                if count == 0:
-                    print("⚠️  no download buttons found on this page")
-                    break
-                
-                log_and_store(f"Page {page_num} – {count} download links found", messages, level="info")  # append to logs and messages
-                for i, link in enumerate(links):
-                    try:
-                        await page.wait_for_timeout(2_000)  # give button time to activate
-                        async with page.expect_download(timeout=120_000) as dl_info:
-                            await link.click(force=True)
-                            
-                        dl = await dl_info.value
-                        MAX_PATH = 259
-            
-                        # max_filename_len = MAX_PATH - len(str(DOWNLOAD_DIR)) - 1  # -1 for the separator
-                        filename = dl.suggested_filename
-                        name, ext = os.path.splitext(filename)
-                        # Check if the filename exceeds the maximum windows path length of 260
-                        if len(str(DOWNLOAD_DIR / filename)) > MAX_PATH:
-                            # if it exceeds, select from the 25th character to the end (i.e, ecxlude the 1st 24 characters)
-                            filename = name[24:] + ext
-                            # filename = name[:max_filename_len] + ext
-                    
-                        save_path = DOWNLOAD_DIR / filename
-                        # save_path = DOWNLOAD_DIR / dl.suggested_filename
-                        await dl.save_as(save_path)
-                        total_saved += 1
-                        log_and_store(f"⬇️  {total_saved:>3} saved {save_path.name}", messages, level="info")  # append to logs and messages
-                        await page.wait_for_timeout(1000)  # short delay between downloads
-                    except Exception as e:
-                        log_and_store(f" ⚠️ Download failed for link {i + 1} — {e}", messages, level="warning") # append to logs and messages
-
-                # next page?
-                next_btn = body_frame.locator("a:has-text('Next')")
-                if await next_btn.count() == 0:
-                    break
-                page_num += 1
-                print(f"➡️  Page {page_num}")
-                await next_btn.first.click()
-                await page.wait_for_timeout(500)
-                await body_frame.locator("tbody tr").first.wait_for(state="visible", timeout=10_000)
-
-            log_and_store(f"Finished – {total_saved} files downloaded.", messages, level="info")  # append to logs and messages
-            await context.close()
-            await browser.close()
+                status = "success" if total_saved + total_skipped > 0 else "warning"
             return {
-                "status": "success" if total_saved > 0 else "warning",
+                "status": status,
                 "start_date": start_date,
                 "end_date": end_date,
                 "files_downloaded": total_saved,
+                "files_skipped": total_skipped,
+                "files_failed": total_failed,
+                "report_types_failed": types_failed,
+                "failed_items": failed_items,
                 "messages": messages,
-                "download_directory": str(DOWNLOAD_DIR) 
+                "download_directory": storage.location,
+                "report_types": per_type,
+                "wait_timings": waits.timings,
+                "timings": trace.finish(status)
             }
 
     except Exception as e:
         tb = traceback.format_exc()
         log_and_store(f"Error during download: {e}\n{tb}", messages, level="error")
-        return {"messages": messages, "total_saved": total_saved}
+        return {"status": "failed", "error": str(e), "messages": messages, "total_saved": counter["total_saved"],
+                "report_types": per_type, "timings": trace.finish("failed")}
 
+
+# List what the portal has for each report type, without downloading anything
+async def isw_list(start_date: date, end_date: date, report_codes: list[str], headless: bool = False) -> dict:
+    messages = new_message_buffer()
+    waits = Waits()
+    trace = RunTrace(PORTAL_KEY, report_codes[0] if len(report_codes) == 1 else "multi")
+    reports = []
+    try:
+        if not within_retention(start_date):
+            raise ValueError(f"start_date is older than {MAX_REPORT_AGE_DAYS} days")
+
+        async with leased_context(ACCOUNTS, PORTAL_URL, headless=headless) as (account, context, has_session):
+            await apply_route_policy(context, trace)
+            page = await context.new_page()
+            with trace.step("login"):
+                await _ensure_logged_in(page, context, account, has_session, messages, waits)
+
+            for code in report_codes:
+                with log_context(report_type=code):
+                    body_frame = await _search_report_type(page, start_date, end_date, code, messages, waits, trace)
+                    if body_frame is None:
+                        raise RuntimeError(f"Reports Root did not open for type {code}")
+                    while True:
+                        rows = await extract_rows(body_frame, DOWNLOAD_SELECTOR, code)
+                        for row in rows:
+                            row["report_code"] = code
+                            row["downloaded"] = manifest.has(PORTAL_KEY, code, row["key"])
+                        reports.extend(rows)
+
+                        next_btn = body_frame.locator(NEXT_SELECTOR)
+                        if not rows or await next_btn.count() == 0:
+                            break
+                        with trace.step("pagination", code):
+                            await waits.frame_load(page, "body", lambda: next_btn.first.click(), name="next page")
+
+        log_and_store(f"Listed {len(reports)} ISW reports", messages, level="info")
+        return {"status": "success", "start_date": str(start_date), "end_date": str(end_date),
+                "count": len(reports), "reports": reports, "timings": trace.finish("success")}
+
+    except Exception as e:
+        log_and_store(f"Error while listing reports: {e}", messages, level="error")
+        return {"status": "failed", "start_date": str(start_date), "end_date": str(end_date),
+                "count": len(reports), "reports": reports, "messages": list(messages), "timings": trace.finish("failed")}
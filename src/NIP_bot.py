@@ -1,156 +1,334 @@
 from datetime import date
 from pathlib import Path
-from dotenv import load_dotenv
-from playwright.async_api import async_playwright
-from src.utils.logger import log_and_store
+from src.enums import DownloadMode
+from src.utils.checkpoints import CheckpointScope, PageCheckpoint
+from src.utils.credentials import AccountThrottled, credential_pool, leased_context
+from src.utils.http_download import fetch_all
+from src.utils.jobs import bump_progress, report_progress
+from src.utils.logger import log_and_store, new_message_buffer
+from src.utils.manifest import manifest
+from src.utils.metrics import RunTrace
+from src.utils.pagination import jump_to_page, show_all_rows, table_page_count
+from src.utils.retry import RETRY_ATTEMPTS, RetryQueue, retry_async
+from src.utils.route_policy import apply_route_policy
+from src.utils.session_cache import session_cache
+from src.utils.settings import portal_settings
+from src.utils.storage import get_storage, save_download
+from src.utils.table_rows import extract_rows
+from src.utils.waits import Waits
 import traceback
-import logging
-import os
 
-# Detect system default Downloads folder or use env override
+# Detect system default Downloads folder (created by storage on the first save)
 DOWNLOAD_DIR = Path.home() / "Downloads"
-DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
-
-LOG_FILE = Path(__file__).resolve().parent / "log_file.logs"
-LOG_FILE.parent.mkdir(parents=True, exist_ok=True)  # ensure the directory exists
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
-
-# configuring environment variables
-env_path = Path(__file__).resolve().parent / ".env"
-load_dotenv(dotenv_path=env_path)
-
-USERNAME   = os.getenv("NIP_USER")
-PASSWORD   = os.getenv("NIP_PW")
-NIP_PORTAL_URL = os.getenv("NIP_PORTAL_URL", "").strip().strip('"').strip("'")
-
-# credentials validation
-if not USERNAME or not PASSWORD:
-    raise ValueError("Missing NIP_USER or NIP_PW in environment")
-if not NIP_PORTAL_URL:
-    raise ValueError("Missing NIP_PORTAL_URL in environment")
+
+PORTAL_KEY = "nip"
+
+# NIP_PORTAL_URL and NIP_USER/NIP_PW or NIP_ACCOUNTS="user:pass,..." – checked by src/utils/plugins.py before this module loads
+SETTINGS = portal_settings(PORTAL_KEY)
+NIP_PORTAL_URL = SETTINGS.portal_url
+ACCOUNTS = credential_pool(PORTAL_KEY)
+
+REPORT_TYPE = "transaction"  #< NIP has a single report type; kept for the manifest
+DOWNLOAD_SELECTOR = "a:has(i.fa-download), button:has(i.fa-download)"
+NEXT_SELECTOR = "li.paginate_button:has-text('Next'):not(.disabled) a"
+
+# Login, reusing a cached session until the portal shows the login form again
+async def _ensure_logged_in(page, context, account, has_session: bool, messages: list) -> None:
+    await page.goto(f"{NIP_PORTAL_URL}/main.jspx", timeout=900000)
+
+    login_form = page.locator("#email")
+    report_menu = page.locator("text=Report")
+    await login_form.or_(report_menu).first.wait_for(state="visible", timeout=900000)
+
+    if not await login_form.is_visible():
+        log_and_store("Reusing cached session – login skipped", messages, level="info")
+        return
+
+    if has_session:
+        log_and_store("Cached session expired – logging in again", messages, level="warning")
+        session_cache.invalidate(PORTAL_KEY, account.user)
+
+    await page.fill("#email", account.user,timeout=900000)
+    await page.fill("#password", account.password, timeout=90000)
+    await page.click("button:has-text('Login')", timeout=90000)
+    try:
+        await report_menu.first.wait_for(state="visible", timeout=90000)
+    except Exception:
+        if await ACCOUNTS.check_lockout(page, account):
+            raise AccountThrottled(f"{account.label} is throttled or locked by the portal – try again after its cooldown")
+        raise
+    await session_cache.save(PORTAL_KEY, account.user, context)
+
+# Open Transaction Report, apply the date range and wait for the reloaded table
+async def _open_transaction_table(page, start_date: date, end_date: date, messages: list, waits: Waits, trace: RunTrace) -> str:
+    # Report menu
+    with trace.step("navigation"):
+        await page.click("text=Report")
+        await page.click("text=Transaction Report")
+        await page.wait_for_selector("text=Transaction Report :: List")
+
+    # Date range
+    log_and_store(f"📅  From: {start_date:%d/%m/%Y}", messages,level="info") #append to logs and messages
+    log_and_store(f"📅  To:   {end_date:%d/%m/%Y}", messages,level="info")
+
+    with trace.step("date_filter"):
+        await page.click("#settlementDateFilter")
+        await page.click("#settlementDateFilter")
+        await page.fill("input[name='daterangepicker_start']",
+                start_date.strftime("%d/%m/%Y"), force=True)
+        await page.fill("input[name='daterangepicker_end']",
+                end_date.strftime("%d/%m/%Y"),   force=True)
+        apply_btn = page.locator("button:has-text('Apply')")
+        await waits.element(apply_btn, name="apply enabled", ceiling_ms=3_000)
+        await waits.xhr(page, lambda: apply_btn.click(), name="date apply", ceiling_ms=3_000) #< wait for the filter request, if any
+
+    # Trigger table reload
+    with trace.step("table_reload"):
+        await waits.redraw(page, lambda: page.evaluate("window.transactionReportTable.reload()"), name="table reload") #< this is the JS function that reloads the table
+    log_and_store("Reload triggered", messages,level="info") #append to logs and messages
+
+    download_btn = page.locator(DOWNLOAD_SELECTOR)
+    with trace.step("table_ready"):
+        await download_btn.first.wait_for(state="visible", timeout=15_000)
+
+    # One page of rows instead of clicking Next through every page, when the DataTable allows it
+    with trace.step("pagination"):
+        strategy = await show_all_rows(page, waits, "transactionReportTable")
+    log_and_store(f"Pagination strategy: {strategy}", messages, level="info")
+    pages_total = await table_page_count(page, "transactionReportTable")
+    if pages_total:
+        report_progress(pages_total=pages_total)  #< page n of m on the job's progress
+    return strategy
 
 # Main automation
 async def nip_run(start_date: date,
                   end_date  : date,
-                  headless: bool = False
+                  headless: bool = False,
+                  download_mode: DownloadMode = DownloadMode.click,
+                  ingest: bool = False
 ) -> None:
     
-    messages = []
+    messages = new_message_buffer()
     total_saved = 0
+    total_skipped = 0
+    total_failed = 0
+    pending_urls = []  #< http mode: (key, url) of every page, fetched after pagination under the row's key
+    waits = Waits()
+    trace = RunTrace(PORTAL_KEY, REPORT_TYPE)
+    checkpoint = CheckpointScope(f"{REPORT_TYPE}:{start_date}:{end_date}")  #< pages done, kept when the job is interrupted
+    pages = PageCheckpoint(checkpoint)  #< a page counts as done once all of its files are stored
+    retries = RetryQueue()
+    pipeline = None
+
+    async def saved(key: str, stored):
+        nonlocal total_saved
+        await manifest.record(PORTAL_KEY, REPORT_TYPE, key, stored.location, stored.sha256, stored.size)
+        pages.saved(key)
+        if pipeline and stored.path:
+            pipeline.submit(stored.path)  #< ingest reads local archives only
+        total_saved += 1
+        trace.file("saved", stored.size)
+        bump_progress("files_saved")
+        log_and_store(f"⬇️  {total_saved:>3} saved {stored.name}", messages, level="info") # append to logs and messages
+
+    def failed(label: str, error) -> None:
+        nonlocal total_failed
+        total_failed += 1
+        log_and_store(f"⚠️  Download failed for {label} — {error}", messages, level="warning") # append to logs and messages
+        trace.file("failed")
+        bump_progress("files_failed")
+
+    async def click_download(link):
+        with trace.step("download"):
+            await link.wait_for(state="visible", timeout=5000)  # give button time to activate
+            await link.scroll_into_view_if_needed() 
+            async with page.expect_download(timeout=60_000) as dl_info:
+                await link.click(force=True,timeout=60_000)
+
+            dl = await dl_info.value
+            stored = await save_download(storage, dl) # hand the browser's temp file to storage, hashed on the way
+        return stored
+
     try:
+        storage = get_storage(DOWNLOAD_DIR, PORTAL_KEY)  #< local directory or S3 bucket (STORAGE_BACKEND)
+
+        # Optional Parquet stage: archives are parsed in the background while downloads continue
+        if ingest:
+            from src.utils.ingest import IngestPipeline  #< pandas/pyarrow are only loaded when needed
+            pipeline = IngestPipeline().start()
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=headless)
-            context = await browser.new_context(accept_downloads=True)
+        # Isolated context from the warm browser pool (or a one-off browser) for a leased account,
+        # seeded with its cached login session when we have one
+        async with leased_context(ACCOUNTS, NIP_PORTAL_URL, headless=headless, accept_downloads=True) as (account, context, has_session):
+            await apply_route_policy(context, trace)  #< skip images, fonts, styles and analytics
             page = await context.new_page()
 
             # Login
-            log_and_store("Navigating to login …", messages, level="info") #append to logs and messages
-
-            await page.goto(f"{NIP_PORTAL_URL}/main.jspx", timeout=900000)
-            await page.wait_for_selector("#email",timeout=900000)
-            await page.fill("#email", USERNAME,timeout=900000)
-            await page.fill("#password", PASSWORD, timeout=90000)
-            await page.click("button:has-text('Login')", timeout=90000)
-
-            # Report menu
-            await page.click("text=Report")
-            await page.click("text=Transaction Report")
-            await page.wait_for_selector("text=Transaction Report :: List")
-
-            # Date range
-            log_and_store(f"📅  From: {start_date:%d/%m/%Y}", messages,level="info") #append to logs and messages
-            log_and_store(f"📅  To:   {end_date:%d/%m/%Y}", messages,level="info")
-
-            await page.click("#settlementDateFilter")
-            await page.click("#settlementDateFilter")
-            await page.fill("input[name='daterangepicker_start']",
-                    start_date.strftime("%d/%m/%Y"), force=True)
-            await page.fill("input[name='daterangepicker_end']",
-                    end_date.strftime("%d/%m/%Y"),   force=True)
-            await page.wait_for_timeout(3_000)
-            await page.click("button:has-text('Apply')")
-            await page.wait_for_timeout(3_000) #< wait for the page to update
-
-            # Trigger table reload
-            await page.evaluate("window.transactionReportTable.reload()") #< this is the JS function that reloads the table
-            await page.wait_for_timeout(3_000) #< wait for the table to reload
-            log_and_store("Reload triggered", messages,level="info") #append to logs and messages
-
-            # Download loop
-            download_btn = page.locator("a:has(i.fa-download), button:has(i.fa-download)")
-            await download_btn.first.wait_for(state="visible", timeout=15_000)
+            log_and_store(f"Navigating to login as {account.label} …", messages, level="info") #append to logs and messages
+            with trace.step("login"):
+                await _ensure_logged_in(page, context, account, has_session, messages)
+
+            strategy = await _open_transaction_table(page, start_date, end_date, messages, waits, trace)
             log_and_store("Table ready – starting downloads", messages,level="info") #append to logs and messages
 
-            total_saved = 0
+            # Resumed job: go back to the last page it finished (one page overlap; the manifest skips repeats)
             page_num    = 1
+            pages_done  = pages.done
+            if pages_done > 1 and strategy == "click_through":
+                with trace.step("pagination"):
+                    page_num = await jump_to_page(page, waits, "transactionReportTable", pages_done, NEXT_SELECTOR)
+                log_and_store(f"Resuming from page {page_num} (checkpoint)", messages, level="info")
+            report_progress(page=page_num)
 
             while True:
-                await page.wait_for_timeout(2000)  # give time for table to settle
                 await page.locator("tbody tr").first.wait_for(state="visible", timeout=10_000)
             
-                # Collect all download buttons currently visible in this page of the table
-                links   = page.locator("a:has(i.fa-download), button:has(i.fa-download)")
-                count   = await links.count()
+                # Read every row of this page of the table in one round trip
+                links   = page.locator(DOWNLOAD_SELECTOR)
+                rows    = await extract_rows(page, DOWNLOAD_SELECTOR, REPORT_TYPE)
+                count   = len(rows)
                 log_and_store(f"Found {count} download buttons on page {page_num}", messages, level="info")  # append to logs and messages
 
                 if count == 0:
                     log_and_store("⚠️  no download buttons found on this page", messages, level="warning")  # append to logs and messages
                     break
 
-                for i in range(count):
+                # Skip reports the manifest says we already have
+                keys = [row["key"] for row in rows]
+                page_links = [i for i in range(count) if not manifest.has(PORTAL_KEY, REPORT_TYPE, keys[i])]
+                if len(page_links) < count:
+                    total_skipped += count - len(page_links)
+                    trace.file("skipped", count=count - len(page_links))
+                    bump_progress("files_skipped", count - len(page_links))
+                    log_and_store(f"Skipping {count - len(page_links)} reports already downloaded", messages, level="info")
+                pages.page(page_num, [keys[i] for i in page_links])
+
+                # http mode: take every URL on this page in one pass, click only if some buttons are JS-only
+                if download_mode == DownloadMode.http:
+                    urls = [row["url"] for row in rows]
+                    if all(urls):
+                        pending_urls.extend((keys[i], urls[i]) for i in page_links)
+                        page_links = []
+                    else:
+                        log_and_store(f"Page {page_num} has JS-only download buttons – clicking them instead", messages, level="warning")
+
+                for i in page_links:
                     link = links.nth(i)
+                    url  = rows[i]["url"]
                     try:
-                        await link.wait_for(state="visible", timeout=5000)  # give button time to activate
-                        await link.scroll_into_view_if_needed() 
-                        async with page.expect_download(timeout=60_000) as dl_info:
-                            await link.click(force=True,timeout=60_000)
-
-                        dl = await dl_info.value
-                        filename = dl.suggested_filename #extract file name
-                        save_path = DOWNLOAD_DIR / filename 
-
-                        await dl.save_as(save_path) # save file
-                        total_saved += 1
-                        log_and_store(f"⬇️  {total_saved:>3} saved {save_path.name}", messages, level="info") # append to logs and messages
-                        
-                        await page.wait_for_timeout(1000)  # short delay between downloads
-                   
+                        # JS-only buttons can't be fetched later, so they are retried here; the rest go to the retry queue
+                        stored = await retry_async(lambda: click_download(link), attempts=1 if url else RETRY_ATTEMPTS, on_retry=trace.retry)
                     except Exception as e:
-                        log_and_store(f"⚠️  Download failed for link {i + 1} — {e}", messages, level="warning") # append to logs and messages
+                        if retries.add(keys[i], url, REPORT_TYPE, e):
+                            log_and_store(f"⚠️  Download failed for link {i + 1} — {e} (queued for retry)", messages, level="warning")
+                        else:
+                            failed(f"link {i + 1}", e)
                         continue
+                    await saved(keys[i], stored)
+                pages.settle()  #< pages whose files are queued for the HTTP fetch or a retry stay open
+                report_progress(pages_done=page_num)
 
                 # next page?
-                next_btn = page.locator("li.paginate_button:has-text('Next'):not(.disabled) a")
+                next_btn = page.locator(NEXT_SELECTOR)
                 if await next_btn.count() == 0:
                     break
                 page_num += 1
+                report_progress(page=page_num)
                 log_and_store(f"➡️  Page {page_num}", messages, level="info") # append to logs and messages
 
-                await next_btn.first.click() #click the next button (the first one)
-                await page.wait_for_timeout(1_000) # give one second for page to settle
-                await page.evaluate("window.scrollTo(0, 0)")  #force scroll to top ###
-                await page.locator("tbody tr").first.wait_for(state="visible", timeout=5_000)
+                with trace.step("pagination"):
+                    await waits.redraw(page, lambda: next_btn.first.click(), name="next page") #click the next button (the first one)
+                    await page.evaluate("window.scrollTo(0, 0)")  #force scroll to top ###
+                    await page.locator("tbody tr").first.wait_for(state="visible", timeout=5_000)
+
+            # http mode: fetch everything collected above over pooled connections
+            if pending_urls:
+                log_and_store(f"Fetching {len(pending_urls)} files over HTTP", messages, level="info")
+                with trace.step("download"):
+                    fetched = await fetch_all(context, [url for _, url in pending_urls], storage, limiter=ACCOUNTS.bucket)
+                for i, ((key, url), (_, result)) in enumerate(zip(pending_urls, fetched)):
+                    if isinstance(result, Exception):
+                        retries.add(key, url, REPORT_TYPE, result)
+                        log_and_store(f"⚠️  Download failed for link {i + 1} — {result} (queued for retry)", messages, level="warning")
+                        continue
+                    await saved(key, result)
+                pages.settle()
+
+            # Retry queue: failed downloads again, with exponential backoff between rounds
+            failed_items = []
+            if retries:
+                log_and_store(f"Retrying {len(retries)} failed downloads", messages, level="info")
+                with trace.step("retry"):
+                    recovered, failed_items = await retries.drain(context, storage, on_retry=lambda item: trace.retry(), limiter=ACCOUNTS.bucket)
+                for item, stored in recovered:
+                    await saved(item["key"], stored)
+                pages.settle()
+                for item in failed_items:
+                    failed(item["url"], f"{item['error']} (after {item['attempts']} retries)")
 
             log_and_store(f"Finished – {total_saved} files downloaded.", messages, level="info") # append to logs and messages
-            await browser.close()
+            ingest_summary = None
+            if pipeline:
+                ingest_summary = await pipeline.close()
+                log_and_store(f"Parquet ingest – {ingest_summary['archives']} archives, {ingest_summary['rows']} rows", messages, level="info")
+            if total_failed:
+                status = "partial"  #< not synced; the job stays resumable
+            else:
+                status = "success" if total_saved + total_skipped > 0 else "warning"
             return {
-                "status": "success" if total_saved > 0 else "warning",
+                "status": status,
                 "start_date": start_date,
                 "end_date": end_date,
                 "files_downloaded": total_saved,
-                "messages": messages
+                "files_skipped": total_skipped,
+                "files_failed": total_failed,
+                "failed_items": failed_items,
+                "messages": messages,
+                "wait_timings": waits.timings,
+                "ingest": ingest_summary,
+                "timings": trace.finish(status)
             }
 
     except Exception as e:
         tb = traceback.format_exc()
         log_and_store(f"Error during download: {e}\n{tb}", messages, level="error")
-        return {"messages": messages, "total_saved": total_saved}
\ No newline at end of file
+        if pipeline:
+            await pipeline.close()  #< still convert what was downloaded before the failure
+        return {"status": "failed", "error": str(e), "messages": messages, "total_saved": total_saved,
+                "files_failed": total_failed, "timings": trace.finish("failed")}
+
+
+# List what the portal has for a date range, without downloading anything
+async def nip_list(start_date: date, end_date: date, headless: bool = False) -> dict:
+    messages = new_message_buffer()
+    waits = Waits()
+    trace = RunTrace(PORTAL_KEY, REPORT_TYPE)
+    reports = []
+    try:
+        async with leased_context(ACCOUNTS, NIP_PORTAL_URL, headless=headless) as (account, context, has_session):
+            await apply_route_policy(context, trace)
+            page = await context.new_page()
+            with trace.step("login"):
+                await _ensure_logged_in(page, context, account, has_session, messages)
+            await _open_transaction_table(page, start_date, end_date, messages, waits, trace)
+
+            while True:
+                rows = await extract_rows(page, DOWNLOAD_SELECTOR, REPORT_TYPE)
+                for row in rows:
+                    row["downloaded"] = manifest.has(PORTAL_KEY, REPORT_TYPE, row["key"])
+                reports.extend(rows)
+
+                next_btn = page.locator(NEXT_SELECTOR)
+                if not rows or await next_btn.count() == 0:
+                    break
+                with trace.step("pagination"):
+                    await waits.redraw(page, lambda: next_btn.first.click(), name="next page")
+
+        log_and_store(f"Listed {len(reports)} NIP reports", messages, level="info")
+        return {"status": "success", "start_date": str(start_date), "end_date": str(end_date),
+                "count": len(reports), "reports": reports, "timings": trace.finish("success")}
+
+    except Exception as e:
+        log_and_store(f"Error while listing reports: {e}", messages, level="error")
+        return {"status": "failed", "start_date": str(start_date), "end_date": str(end_date),
+                "count": len(reports), "reports": reports, "messages": list(messages), "timings": trace.finish("failed")}
@@ -83,4 +83,22 @@ class ReattemptOptions(str, Enum):
     _1 = "Try another report type"
     _2 = "Try a different date range"
 
-# ReattemptOptionEnum = Enum("ReattemptOptionEnum", {slugify(v): k for k, v in reattempt_options.items()})
\ No newline at end of file
+# ReattemptOptionEnum = Enum("ReattemptOptionEnum", {slugify(v): k for k, v in reattempt_options.items()})
+
+# Download modes
+class DownloadMode(str, Enum):
+    click = "click"  #< click each download link and save through the browser
+    http = "http"    #< collect links in one pass and fetch them with httpx using the session cookies
+
+# Job states
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    partial = "partial"      #< ran to the end, but some files or report types failed
+    failed = "failed"
+
+# Date-range shard sizes
+class ShardUnit(str, Enum):
+    day = "day"
+    week = "week"
@@ -0,0 +1,237 @@
+from contextlib import asynccontextmanager
+from src.utils.memory import MB, MemoryMonitor, browser_pids, browser_rss_bytes, kill_pids
+from src.utils.metrics import registry
+from typing import Optional
+import asyncio
+import logging
+import os
+
+# Pool configuration (env overrides)
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+MAX_CONTEXTS_PER_BROWSER = int(os.getenv("BROWSER_MAX_CONTEXTS", "4"))
+POOL_HEADLESS = os.getenv("BROWSER_HEADLESS", "false").strip().lower() in ("1", "true", "yes")
+BROWSER_MAX_JOBS = int(os.getenv("BROWSER_MAX_JOBS", "50"))        #< recycle a pooled browser after this many contexts
+BROWSER_MAX_RSS_MB = int(os.getenv("BROWSER_MAX_RSS_MB", "1500"))  #< … or once its processes use more than this
+BROWSER_PREWARM = os.getenv("BROWSER_PREWARM", "true").strip().lower() in ("1", "true", "yes")  #< launch at startup (in the background) or on first use
+CLOSE_TIMEOUT = 30  #< seconds before a browser that will not close is killed
+
+
+async def _close_browser(browser) -> None:
+    pids = await browser_pids(browser)
+    try:
+        await asyncio.wait_for(browser.close(), timeout=CLOSE_TIMEOUT)
+    except Exception as e:
+        logging.warning(f"Browser did not close cleanly ({e!r}) – killing {len(pids)} processes")
+        kill_pids(pids)
+
+
+class _PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.active = 0      #< contexts currently open on this browser
+        self.served = 0      #< contexts it has handed out since launch
+        self.retired = False #< replaced in the pool; closed once its last context is done
+        self.replacing = False  #< a replacement is being launched for it
+
+
+class BrowserPool:
+    """Keeps `size` warm Chromium instances and hands out one isolated
+    BrowserContext per job, with at most `max_contexts` open per browser.
+
+    A browser is recycled – replaced by a fresh one and closed after its last
+    context – once it has served `max_jobs` contexts, its processes use more than
+    `max_rss_mb`, or a job grew it past the per-job memory budget."""
+
+    def __init__(self,
+                 size: int = POOL_SIZE,
+                 max_contexts: int = MAX_CONTEXTS_PER_BROWSER,
+                 headless: bool = POOL_HEADLESS,
+                 max_jobs: int = BROWSER_MAX_JOBS,
+                 max_rss_mb: int = BROWSER_MAX_RSS_MB):
+        self.size = max(1, size)
+        self.max_contexts = max(1, max_contexts)
+        self.headless = headless
+        self.max_jobs = max(1, max_jobs)
+        self.max_rss = max_rss_mb * MB
+        self._playwright = None
+        self._browsers: list[_PooledBrowser] = []
+        self._retired: list[_PooledBrowser] = []  #< replaced, but still serving contexts
+        self._slots = asyncio.Semaphore(self.size * self.max_contexts)
+        self._lock = asyncio.Lock()
+        self._start_lock = asyncio.Lock()
+        self._warming: Optional[asyncio.Task] = None
+        self._sibling: Optional["BrowserPool"] = None  #< same limits, other headless mode; started on first use
+
+    @property
+    def running(self) -> bool:
+        return self._playwright is not None
+
+    @property
+    def active_contexts(self) -> int:
+        return sum(b.active for b in self._browsers)
+
+    @property
+    def state(self) -> str:
+        if self.running:
+            return "running"
+        return "starting" if self._warming is not None and not self._warming.done() else "idle"
+
+    async def start(self) -> None:
+        async with self._start_lock:
+            if self.running:
+                return
+            from playwright.async_api import async_playwright  #< deferred: importing Playwright is a large part of startup time
+            playwright = await async_playwright().start()
+            self._playwright = playwright
+            try:
+                for _ in range(self.size):
+                    self._browsers.append(_PooledBrowser(await self._launch()))
+            except BaseException:
+                await self.stop()
+                raise
+            logging.info(f"Browser pool started – {self.size} browsers, {self.max_contexts} contexts each")
+
+    def warm(self) -> None:
+        """Start the pool in the background, so the API can serve (and report readiness) meanwhile."""
+        async def run():
+            try:
+                await self.start()
+            except Exception as e:
+                logging.error(f"Browser pool warm-up failed – browsers launch on first use instead: {e}")
+
+        if not self.running and self._warming is None:
+            self._warming = asyncio.create_task(run(), name="browser-pool-warmup")
+
+    def for_mode(self, headless: bool) -> "BrowserPool":
+        """This pool, or the sibling pool for the other headless mode – so jobs asking for the
+        other mode share bounded, reused browsers instead of launching one each."""
+        if headless == self.headless:
+            return self
+        if self._sibling is None:
+            self._sibling = BrowserPool(self.size, self.max_contexts, headless, self.max_jobs, self.max_rss // MB)
+        return self._sibling
+
+    async def stop(self) -> None:
+        if self._sibling is not None:
+            await self._sibling.stop()
+            self._sibling = None
+        if self._warming is not None and not self._warming.done() and self._warming is not asyncio.current_task():
+            self._warming.cancel()
+            await asyncio.gather(self._warming, return_exceptions=True)
+        for entry in self._browsers + self._retired:
+            await _close_browser(entry.browser)
+        self._browsers.clear()
+        self._retired.clear()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        logging.info("Browser pool stopped")
+
+    async def _launch(self):
+        return await self._playwright.chromium.launch(headless=self.headless)
+
+    async def _checkout(self) -> _PooledBrowser:
+        # caller already holds a slot, so the least loaded browser always has room
+        async with self._lock:
+            entry = min(self._browsers, key=lambda b: b.active)
+            if not entry.browser.is_connected():
+                logging.warning("Pooled browser disconnected – relaunching")
+                entry.browser = await self._launch()
+            entry.active += 1
+            return entry
+
+    async def memory(self) -> list[dict]:
+        """Current RSS and contexts served for each pooled browser (RSS is None without /proc)."""
+        return [{"browser": i, "rss_bytes": await browser_rss_bytes(entry.browser), "served": entry.served,
+                 "active": entry.active} for i, entry in enumerate(self._browsers)]
+
+    async def _release(self, entry: _PooledBrowser, monitor: MemoryMonitor) -> None:
+        entry.active -= 1
+        entry.served += 1
+        reason = None
+        if entry.served >= self.max_jobs:
+            reason = "jobs"
+        elif monitor.current > self.max_rss:
+            reason = "rss"
+        elif monitor.over_budget:
+            reason = "job_budget"
+
+        if reason and self.running and not entry.retired and not entry.replacing and entry in self._browsers:
+            logging.info(f"Recycling browser after {entry.served} contexts, "
+                         f"{monitor.current // MB} MB RSS (reason: {reason})")
+            entry.replacing = True
+            replacement = None
+            try:
+                replacement = await self._launch()  #< outside the lock: checkouts go on while Chromium starts
+            except Exception as e:
+                logging.error(f"Could not launch a replacement browser – keeping the old one: {e}")
+            async with self._lock:
+                if replacement is not None and self.running and entry in self._browsers:
+                    self._browsers[self._browsers.index(entry)] = _PooledBrowser(replacement)
+                    self._retired.append(entry)
+                    entry.retired = True
+                    registry.inc("bot_browser_recycles_total", reason=reason)
+                    replacement = None
+                entry.replacing = False
+            if replacement is not None:
+                await _close_browser(replacement)  #< the pool stopped meanwhile
+        if entry.retired and entry.active == 0 and entry in self._retired:
+            self._retired.remove(entry)
+            await _close_browser(entry.browser)
+
+    @asynccontextmanager
+    async def context(self, **context_kwargs):
+        await self.start()  #< no-op once running; launches the browsers on first use otherwise
+        async with self._slots:
+            entry = await self._checkout()
+            context = None
+            monitor = None
+            try:
+                context = await entry.browser.new_context(**context_kwargs)
+                async with MemoryMonitor(entry.browser, context) as monitor:
+                    yield context
+            finally:
+                if context is not None:
+                    try:
+                        await asyncio.wait_for(context.close(), timeout=CLOSE_TIMEOUT)
+                    except Exception:
+                        pass
+                if monitor is not None:
+                    await self._release(entry, monitor)
+                else:
+                    entry.active -= 1
+
+
+# Process-wide pool, owned by the FastAPI lifespan in main.py
+_pool: Optional[BrowserPool] = None
+
+
+def set_pool(pool: Optional[BrowserPool]) -> None:
+    global _pool
+    _pool = pool
+
+
+def get_pool() -> Optional[BrowserPool]:
+    return _pool
+
+
+@asynccontextmanager
+async def open_context(headless: bool = False, **context_kwargs):
+    """Yield a fresh BrowserContext – from the API's pool (or its sibling pool for the other
+    headless mode), or, when no pool is set up (scripts, benchmarks), from a one-off browser
+    that is always closed."""
+    pool = get_pool()
+    if pool is not None:
+        async with pool.for_mode(headless).context(**context_kwargs) as context:
+            yield context
+        return
+
+    from playwright.async_api import async_playwright
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+        try:
+            context = await browser.new_context(**context_kwargs)
+            async with MemoryMonitor(browser, context):
+                yield context
+        finally:
+            await _close_browser(browser)
@@ -0,0 +1,149 @@
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+from src.utils.jobs import current_job
+from src.utils.manifest import MANIFEST_PATH
+import json
+import os
+import sqlite3
+import threading
+
+# Job checkpoints live next to the manifest by default (env override)
+CHECKPOINT_PATH = Path(os.getenv("CHECKPOINT_PATH", MANIFEST_PATH))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    job_id      TEXT PRIMARY KEY,
+    portal      TEXT NOT NULL,
+    params      TEXT NOT NULL,
+    state       TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    updated_at  TEXT NOT NULL
+);
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class CheckpointStore:
+    """Progress of each job (pages done per scope, shards done), persisted so an interrupted
+    job – failed run or restarted process – can be resumed with the same parameters.
+
+    status is "running" while a job works, "interrupted" when it stopped short; finished
+    jobs are removed."""
+
+    def __init__(self, path: Path = CHECKPOINT_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def begin(self, job_id: str, portal: str, params: dict) -> None:
+        """Open (or reopen, on resume) the checkpoint of a job; existing state is kept."""
+        with self._lock, self._db() as db:
+            db.execute(
+                "INSERT INTO checkpoints VALUES (?, ?, ?, '{}', 'running', ?) "
+                "ON CONFLICT(job_id) DO UPDATE SET status = 'running', updated_at = excluded.updated_at",
+                (job_id, portal, json.dumps(params), _now()),
+            )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT job_id, portal, params, state, status, updated_at FROM checkpoints WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"job_id": row[0], "portal": row[1], "params": json.loads(row[2]), "state": json.loads(row[3]),
+                "status": row[4], "updated_at": row[5]}
+
+    def update(self, job_id: str, scope: str, **fields) -> None:
+        with self._lock, self._db() as db:
+            row = db.execute("SELECT state FROM checkpoints WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            state = json.loads(row[0])
+            state.setdefault(scope, {}).update(fields)
+            db.execute("UPDATE checkpoints SET state = ?, updated_at = ? WHERE job_id = ?",
+                       (json.dumps(state, default=str), _now(), job_id))
+
+    def finish(self, job_id: str, completed: bool) -> None:
+        with self._lock, self._db() as db:
+            if completed:
+                db.execute("DELETE FROM checkpoints WHERE job_id = ?", (job_id,))
+            else:
+                db.execute("UPDATE checkpoints SET status = 'interrupted', updated_at = ? WHERE job_id = ?",
+                           (_now(), job_id))
+
+    def interrupt_running(self) -> int:
+        """On startup: jobs still marked running were cut off by the previous process."""
+        with self._lock, self._db() as db:
+            return db.execute("UPDATE checkpoints SET status = 'interrupted' WHERE status = 'running'").rowcount
+
+    def interrupted(self) -> list[dict]:
+        with self._lock:
+            ids = [r[0] for r in self._db().execute(
+                "SELECT job_id FROM checkpoints WHERE status = 'interrupted' ORDER BY updated_at DESC")]
+        return [self.get(job_id) for job_id in ids]
+
+
+checkpoints = CheckpointStore()
+
+
+class CheckpointScope:
+    """One part of the running job's checkpoint, e.g. a report type over one date range.
+    Outside a job it only remembers values in memory."""
+
+    def __init__(self, name: str):
+        self.name = name
+        job = current_job.get()
+        self.job_id = job.checkpoint_id if job is not None else None
+        saved = checkpoints.get(self.job_id) if self.job_id else None
+        self.state: dict = (saved or {}).get("state", {}).get(name, {})
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.state.get(key, default)
+
+    def update(self, **fields) -> None:
+        self.state.update(fields)
+        if self.job_id:
+            checkpoints.update(self.job_id, self.name, **fields)
+
+
+class PageCheckpoint:
+    """pages_done of a CheckpointScope, moved forward only over pages whose files are all stored.
+
+    Files of a page can still be waiting after pagination has moved on – fetched over HTTP at the
+    end (download_mode=http) or queued for retry – and a resume jumps straight to pages_done, so
+    a page stays open until the last of its files is saved."""
+
+    def __init__(self, scope: CheckpointScope):
+        self.scope = scope
+        self.done = scope.get("pages_done", 0)
+        self._waiting: dict[int, set[str]] = {}
+
+    def page(self, page_num: int, keys) -> None:
+        """Files of `page_num` still to be saved (the ones the manifest already has are left out)."""
+        self._waiting.setdefault(page_num, set()).update(keys)
+
+    def saved(self, key: str) -> None:
+        for keys in self._waiting.values():
+            keys.discard(key)
+
+    def settle(self) -> int:
+        """Advance pages_done over every settled page that follows it; returns pages_done."""
+        done = self.done
+        while done + 1 in self._waiting and not self._waiting[done + 1]:
+            done += 1
+        if done > self.done:
+            self.done = done
+            self.scope.update(pages_done=done)
+        return done
@@ -0,0 +1,51 @@
+from cachetools import TTLCache
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from src.enums import JobStatus
+from src.utils.metrics import registry
+import os
+
+# How long a finished run answers identical requests (env overrides)
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "300"))
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+
+
+def request_key(portal: str, report_types: Iterable[str], start_date: str, end_date: str, **variant) -> tuple:
+    """Identity of a download request: portal, report types (order-free), normalized range and
+    any option that changes what the run produces (e.g. ingest)."""
+    return (portal, tuple(sorted(set(report_types))), str(start_date), str(end_date), tuple(sorted(variant.items())))
+
+
+class RequestCoalescer:
+    """Single-flight for download jobs: an identical request joins the queued or running job,
+    and for `ttl` seconds after a successful run it is answered with that run's result."""
+
+    def __init__(self, ttl: int = RESULT_CACHE_TTL, maxsize: int = RESULT_CACHE_SIZE):
+        self._inflight: dict[tuple, object] = {}
+        self._results = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def inflight(self, key: tuple):
+        job = self._inflight.get(key)
+        if job is not None and job.status in (JobStatus.queued, JobStatus.running):
+            registry.inc("bot_requests_coalesced_total", portal=key[0], source="inflight")
+            return job
+        return None
+
+    def cached(self, key: tuple) -> Optional[dict]:
+        entry = self._results.get(key)
+        if entry is not None:
+            registry.inc("bot_requests_coalesced_total", portal=key[0], source="cache")
+        return entry
+
+    def started(self, key: tuple, job) -> None:
+        self._inflight[key] = job
+
+    def finished(self, key: tuple, job, result: Optional[dict], cacheable: bool) -> None:
+        if self._inflight.get(key) is job:
+            del self._inflight[key]
+        if cacheable and result is not None:
+            self._results[key] = {"job_id": job.id, "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                                  "result": result}
+
+
+coalescer = RequestCoalescer()
@@ -0,0 +1,208 @@
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlsplit
+from src.utils.browser_pool import open_context
+from src.utils.metrics import registry
+from src.utils.session_cache import session_cache
+from src.utils.settings import portal_settings
+import asyncio
+import logging
+import os
+import re
+import time
+
+# Account scheduling and portal rate limits (env overrides; PORTAL_* values can be set per portal, e.g. NIP_RATE_PER_SECOND)
+ACCOUNT_CONCURRENCY = int(os.getenv("ACCOUNT_CONCURRENCY", "2"))            #< runs sharing one account at once
+PORTAL_RATE_PER_SECOND = float(os.getenv("PORTAL_RATE_PER_SECOND", "10"))   #< page/XHR/file requests per portal; 0 disables
+PORTAL_BURST = int(os.getenv("PORTAL_BURST", "20"))
+THROTTLE_COOLDOWN_SECONDS = int(os.getenv("THROTTLE_COOLDOWN_SECONDS", "300"))  #< account rest after throttling or lockout
+
+_LIMITED_TYPES = {"document", "xhr", "fetch"}
+_THROTTLE_STATUS = {429, 423}
+_THROTTLE_TEXT = re.compile(r"too many (requests|attempts|login)|temporarily (locked|blocked)|account (is |has been )?(locked|suspended)"
+                            r"|try again later|rate limit", re.I)
+
+
+def _portal_setting(portal: str, name: str, default: str) -> str:
+    return os.getenv(f"{portal.upper()}_{name}", default)
+
+
+class AccountThrottled(Exception):
+    pass
+
+
+@dataclass
+class Account:
+    portal: str
+    index: int
+    user: str
+    password: str
+    active: int = 0
+    runs: int = 0
+    cooldown_until: float = 0.0
+
+    @property
+    def label(self) -> str:
+        return f"{self.portal} account {self.index + 1}"  #< usernames stay out of logs
+
+
+class TokenBucket:
+    """`rate` tokens per second up to `burst`; acquire() waits for a token."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._held_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """Take a token; returns the seconds spent waiting."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._held_until:
+                    delay = self._held_until - now
+                else:
+                    self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    delay = (1 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def hold(self, seconds: float) -> None:
+        """Stop handing out tokens for `seconds` – the portal said slow down."""
+        self._held_until = max(self._held_until, time.monotonic() + seconds)
+        self.tokens = 0
+        self._updated = self._held_until  #< refilling starts when the hold ends, not before
+
+
+class CredentialPool:
+    """The accounts of one portal. lease() hands out the least busy account that is below its
+    concurrency cap and not cooling down, waiting when none is; all of them share the portal's
+    token bucket."""
+
+    def __init__(self, portal: str, accounts: list[tuple[str, str]], concurrency: int = ACCOUNT_CONCURRENCY,
+                 rate: float = PORTAL_RATE_PER_SECOND, burst: int = PORTAL_BURST, cooldown: int = THROTTLE_COOLDOWN_SECONDS):
+        if not accounts:
+            raise ValueError(f"Missing {portal.upper()}_USER/{portal.upper()}_PW or {portal.upper()}_ACCOUNTS in environment")
+        self.portal = portal
+        self.accounts = [Account(portal, i, user, password) for i, (user, password) in enumerate(accounts)]
+        self.concurrency = max(1, concurrency)
+        self.cooldown_seconds = cooldown
+        self.bucket = TokenBucket(rate, burst)
+        self._changed: Optional[asyncio.Condition] = None
+
+    def _condition(self) -> asyncio.Condition:
+        if self._changed is None:
+            self._changed = asyncio.Condition()  #< created on first use, inside the running loop
+        return self._changed
+
+    def _ready(self) -> list[Account]:
+        now = time.monotonic()
+        return [a for a in self.accounts if a.active < self.concurrency and a.cooldown_until <= now]
+
+    @asynccontextmanager
+    async def lease(self):
+        changed = self._condition()
+        async with changed:
+            while not self._ready():
+                now = time.monotonic()
+                cooling = [a.cooldown_until - now for a in self.accounts if a.cooldown_until > now]
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=min(cooling) if cooling else None)
+                except asyncio.TimeoutError:
+                    pass  #< a cooldown ran out
+            account = min(self._ready(), key=lambda a: (a.active, a.runs))
+            account.active += 1
+            account.runs += 1
+        try:
+            yield account
+        finally:
+            async with changed:
+                account.active -= 1
+                changed.notify_all()
+
+    def cooldown(self, account: Account, reason: str, seconds: Optional[float] = None) -> None:
+        seconds = self.cooldown_seconds if seconds is None else seconds
+        account.cooldown_until = max(account.cooldown_until, time.monotonic() + seconds)
+        logging.warning(f"{account.label} cooling down for {seconds:.0f}s – {reason}")
+        registry.inc("bot_account_cooldowns_total", portal=self.portal, reason=reason.split(":")[0])
+
+    def status(self) -> list[dict]:
+        now = time.monotonic()
+        return [{"account": a.index + 1, "active": a.active, "runs": a.runs,
+                 "cooldown_seconds": round(max(0.0, a.cooldown_until - now))} for a in self.accounts]
+
+    async def throttle(self, context, account: Account, portal_url: str) -> None:
+        """Meter the context's page, XHR and fetch requests to the portal through the token bucket,
+        and put the account (and the bucket) to rest when the portal answers 429/423."""
+        host = urlsplit(portal_url).netloc
+
+        async def handle(route):
+            request = route.request
+            if request.resource_type in _LIMITED_TYPES and urlsplit(request.url).netloc == host:
+                waited = await self.bucket.acquire()
+                if waited:
+                    registry.inc("bot_rate_limit_wait_seconds_total", waited, portal=self.portal)
+            await route.fallback()
+
+        def on_response(response):
+            if response.status in _THROTTLE_STATUS and urlsplit(response.url).netloc == host:
+                retry_after = response.headers.get("retry-after", "")
+                pause = float(retry_after) if retry_after.isdigit() else min(60, self.cooldown_seconds)
+                self.bucket.hold(pause)
+                self.cooldown(account, f"http {response.status}")
+
+        await context.route("**/*", handle)
+        context.on("response", on_response)
+
+    async def check_lockout(self, page, account: Account) -> bool:
+        """After a failed login: cool the account down if the page says it is throttled or locked."""
+        try:
+            text = await page.locator("body").inner_text(timeout=2_000)
+        except Exception:
+            return False
+        match = _THROTTLE_TEXT.search(text or "")
+        if match:
+            self.cooldown(account, f"lockout: {match.group(0)}")
+        return match is not None
+
+
+@asynccontextmanager
+async def leased_context(pool: CredentialPool, portal_url: str, headless: bool = False, **context_kwargs):
+    """Lease an account and open a browser context seeded with its cached session, with the
+    portal's rate limit applied. Yields (account, context, has_cached_session)."""
+    async with pool.lease() as account:
+        storage_state = session_cache.load(pool.portal, account.user)
+        async with open_context(headless=headless, storage_state=storage_state, **context_kwargs) as context:
+            await pool.throttle(context, account, portal_url)
+            yield account, context, storage_state is not None
+
+
+_pools: dict[str, CredentialPool] = {}
+
+
+def credential_pool(portal: str) -> CredentialPool:
+    """The process-wide account pool of a portal, built from the environment on first use."""
+    if portal not in _pools:
+        _pools[portal] = CredentialPool(
+            portal, portal_settings(portal).credentials(),  #< <PORTAL>_ACCOUNTS or <PORTAL>_USER/<PORTAL>_PW
+            concurrency=int(_portal_setting(portal, "ACCOUNT_CONCURRENCY", str(ACCOUNT_CONCURRENCY))),
+            rate=float(_portal_setting(portal, "RATE_PER_SECOND", str(PORTAL_RATE_PER_SECOND))),
+            burst=int(_portal_setting(portal, "BURST", str(PORTAL_BURST))),
+            cooldown=int(_portal_setting(portal, "THROTTLE_COOLDOWN_SECONDS", str(THROTTLE_COOLDOWN_SECONDS))),
+        )
+    return _pools[portal]
+
+
+def credential_pools() -> dict[str, CredentialPool]:
+    return dict(_pools)
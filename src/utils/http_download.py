@@ -0,0 +1,73 @@
+from email.message import Message
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import unquote, urlparse
+import asyncio
+import httpx
+import os
+
+# Direct-download tuning (env overrides)
+HTTP_CONCURRENCY = int(os.getenv("HTTP_DOWNLOAD_CONCURRENCY", "6"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_DOWNLOAD_TIMEOUT", "120"))
+CHUNK_SIZE = 64 * 1024
+
+
+def _filename_from_response(response: httpx.Response) -> str:
+    disposition = response.headers.get("content-disposition")
+    if disposition:
+        msg = Message()
+        msg["content-disposition"] = disposition
+        filename = msg.get_filename()  #< handles both filename= and RFC 5987 filename*=
+        if filename:
+            return Path(filename).name
+    return Path(unquote(urlparse(str(response.url)).path)).name or "download"
+
+
+def _cookie_jar(cookies: list[dict]) -> httpx.Cookies:
+    jar = httpx.Cookies()
+    for c in cookies:
+        jar.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+    return jar
+
+
+async def fetch_all(context,
+                    urls: list[str],
+                    storage,
+                    concurrency: int = HTTP_CONCURRENCY,
+                    rename: Optional[Callable[[str], str]] = None,
+                    limiter=None) -> list[tuple[str, object]]:
+    """Fetch `urls` with the cookies of an authenticated BrowserContext.
+    With a `limiter` (the portal's token bucket) every request waits for a token first.
+
+    Each response is streamed in chunks straight into `storage` (see src/utils/storage.py).
+    Returns (url, StoredFile | Exception) pairs in the order of `urls`."""
+    user_agent = None
+    if context.pages:
+        user_agent = await context.pages[0].evaluate("navigator.userAgent")  #< same UA the portal saw at login
+    headers = {"User-Agent": user_agent} if user_agent else {}
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(cookies=_cookie_jar(await context.cookies()),
+                                 headers=headers,
+                                 limits=limits,
+                                 timeout=HTTP_TIMEOUT,
+                                 follow_redirects=True) as client:
+
+        async def fetch_one(url: str):
+            async with semaphore:
+                if limiter is not None:
+                    await limiter.acquire()
+                async with client.stream("GET", url) as response:
+                    response.raise_for_status()
+                    if response.headers.get("content-type", "").startswith("text/html"):
+                        raise RuntimeError("portal returned an HTML page instead of a file (session expired?)")
+
+                    filename = _filename_from_response(response)
+                    if rename:
+                        filename = rename(filename)
+                    return await storage.save_stream(filename, response.aiter_bytes(CHUNK_SIZE))
+
+        results = await asyncio.gather(*(fetch_one(u) for u in urls), return_exceptions=True)
+    return list(zip(urls, results))
@@ -0,0 +1,183 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+import asyncio
+import io
+import logging
+import os
+import re
+import zipfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Parquet output root and parse chunk size (env overrides)
+PARQUET_DIR = Path(os.getenv("PARQUET_DIR", Path.home() / "Downloads" / "parquet"))
+CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "50000"))
+
+_FILE_DATE = re.compile(r"_(\d{8})_")  #< e.g. WAYA MFB_20250804_095959.zip
+_UNSAFE_NAME = re.compile(r"[^\w.-]+")
+
+
+def _archive_date(zip_path: Path) -> str:
+    match = _FILE_DATE.search(zip_path.name)
+    if match:
+        return datetime.strptime(match.group(1), "%Y%m%d").date().isoformat()
+    return "unknown"
+
+
+def _member_file(zip_path: Path, member: zipfile.ZipInfo, taken: set[str]) -> str:
+    """Parquet file name of an archive member, from its whole path in the archive: a/x.csv,
+    b/x.csv and x.xlsx each get their own file; `taken` holds the names already used."""
+    name = f"{zip_path.stem}__{_UNSAFE_NAME.sub('_', member.filename)}"
+    if name in taken:
+        name = f"{name}__{len(taken)}"  #< a/x.csv next to a_x.csv
+    taken.add(name)
+    return f"{name}.parquet"
+
+
+def _csv_chunks(raw):
+    text = io.TextIOWrapper(raw, encoding="utf-8", errors="replace", newline="")
+    yield from pd.read_csv(text, dtype=str, chunksize=CHUNK_ROWS, skipinitialspace=True)
+
+
+def _excel_chunks(raw, suffix: str):
+    try:
+        import openpyxl
+    except ImportError:
+        openpyxl = None
+
+    if openpyxl is None or suffix == ".xls":
+        yield pd.read_excel(raw, dtype=str)  #< legacy .xls has no streaming reader; one sheet at a time
+        return
+
+    workbook = openpyxl.load_workbook(raw, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(h) if h is not None else f"column_{i}" for i, h in enumerate(next(rows, []))]
+        batch = []
+        for row in rows:
+            batch.append(["" if v is None else str(v) for v in row[:len(header)]])
+            if len(batch) >= CHUNK_ROWS:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+def _member_chunks(zf: zipfile.ZipFile, member: zipfile.ZipInfo):
+    suffix = Path(member.filename).suffix.lower()
+    with zf.open(member) as raw:
+        if suffix in (".csv", ".txt"):
+            yield from _csv_chunks(raw)
+        elif suffix in (".xlsx", ".xlsm", ".xls"):
+            yield from _excel_chunks(raw, suffix)
+
+
+def ingest_archive(zip_path: Path, out_dir: Path = PARQUET_DIR) -> dict:
+    """Stream every CSV/Excel member of a ZIP archive into date-partitioned Parquet.
+
+    Rows are partitioned by the first column whose name contains 'date', falling back
+    to the date in the archive name. Only one chunk of rows is held in memory at a time."""
+    zip_path = Path(zip_path)
+    fallback_date = _archive_date(zip_path)
+    writers: dict[str, tuple[pq.ParquetWriter, Path, Path]] = {}
+    taken: set[str] = set()
+    rows = 0
+    completed = False
+
+    try:
+        with zipfile.ZipFile(zip_path) as zf:
+            for member in zf.infolist():
+                if member.is_dir():
+                    continue
+                schema = None
+                date_col = None
+                member_file = _member_file(zip_path, member, taken)
+                for chunk in _member_chunks(zf, member):
+                    chunk.columns = [str(c).strip() for c in chunk.columns]
+                    if schema is None:
+                        schema = pa.schema([(c, pa.string()) for c in chunk.columns]
+                                           + [("_source_archive", pa.string()), ("_source_member", pa.string())])
+                        date_col = next((c for c in chunk.columns if "date" in c.lower()), None)
+
+                    chunk = chunk.astype("string")
+                    chunk["_source_archive"] = zip_path.name
+                    chunk["_source_member"] = member.filename
+
+                    if date_col:
+                        parsed = pd.to_datetime(chunk[date_col], errors="coerce", dayfirst=True, format="mixed")
+                        partitions = parsed.dt.strftime("%Y-%m-%d").fillna(fallback_date)
+                    else:
+                        partitions = pd.Series(fallback_date, index=chunk.index)
+
+                    for part_date, part in chunk.groupby(partitions, sort=False):
+                        key = f"{part_date}/{member.filename}"
+                        if key not in writers:
+                            final_path = out_dir / f"date={part_date}" / member_file
+                            final_path.parent.mkdir(parents=True, exist_ok=True)
+                            tmp_path = final_path.with_name(final_path.name + ".part")
+                            writers[key] = (pq.ParquetWriter(tmp_path, schema), tmp_path, final_path)
+                        table = pa.Table.from_pandas(part, schema=schema, preserve_index=False)
+                        writers[key][0].write_table(table)
+                    rows += len(chunk)
+        completed = True
+    finally:
+        # publish the partitions only when the whole archive parsed
+        for writer, tmp_path, final_path in writers.values():
+            writer.close()
+            if completed:
+                os.replace(tmp_path, final_path)
+            else:
+                tmp_path.unlink(missing_ok=True)
+
+    return {"archive": zip_path.name, "rows": rows, "files": sorted(str(w[2]) for w in writers.values())}
+
+
+class IngestPipeline:
+    """Background stage that parses archives while the bot keeps downloading.
+
+    `submit` only queues the path; a worker task converts archives one at a time in a
+    thread so the event loop driving Playwright is never blocked."""
+
+    def __init__(self, out_dir: Path = PARQUET_DIR):
+        self.out_dir = Path(out_dir)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self.results: list[dict] = []
+        self.errors: list[dict] = []
+
+    def start(self) -> "IngestPipeline":
+        self._task = asyncio.create_task(self._worker())
+        return self
+
+    def submit(self, path: Path) -> None:
+        if Path(path).suffix.lower() == ".zip":
+            self._queue.put_nowait(Path(path))
+
+    async def _worker(self) -> None:
+        while True:
+            path = await self._queue.get()
+            if path is None:
+                return
+            try:
+                self.results.append(await asyncio.to_thread(ingest_archive, path, self.out_dir))
+            except Exception as e:
+                logging.warning(f"Parquet ingest failed for {path.name}: {e}")
+                self.errors.append({"archive": path.name, "error": str(e)})
+
+    async def close(self) -> dict:
+        """Wait for queued archives to finish and return a summary."""
+        if self._task is not None:
+            self._queue.put_nowait(None)
+            await self._task
+            self._task = None
+        return {
+            "archives": len(self.results),
+            "rows": sum(r["rows"] for r in self.results),
+            "output_directory": str(self.out_dir),
+            "errors": self.errors,
+        }
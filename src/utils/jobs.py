@@ -0,0 +1,223 @@
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from src.enums import JobStatus
+import asyncio
+import logging
+import os
+import time
+import traceback
+import uuid
+
+# Job subsystem sizing (env overrides)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))          #< bots running at once
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "20"))   #< jobs allowed to wait; beyond this submissions are refused
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "200"))        #< finished jobs kept for GET /jobs
+JOB_EVENT_BUFFER = int(os.getenv("JOB_EVENT_BUFFER", "1000"))  #< events kept per job for GET /jobs/{id}/events
+
+# progress counters an ETA can be derived from, most reliable first: (done, total)
+_ETA_COUNTERS = (("shards_done", "shards_total"), ("report_types_done", "report_types_total"), ("pages_done", "pages_total"))
+
+Runner = Callable[[], Awaitable[dict]]
+
+_FINISHED = (JobStatus.succeeded, JobStatus.partial, JobStatus.failed)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+@dataclass
+class Job:
+    portal: str
+    params: dict
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: JobStatus = JobStatus.queued
+    created_at: str = field(default_factory=_now)
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    progress: dict = field(default_factory=dict)
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    checkpoint_id: Optional[str] = None  #< checkpoint this job writes to – another job's id when it resumes that job
+    events: deque = field(default_factory=lambda: deque(maxlen=JOB_EVENT_BUFFER), repr=False)
+    _seq: int = field(default=0, repr=False)
+    _wakeup: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    _clock: Optional[float] = field(default=None, repr=False)  #< monotonic start, for the ETA
+
+    def __post_init__(self):
+        self.checkpoint_id = self.checkpoint_id or self.id
+
+    @property
+    def finished(self) -> bool:
+        return self.status in _FINISHED
+
+    def publish(self, event: str, **data) -> None:
+        """Append an event (message, progress, status) and wake everyone streaming this job."""
+        self._seq += 1
+        self.events.append({"id": self._seq, "event": event, "ts": _now(), **data})
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
+
+    def progress_changed(self) -> None:
+        self.publish("progress", progress=dict(self.progress), eta_seconds=self.eta_seconds())
+
+    def eta_seconds(self) -> Optional[float]:
+        """Remaining time extrapolated from the share of shards, report types or pages done."""
+        if self._clock is None or self.finished:
+            return None
+        for done, total in _ETA_COUNTERS:
+            if self.progress.get(total) and self.progress.get(done):
+                fraction = min(1.0, self.progress[done] / self.progress[total])
+                return round((time.monotonic() - self._clock) * (1 - fraction) / fraction, 1)
+        return None
+
+    async def stream(self, after: int = 0, heartbeat: float = 15) -> AsyncIterator[Optional[dict]]:
+        """Events with an id above `after`, as they happen, until the job has finished.
+        Yields None every `heartbeat` seconds without news so callers can keep the connection alive."""
+        while True:
+            wakeup = self._wakeup  #< taken before reading, so nothing published meanwhile is missed
+            for event in list(self.events):
+                if event["id"] > after:
+                    after = event["id"]
+                    yield event
+            if self.finished:
+                return
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        data = {
+            "job_id": self.id,
+            "portal": self.portal,
+            "params": self.params,
+            "status": self.status.value,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress,
+            "eta_seconds": self.eta_seconds(),
+            "error": self.error,
+        }
+        if self.checkpoint_id != self.id:
+            data["resumes"] = self.checkpoint_id
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+# The job the current task is working for (None outside the worker pool)
+current_job: ContextVar[Optional[Job]] = ContextVar("current_job", default=None)
+
+
+def report_progress(**counters) -> None:
+    """Set progress fields (e.g. page=3) on the running job, if any."""
+    job = current_job.get()
+    if job is not None:
+        job.progress.update(counters)
+        job.progress_changed()
+
+
+def bump_progress(name: str, amount: int = 1) -> None:
+    """Increment a progress counter (e.g. files_saved) on the running job, if any."""
+    job = current_job.get()
+    if job is not None:
+        job.progress[name] = job.progress.get(name, 0) + amount
+        job.progress_changed()
+
+
+def summary(result: Optional[dict]) -> Optional[dict]:
+    """The headline of a job result: counts and status, without messages or per-shard detail."""
+    if result is None:
+        return None
+    return {k: v for k, v in result.items() if k not in ("messages", "shards", "timings", "report_types")}
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobQueue:
+    """Bounded queue of bot runs drained by a fixed pool of async workers."""
+
+    def __init__(self, workers: int = JOB_WORKERS, max_queued: int = JOB_QUEUE_SIZE, history: int = JOB_HISTORY):
+        self.workers = max(1, workers)
+        self.history = history
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        for n in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"job-worker-{n}"))
+        logging.info(f"Job queue started – {self.workers} workers, {self._queue.maxsize} queue slots")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def submit(self, portal: str, params: dict, runner: Runner, checkpoint_id: Optional[str] = None) -> Job:
+        job = Job(portal=portal, params=params, checkpoint_id=checkpoint_id)
+        try:
+            self._queue.put_nowait((job, runner))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Job queue is full ({self._queue.maxsize} waiting) – retry later")
+        self._jobs[job.id] = job
+        job.publish("status", status=job.status.value)
+        self._trim()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def active_for_checkpoint(self, checkpoint_id: str) -> Optional[Job]:
+        """A queued or running job writing to this checkpoint, if any."""
+        return next((j for j in self._jobs.values() if j.checkpoint_id == checkpoint_id
+                     and j.status in (JobStatus.queued, JobStatus.running)), None)
+
+    def list(self, status: Optional[JobStatus] = None) -> list[Job]:
+        return [j for j in self._jobs.values() if status is None or j.status == status]
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def _trim(self) -> None:
+        # forget the oldest finished jobs once history is full
+        finished = [j.id for j in self._jobs.values() if j.status in _FINISHED]
+        for job_id in finished[: max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    async def _worker(self) -> None:
+        while True:
+            job, runner = await self._queue.get()
+            token = current_job.set(job)
+            job.status = JobStatus.running
+            job.started_at = _now()
+            job._clock = time.monotonic()
+            job.publish("status", status=job.status.value)
+            try:
+                job.result = await runner()
+                outcome = (job.result or {}).get("status")
+                if outcome == "failed":  #< the bots report a failed run in their result instead of raising
+                    job.error = job.result.get("error") or "run ended with an error"
+                    job.status = JobStatus.failed
+                    logging.error(f"Job {job.id} failed: {job.error}")
+                else:
+                    job.status = JobStatus.partial if outcome == "partial" else JobStatus.succeeded
+            except Exception as e:
+                job.error = f"{e}\n{traceback.format_exc()}"
+                job.status = JobStatus.failed
+                logging.error(f"Job {job.id} failed: {e}")
+            finally:
+                job.finished_at = _now()
+                job.publish("done", status=job.status.value, summary=summary(job.result), error=job.error)
+                current_job.reset(token)
+                self._queue.task_done()
+                self._trim()
@@ -1,11 +1,104 @@
 # logger_utils.py
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from src.utils.jobs import current_job
+from src.utils.settings import STATE_DIR
+import atexit
+import json
 import logging
+import os
+import queue
 
-def log_and_store(message, messages_list, level="info"):
-    if level == "info":
-        logging.info(message)
-    elif level == "warning":
-        logging.warning(message)
-    elif level == "error":
-        logging.error(message)
-    messages_list.append(message)
\ No newline at end of file
+# Logging configuration (env overrides)
+LOG_FILE = Path(os.getenv("LOG_FILE", STATE_DIR / "logs" / "bots.log"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+MESSAGE_BUFFER_SIZE = int(os.getenv("MESSAGE_BUFFER_SIZE", "500"))  #< messages kept per run for the response
+
+_LEVELS = {"debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING, "error": logging.ERROR}
+
+# Extra structured fields (e.g. report_type) attached to every record logged in this context
+_log_fields: ContextVar[dict] = ContextVar("log_fields", default={})
+_listener = None
+
+
+class _ContextFilter(logging.Filter):
+    """Stamp records with the running job and any bound fields, on the logging thread's caller side."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        fields = dict(_log_fields.get())
+        job = current_job.get()
+        if job is not None:
+            fields.setdefault("job_id", job.id)
+            fields.setdefault("portal", job.portal)
+        fields.update(getattr(record, "fields", None) or {})
+        record.fields = fields
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def configure_logging() -> None:
+    """Route all logging through a queue so file/console I/O happens on a background thread.
+    Safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        return
+
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)  # ensure the directory exists
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(_ContextFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  #< flush what is still queued on shutdown
+
+
+@contextmanager
+def log_context(**fields):
+    """Bind structured fields (e.g. report_type="24") to every record logged inside the block."""
+    token = _log_fields.set({**_log_fields.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_fields.reset(token)
+
+
+def new_message_buffer(maxlen: int = MESSAGE_BUFFER_SIZE) -> deque:
+    """Ring buffer for the messages returned with a run – keeps the most recent `maxlen`."""
+    return deque(maxlen=maxlen)
+
+
+def log_and_store(message, messages_list, level="info", **fields):
+    logging.log(_LEVELS.get(level, logging.INFO), message, extra={"fields": fields})
+    messages_list.append(message)
+    job = current_job.get()
+    if job is not None:
+        job.publish("message", level=level, message=str(message), **{**_log_fields.get(), **fields})  #< live on GET /jobs/{id}/events
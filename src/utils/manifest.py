@@ -0,0 +1,120 @@
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+from src.utils.settings import STATE_DIR
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+
+# Persistent record of everything downloaded (env override)
+MANIFEST_PATH = Path(os.getenv("MANIFEST_PATH", STATE_DIR / "manifest.sqlite3"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    portal      TEXT NOT NULL,
+    report_type TEXT NOT NULL,
+    item_key    TEXT NOT NULL,
+    filename    TEXT NOT NULL,
+    path        TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    sha256      TEXT NOT NULL,
+    fetched_at  TEXT NOT NULL,
+    PRIMARY KEY (portal, report_type, item_key)
+);
+CREATE INDEX IF NOT EXISTS downloads_sha256 ON downloads (sha256);
+CREATE TABLE IF NOT EXISTS syncs (
+    portal      TEXT NOT NULL,
+    report_type TEXT NOT NULL,
+    synced_to   TEXT NOT NULL,
+    synced_at   TEXT NOT NULL,
+    PRIMARY KEY (portal, report_type)
+);
+"""
+
+
+def item_key_for_url(url: str) -> str:
+    # same normalisation as the row keys of table_rows.extract_rows, so http and click mode agree
+    head, sep, rest = url.partition(";jsessionid=")
+    if not sep:
+        return url
+    tail = min((i for i in (rest.find("?"), rest.find("#")) if i >= 0), default=len(rest))
+    return head + rest[tail:]
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """SQLite index of downloaded reports and of how far each portal/report type has been synced."""
+
+    def __init__(self, path: Path = MANIFEST_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def has(self, portal: str, report_type: str, item_key: str) -> bool:
+        """True when the item was downloaded before and its file is still on disk (or in the bucket)."""
+        with self._lock:
+            row = self._db().execute(
+                "SELECT path FROM downloads WHERE portal = ? AND report_type = ? AND item_key = ?",
+                (portal, report_type, item_key),
+            ).fetchone()
+        return row is not None and (row[0].startswith("s3://") or Path(row[0]).exists())
+
+    async def record(self, portal: str, report_type: str, item_key: str, path: Path, sha256: Optional[str] = None,
+                     size: Optional[int] = None) -> None:
+        """`path` is a local file, or a storage URI when sha256 and size are given."""
+        if sha256 is None:
+            sha256 = await asyncio.to_thread(file_sha256, Path(path))
+        if size is None:
+            size = Path(path).stat().st_size
+        with self._lock, self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (portal, report_type, item_key, str(path).rsplit("/", 1)[-1], str(path), size, sha256,
+                 datetime.now(timezone.utc).isoformat(timespec="seconds")),
+            )
+
+    def synced_to(self, portal: str, report_type: str) -> Optional[date]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT synced_to FROM syncs WHERE portal = ? AND report_type = ?", (portal, report_type)
+            ).fetchone()
+        return date.fromisoformat(row[0]) if row else None
+
+    def mark_synced(self, portal: str, report_type: str, start_date: date, end_date: date) -> None:
+        """Record a successful run over start_date..end_date. The synced window only grows
+        when the run joins onto it, so a one-off pull of a later window leaves no gap behind."""
+        current = self.synced_to(portal, report_type)
+        if current is not None and (end_date <= current or start_date > current + timedelta(days=1)):
+            return
+        with self._lock, self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO syncs VALUES (?, ?, ?, ?)",
+                (portal, report_type, end_date.isoformat(), datetime.now(timezone.utc).isoformat(timespec="seconds")),
+            )
+
+    def incremental_start(self, portal: str, report_types: list[str], start_date: date) -> date:
+        """Start of the window still to fetch: the last synced day (re-checked, since the
+        portal may publish more files for it later) or `start_date`, whichever is later."""
+        synced = [self.synced_to(portal, rt) for rt in report_types]
+        if any(s is None for s in synced):
+            return start_date
+        return max(start_date, min(synced))
+
+
+manifest = Manifest()
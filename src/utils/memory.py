@@ -0,0 +1,154 @@
+from src.utils.jobs import current_job
+from src.utils.metrics import registry
+from typing import Optional
+import asyncio
+import logging
+import os
+import signal
+
+# Memory tracking (env overrides)
+JOB_MEMORY_BUDGET_MB = int(os.getenv("JOB_MEMORY_BUDGET_MB", "1024"))   #< browser growth one job may cause before its browser is recycled
+MEMORY_SAMPLE_SECONDS = float(os.getenv("MEMORY_SAMPLE_SECONDS", "5"))
+
+MB = 1024 * 1024
+
+
+def _statm_rss(pid: int, page_size: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * page_size
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def tree_rss_bytes(pid: int) -> int:
+    """RSS of `pid` and all its descendants, read from /proc (Linux)."""
+    children: dict[int, list[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total, stack = 0, [pid]
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    while stack:
+        current = stack.pop()
+        total += _statm_rss(current, page_size)
+        stack.extend(children.get(current, []))
+    return total
+
+
+def pids_rss_bytes(pids: list[int]) -> int:
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    return sum(_statm_rss(pid, page_size) for pid in pids)
+
+
+async def browser_pids(browser) -> list[int]:
+    """Every process of a Chromium browser (browser, GPU, renderers, utilities), via CDP."""
+    try:
+        cdp = await browser.new_browser_cdp_session()
+        try:
+            info = await cdp.send("SystemInfo.getProcessInfo")
+        finally:
+            await cdp.detach()
+        return [p["id"] for p in info.get("processInfo", [])]
+    except Exception:
+        return []
+
+
+async def browser_rss_bytes(browser) -> Optional[int]:
+    """Resident memory of all the browser's processes, or None where /proc or CDP is unavailable."""
+    if not os.path.isdir("/proc"):
+        return None
+    pids = await browser_pids(browser)
+    return await asyncio.to_thread(pids_rss_bytes, pids) if pids else None
+
+
+async def context_heap_bytes(context) -> int:
+    """JS heap in use by the pages of one context – the part of the browser's memory a job owns."""
+    total = 0
+    for page in list(context.pages):
+        try:
+            cdp = await context.new_cdp_session(page)
+            try:
+                total += int((await cdp.send("Runtime.getHeapUsage"))["usedSize"])
+            finally:
+                await cdp.detach()
+        except Exception:
+            pass  #< page closed or navigating
+    return total
+
+
+def kill_pids(pids: list[int]) -> None:
+    """Last resort when a browser will not close: kill its processes."""
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except (OSError, ProcessLookupError):
+            pass
+
+
+class MemoryMonitor:
+    """Samples the memory of a browser and of one of its contexts while a job uses them, and
+    reports current and peak values on the job (progress memory_mb, peak_memory_mb, js_heap_mb)."""
+
+    def __init__(self, browser, context, budget_mb: int = JOB_MEMORY_BUDGET_MB, interval: float = MEMORY_SAMPLE_SECONDS):
+        self.browser = browser
+        self.context = context
+        self.budget = budget_mb * MB
+        self.interval = interval
+        self.baseline: Optional[int] = None
+        self.current = 0
+        self.peak = 0
+        self.heap_peak = 0
+        self.over_budget = False
+        self._task: Optional[asyncio.Task] = None
+        self._job = current_job.get()
+
+    async def sample(self) -> None:
+        rss = await browser_rss_bytes(self.browser)
+        heap = await context_heap_bytes(self.context)
+        if rss is not None:
+            self.baseline = rss if self.baseline is None else self.baseline
+            self.current = rss
+            self.peak = max(self.peak, rss)
+            if rss - self.baseline > self.budget and not self.over_budget:
+                self.over_budget = True
+                logging.warning(f"Browser grew {(rss - self.baseline) // MB} MB during this job "
+                                f"(budget {self.budget // MB} MB) – it will be recycled afterwards")
+        self.heap_peak = max(self.heap_peak, heap)
+        if self._job is not None:
+            # several contexts may serve one job (shards): the peak is the largest seen by any of them
+            progress = self._job.progress
+            progress["memory_mb"] = round(self.current / MB, 1)
+            progress["peak_memory_mb"] = max(progress.get("peak_memory_mb", 0), round(self.peak / MB, 1))
+            progress["js_heap_mb"] = round(heap / MB, 1)
+            if self.over_budget:
+                progress["memory_budget_exceeded"] = True
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sample()
+            except Exception as e:
+                logging.debug(f"Memory sample failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self) -> "MemoryMonitor":
+        self._task = asyncio.create_task(self._run(), name="memory-monitor")
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        try:
+            await asyncio.wait_for(self.sample(), timeout=5)  #< final reading before the context closes
+        except Exception:
+            pass
+        if self.peak:
+            registry.set("bot_job_peak_browser_rss_bytes", self.peak)
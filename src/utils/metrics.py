@@ -0,0 +1,169 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Optional
+from src.utils.jobs import bump_progress
+import bisect
+import threading
+import time
+
+# Histogram buckets (seconds) for step durations
+STEP_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_HELP = {
+    "bot_step_seconds": ("histogram", "Duration of each bot phase (login, navigation, table reload, pagination, download)."),
+    "bot_wait_seconds": ("histogram", "Duration of each event-driven wait (table redraw, frame load, XHR, ...)."),
+    "bot_wait_ceiling_hits_total": ("counter", "Waits that ran into their ceiling instead of seeing their event."),
+    "bot_bytes_downloaded_total": ("counter", "Bytes saved to disk."),
+    "bot_files_total": ("counter", "Report files by outcome (saved, skipped, failed)."),
+    "bot_retries_total": ("counter", "Retried operations."),
+    "bot_requests_blocked_total": ("counter", "Page requests aborted by the routing policy, by resource type."),
+    "bot_bytes_saved_estimate_total": ("counter", "Estimated bytes not downloaded thanks to blocked requests."),
+    "bot_requests_coalesced_total": ("counter", "Download requests answered by an identical in-flight run or a cached result."),
+    "bot_browser_recycles_total": ("counter", "Pooled browsers replaced, by reason (jobs, rss, job_budget)."),
+    "bot_job_peak_browser_rss_bytes": ("gauge", "Peak browser RSS seen during the most recent job."),
+    "bot_account_cooldowns_total": ("counter", "Portal accounts put to rest after throttling (http) or a lockout message."),
+    "bot_rate_limit_wait_seconds_total": ("counter", "Time requests waited for the portal's rate limit."),
+    "bot_runs_total": ("counter", "Completed bot runs by final status."),
+    "bot_last_run_files_per_second": ("gauge", "Files saved per second in the most recent run."),
+    "bot_last_run_seconds": ("gauge", "Wall time of the most recent run."),
+}
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+class MetricsRegistry:
+    """Minimal in-process Prometheus registry: counters, gauges and histograms keyed by label set."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: dict[str, dict[tuple, float]] = defaultdict(dict)
+        self._histograms: dict[str, dict[tuple, list]] = defaultdict(dict)
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[name][key] = self._values[name].get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._values[name][tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            hist = self._histograms[name].setdefault(key, [[0] * len(STEP_BUCKETS), 0, 0.0])
+            index = bisect.bisect_left(STEP_BUCKETS, value)
+            if index < len(STEP_BUCKETS):
+                hist[0][index] += 1
+            hist[1] += 1
+            hist[2] += value
+
+    def render(self, extra: Optional[dict] = None) -> str:
+        """Prometheus text exposition format. `extra` adds gauges computed at scrape time."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._values.items()):
+                kind, help_text = _HELP.get(name, ("gauge", name))
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_labels(dict(key))} {value:g}" for key, value in series.items()]
+            for name, series in sorted(self._histograms.items()):
+                kind, help_text = _HELP.get(name, ("histogram", name))
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for key, (buckets, count, total) in series.items():
+                    labels = dict(key)
+                    cumulative = 0
+                    for bound, n in zip(STEP_BUCKETS, buckets):
+                        cumulative += n
+                        lines.append(f"{name}_bucket{_labels({**labels, 'le': f'{bound:g}'})} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {total:g}")
+                    lines.append(f"{name}_count{_labels(labels)} {count}")
+        for name, (help_text, series) in (extra or {}).items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            lines += [f"{name}{_labels(labels)} {value:g}" for labels, value in series]
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class RunTrace:
+    """Per-run timing and throughput record; every event is also fed to the global registry."""
+
+    def __init__(self, portal: str, report_type: str = ""):
+        self.portal = portal
+        self.report_type = report_type
+        self.started = time.perf_counter()
+        self.steps: dict[str, dict] = {}
+        self.bytes = 0
+        self.files = {"saved": 0, "skipped": 0, "failed": 0}
+        self.retries = 0
+        self.requests_blocked = 0
+        self.bytes_saved = 0  #< estimate – blocked requests never report a size
+
+    def _labels(self, report_type: Optional[str]) -> dict:
+        return {"portal": self.portal, "report_type": report_type or self.report_type}
+
+    def record_step(self, step: str, seconds: float, report_type: Optional[str] = None) -> None:
+        entry = self.steps.setdefault(step, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+        entry["count"] += 1
+        entry["total_s"] += seconds
+        entry["max_s"] = max(entry["max_s"], seconds)
+        registry.observe("bot_step_seconds", seconds, step=step, **self._labels(report_type))
+
+    @contextmanager
+    def step(self, step: str, report_type: Optional[str] = None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_step(step, time.perf_counter() - started, report_type)
+
+    def file(self, outcome: str, size: int = 0, count: int = 1, report_type: Optional[str] = None) -> None:
+        self.files[outcome] = self.files.get(outcome, 0) + count
+        registry.inc("bot_files_total", count, outcome=outcome, **self._labels(report_type))
+        if size:
+            self.bytes += size
+            registry.inc("bot_bytes_downloaded_total", size, **self._labels(report_type))
+            bump_progress("bytes_downloaded", size)
+
+    def retry(self, report_type: Optional[str] = None) -> None:
+        self.retries += 1
+        registry.inc("bot_retries_total", **self._labels(report_type))
+
+    def blocked(self, resource_type: str, estimated_bytes: int = 0) -> None:
+        self.requests_blocked += 1
+        self.bytes_saved += estimated_bytes
+        registry.inc("bot_requests_blocked_total", portal=self.portal, resource_type=resource_type)
+        registry.inc("bot_bytes_saved_estimate_total", estimated_bytes, portal=self.portal)
+
+    def finish(self, status: str) -> dict:
+        elapsed = time.perf_counter() - self.started
+        files_per_second = self.files["saved"] / elapsed if elapsed else 0.0
+        labels = self._labels(None)
+        registry.inc("bot_runs_total", portal=self.portal, status=status)
+        registry.set("bot_last_run_seconds", elapsed, **labels)
+        registry.set("bot_last_run_files_per_second", files_per_second, **labels)
+        return self.breakdown(elapsed)
+
+    def breakdown(self, elapsed: Optional[float] = None) -> dict:
+        elapsed = elapsed if elapsed is not None else time.perf_counter() - self.started
+        return {
+            "duration_s": round(elapsed, 3),
+            "steps": {name: {"count": s["count"], "total_s": round(s["total_s"], 3), "max_s": round(s["max_s"], 3)}
+                      for name, s in self.steps.items()},
+            "bytes_downloaded": self.bytes,
+            "files": dict(self.files),
+            "files_per_second": round(self.files["saved"] / elapsed, 3) if elapsed else 0.0,
+            "retries": self.retries,
+            "requests_blocked": self.requests_blocked,
+            "bytes_saved_estimate": self.bytes_saved,
+        }
@@ -0,0 +1,157 @@
+from src.utils.waits import Waits
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from typing import Optional
+import logging
+import os
+import re
+
+# Pagination collapse (env overrides). With it off, or when a table refuses, the bots click through pages.
+PAGINATION_COLLAPSE = os.getenv("PAGINATION_COLLAPSE", "true").strip().lower() in ("1", "true", "yes")
+ISW_PAGE_SIZE = int(os.getenv("ISW_PAGE_SIZE", "1000"))
+ISW_PAGE_SIZE_PARAM = os.getenv("ISW_PAGE_SIZE_PARAM", "").strip()  #< force a parameter name when the Next link carries none
+
+_SIZE_PARAMS = ("pagesize", "page_size", "rows", "rowsperpage", "limit", "length", "size", "maxresults", "perpage", "per_page")
+_PAGE_PARAM = re.compile(r"^(page|pageno|page_no|pagenum|pagenumber|p|start|offset|first|d-\d+-p)$", re.I)  #< d-…-p: displaytag
+
+# DataTables API behind a global (e.g. window.transactionReportTable), else the first DataTable on the page
+_DATATABLE_JS = """
+    const byName = window[name];
+    const api = byName && byName.page && typeof byName.page.len === 'function' ? byName
+        : (window.jQuery && jQuery.fn.dataTable && jQuery.fn.dataTable.tables().length
+           ? jQuery(jQuery.fn.dataTable.tables()[0]).DataTable() : null);
+"""
+
+_TABLE_INFO_JS = """(name) => {""" + _DATATABLE_JS + """
+    if (!api) return null;
+    const info = api.page.info();
+    return { pages: info.pages, length: info.length, records: info.recordsDisplay,
+             shown: api.rows({ page: 'current' }).count(), server_side: !!info.serverSide };
+}"""
+
+_SET_LENGTH_JS = """([name, length]) => {""" + _DATATABLE_JS + """
+    api.page.len(length).draw();
+}"""
+
+
+async def show_all_rows(page, waits: Waits, table_global: str, tbody_selector: str = "tbody") -> str:
+    """Put every row of a DataTable on one page through its API.
+
+    Client-side tables just redraw. Server-side tables issue one request for all rows to
+    their own data endpoint, so the download buttons are still rendered as usual.
+    Returns the strategy used; "click_through" means the caller should paginate as before."""
+    if not PAGINATION_COLLAPSE:
+        return "click_through"
+
+    info = await page.evaluate(_TABLE_INFO_JS, table_global)
+    if info is None:
+        return "click_through"  #< not a DataTables API
+    if info["pages"] <= 1:
+        return "single_page"
+
+    # -1 is "All"; servers that refuse it usually honour an explicit length
+    for length, strategy in ((-1, "show_all"), (info["records"], "bulk_length")):
+        await waits.redraw(page, lambda: page.evaluate(_SET_LENGTH_JS, [table_global, length]),
+                           tbody_selector=tbody_selector, name="show all rows")
+        after = await page.evaluate(_TABLE_INFO_JS, table_global)
+        if after and after["pages"] <= 1 and after["shown"] >= after["records"]:
+            return strategy
+
+    logging.warning(f"{table_global} did not accept a larger page length – paginating by clicks")
+    await waits.redraw(page, lambda: page.evaluate(_SET_LENGTH_JS, [table_global, info["length"]]),
+                       tbody_selector=tbody_selector, name="restore page length")
+    return "click_through"
+
+
+async def table_page_count(page, table_global: str) -> Optional[int]:
+    """Pages the DataTable currently shows, or None without a DataTables API."""
+    info = await page.evaluate(_TABLE_INFO_JS, table_global)
+    return info["pages"] if info else None
+
+
+def _all_rows_url(next_href: str) -> Optional[str]:
+    """Turn the Next link of the first results page into a first-page URL with a large page size."""
+    parts = urlsplit(next_href)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    size_param = next((k for k, _ in query if k.lower() in _SIZE_PARAMS), None) or ISW_PAGE_SIZE_PARAM
+    if not size_param:
+        return None
+
+    # drop the page/offset parameter so we land on page one
+    kept = [(k, v) for k, v in query if k != size_param and not _PAGE_PARAM.match(k)]
+    kept.append((size_param, str(ISW_PAGE_SIZE)))
+    return urlunsplit(parts._replace(query=urlencode(kept)))
+
+
+async def show_all_results(page, frame, waits: Waits, frame_name: str,
+                           next_selector: str = "a:has-text('Next')") -> str:
+    """Reload a server-rendered results frame with a large page-size parameter taken from its
+    Next link. Any pages still left afterwards are clicked through by the caller."""
+    if not PAGINATION_COLLAPSE:
+        return "click_through"
+
+    next_link = frame.locator(next_selector)
+    if await next_link.count() == 0:
+        return "single_page"
+
+    url = _all_rows_url(urljoin(frame.url, await next_link.first.get_attribute("href") or ""))
+    if url is None:
+        return "click_through"  #< no page-size parameter to drive
+
+    await waits.frame_load(page, frame_name, lambda: frame.goto(url), name="show all rows")
+    return "page_size" if await frame.locator(next_selector).count() == 0 else "page_size_partial"
+
+
+_CAN_JUMP_JS = """(name) => {""" + _DATATABLE_JS + """
+    return !!api && typeof api.page === 'function';
+}"""
+
+_GOTO_PAGE_JS = """([name, index]) => {""" + _DATATABLE_JS + """
+    api.page(index).draw('page');
+}"""
+
+
+async def jump_to_page(page, waits: Waits, table_global: str, target: int, next_selector: str) -> int:
+    """Move a paginated table to page `target` (1-based) – directly through the DataTables API
+    when there is one, else by clicking Next. Returns the page reached."""
+    if target <= 1:
+        return 1
+    if await page.evaluate(_CAN_JUMP_JS, table_global):
+        await waits.redraw(page, lambda: page.evaluate(_GOTO_PAGE_JS, [table_global, target - 1]), name="jump to page")
+        return target
+
+    reached = 1
+    next_btn = page.locator(next_selector)
+    while reached < target and await next_btn.count():
+        await waits.redraw(page, lambda: next_btn.first.click(), name="next page")
+        reached += 1
+    return reached
+
+
+def _page_url(next_href: str, target: int) -> Optional[str]:
+    """Rewrite the page-number parameter of the first page's Next link (the one set to 2) to `target`."""
+    parts = urlsplit(next_href)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if not any(_PAGE_PARAM.match(k) and v == "2" for k, v in query):
+        return None  #< offsets and opaque tokens can't be turned into a page number
+    query = [(k, str(target) if _PAGE_PARAM.match(k) and v == "2" else v) for k, v in query]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+async def jump_to_results_page(page, frame, waits: Waits, frame_name: str, target: int,
+                               next_selector: str = "a:has-text('Next')") -> int:
+    """Move a server-rendered results frame to page `target` (1-based): load it directly when the
+    Next link carries a page-number parameter, else click Next. Returns the page reached."""
+    reached = 1
+    next_link = frame.locator(next_selector)
+    if target <= 1 or await next_link.count() == 0:
+        return reached
+
+    url = _page_url(urljoin(frame.url, await next_link.first.get_attribute("href") or ""), target)
+    if url is not None:
+        await waits.frame_load(page, frame_name, lambda: frame.goto(url), name="jump to page")
+        return target
+
+    while reached < target and await next_link.count():
+        await waits.frame_load(page, frame_name, lambda: next_link.first.click(), name="next page")
+        reached += 1
+    return reached
@@ -0,0 +1,91 @@
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Optional
+from src.utils.settings import PortalSettings, portal_settings
+import importlib
+import logging
+import threading
+import time
+
+
+class PortalUnavailable(Exception):
+    pass
+
+
+@dataclass
+class BotPlugin:
+    """One portal's bot module, imported on first use once its settings are complete."""
+    name: str
+    module_path: str
+    module: Optional[ModuleType] = None
+    error: Optional[str] = None
+    load_seconds: Optional[float] = None
+
+    @property
+    def settings(self) -> PortalSettings:
+        return portal_settings(self.name)
+
+    def load(self) -> ModuleType:
+        if self.module is not None:
+            return self.module
+        settings = self.settings
+        if not settings.enabled:
+            raise PortalUnavailable(f"{self.name.upper()} is disabled on this instance ({settings.prefix}ENABLED=false)")
+        missing = settings.missing()
+        if missing:
+            raise PortalUnavailable(f"{self.name.upper()} is not configured – missing {', '.join(missing)}")
+        started = time.perf_counter()
+        try:
+            self.module = importlib.import_module(self.module_path)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            raise PortalUnavailable(f"{self.name.upper()} bot failed to load – {self.error}") from e
+        self.error = None
+        self.load_seconds = round(time.perf_counter() - started, 3)
+        logging.info(f"{self.name.upper()} bot loaded in {self.load_seconds}s")
+        return self.module
+
+    def status(self) -> dict:
+        settings = self.settings
+        missing = settings.missing()
+        return {"enabled": settings.enabled, "configured": not missing, "missing": missing,
+                "loaded": self.module is not None, "ready": settings.enabled and self.module is not None,
+                "error": self.error, "load_seconds": self.load_seconds}
+
+
+class BotRegistry:
+    """The portal bots this instance can run. Each is enabled and configured on its own, so a
+    replica can serve NIP only or ISW only, and one portal's missing settings never stop the other."""
+
+    def __init__(self, plugins: list[BotPlugin]):
+        self.plugins = {p.name: p for p in plugins}
+        self._lock = threading.Lock()  #< imports are not run twice if two threads ask at once
+
+    def get(self, portal: str) -> ModuleType:
+        """The bot module of `portal`; raises PortalUnavailable when it is disabled, unconfigured or broken."""
+        plugin = self.plugins[portal]
+        if plugin.module is None:
+            with self._lock:
+                return plugin.load()
+        return plugin.module
+
+    def ready(self, portal: str) -> bool:
+        plugin = self.plugins.get(portal)
+        return plugin is not None and plugin.status()["ready"]
+
+    def init(self) -> None:
+        """Load every enabled bot once (from the app lifespan); failures are reported per portal."""
+        for name, plugin in self.plugins.items():
+            if not plugin.settings.enabled:
+                logging.info(f"{name.upper()} bot disabled")
+                continue
+            try:
+                self.get(name)
+            except PortalUnavailable as e:
+                logging.error(str(e))
+
+    def status(self) -> dict:
+        return {name: plugin.status() for name, plugin in self.plugins.items()}
+
+
+bots = BotRegistry([BotPlugin("nip", "src.NIP_bot"), BotPlugin("isw", "src.ISW_bot")])
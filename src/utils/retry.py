@@ -0,0 +1,74 @@
+from typing import Awaitable, Callable, Optional
+from src.utils.http_download import fetch_all
+import asyncio
+import logging
+import os
+import random
+
+# Retry policy for failed downloads (env overrides)
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY_SECONDS", "2"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY_SECONDS", "60"))
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, ceiling: float = RETRY_MAX_DELAY) -> float:
+    """Exponential backoff with jitter: ~base, 2*base, 4*base … capped at `ceiling`."""
+    return min(ceiling, base * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+
+
+async def retry_async(action: Callable[[], Awaitable], attempts: int = RETRY_ATTEMPTS, on_retry: Optional[Callable] = None):
+    """Run `action` until it succeeds, sleeping with backoff between tries; re-raises the last error."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return await action()
+        except Exception:
+            if attempt == attempts:
+                raise
+            if on_retry:
+                on_retry()
+            await asyncio.sleep(backoff_delay(attempt))
+
+
+class RetryQueue:
+    """Downloads that failed during the run, retried over HTTP (with the run's session
+    cookies) once the pages have been walked, so a flaky file never stalls pagination."""
+
+    def __init__(self, attempts: int = RETRY_ATTEMPTS):
+        self.attempts = attempts
+        self.items: list[dict] = []
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, key: str, url: Optional[str], report_type: str, error: Exception) -> bool:
+        """Queue an item; False when it has no URL to fetch directly (caller keeps it as failed)."""
+        if not url:
+            return False
+        self.items.append({"key": key, "url": url, "report_type": report_type, "error": str(error), "attempts": 0})
+        return True
+
+    async def drain(self, context, storage, rename: Optional[Callable[[str], str]] = None,
+                    on_retry: Optional[Callable[[dict], None]] = None, limiter=None) -> tuple[list[tuple[dict, object]], list[dict]]:
+        """Retry every queued item up to `attempts` times with exponential backoff.
+        Returns (saved items with their StoredFile, items that still failed)."""
+        saved, pending = [], list(self.items)
+        self.items.clear()
+        for attempt in range(1, self.attempts + 1):
+            if not pending:
+                break
+            await asyncio.sleep(backoff_delay(attempt))
+            for item in pending:
+                item["attempts"] = attempt
+                if on_retry:
+                    on_retry(item)
+            results = await fetch_all(context, [item["url"] for item in pending], storage, rename=rename, limiter=limiter)
+            still_failing = []
+            for item, (_, result) in zip(pending, results):
+                if isinstance(result, Exception):
+                    item["error"] = str(result)
+                    still_failing.append(item)
+                else:
+                    saved.append((item, result))
+            pending = still_failing
+            logging.info(f"Retry round {attempt}: {len(results) - len(pending)} recovered, {len(pending)} still failing")
+        return saved, pending
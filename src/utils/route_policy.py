@@ -0,0 +1,71 @@
+from fnmatch import fnmatch
+from typing import Optional
+import logging
+import os
+
+
+def _csv(name: str, default: str) -> tuple[str, ...]:
+    return tuple(v.strip() for v in os.getenv(name, default).split(",") if v.strip())
+
+
+# Routing policy (env overrides). Patterns are fnmatch globs against the full URL.
+ROUTE_BLOCKING = os.getenv("ROUTE_BLOCKING", "true").strip().lower() in ("1", "true", "yes")
+BLOCK_TYPES = _csv("ROUTE_BLOCK_TYPES", "image,media,font,stylesheet")
+BLOCK_PATTERNS = _csv("ROUTE_BLOCK_PATTERNS", ",".join([
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*hotjar.com*",
+    "*facebook.net*", "*clarity.ms*", "*nr-data.net*", "*newrelic.com*",
+]))
+# Always let through, whatever the rules above say – scripts/styles the NIP DataTable,
+# its date picker and the ISW frames depend on
+ALLOW_PATTERNS = _csv("ROUTE_ALLOW_PATTERNS", ",".join([
+    "*jquery*", "*dataTables*", "*datatables*", "*daterangepicker*", "*moment*", "*bootstrap*.js*",
+]))
+
+# A blocked request never transfers, so its size is unknown – estimate per resource type
+_TYPICAL_BYTES = {"image": 20_000, "media": 250_000, "font": 40_000, "stylesheet": 15_000, "script": 30_000}
+_NEVER_BLOCK = ("document", "xhr", "fetch")  #< the DOM, table data and report downloads
+
+
+class RoutePolicy:
+    """Decides which requests a context may make; everything else is aborted before it hits the network."""
+
+    def __init__(self,
+                 block_types: tuple = BLOCK_TYPES,
+                 block_patterns: tuple = BLOCK_PATTERNS,
+                 allow_patterns: tuple = ALLOW_PATTERNS):
+        self.block_types = frozenset(t for t in block_types if t not in _NEVER_BLOCK)
+        self.block_patterns = block_patterns
+        self.allow_patterns = allow_patterns
+
+    def blocks(self, url: str, resource_type: str) -> bool:
+        if resource_type in _NEVER_BLOCK or any(fnmatch(url, p) for p in self.allow_patterns):
+            return False
+        return resource_type in self.block_types or any(fnmatch(url, p) for p in self.block_patterns)
+
+    async def apply(self, context, trace=None) -> None:
+        """Install the policy on every page of `context`; blocked requests are counted on `trace`.
+        Note that Playwright disables the HTTP cache for routed contexts."""
+        async def handle(route):
+            request = route.request
+            if self.blocks(request.url, request.resource_type):
+                if trace is not None:
+                    trace.blocked(request.resource_type, _TYPICAL_BYTES.get(request.resource_type, 5_000))
+                await route.abort("blockedbyclient")
+            else:
+                await route.fallback()
+
+        await context.route("**/*", handle)
+
+
+default_policy: Optional[RoutePolicy] = RoutePolicy() if ROUTE_BLOCKING else None
+
+
+async def apply_route_policy(context, trace=None, policy: Optional[RoutePolicy] = None) -> None:
+    """Apply `policy` (default: the env-configured one, unless ROUTE_BLOCKING=false) to a context."""
+    policy = policy or default_policy
+    if policy is None:
+        return
+    try:
+        await policy.apply(context, trace)
+    except Exception as e:
+        logging.warning(f"Could not install request routing policy: {e}")  #< never fatal – run unfiltered
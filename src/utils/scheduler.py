@@ -0,0 +1,240 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Optional
+from src.utils.manifest import manifest
+import asyncio
+import json
+import logging
+import os
+import random
+
+# Recurring pulls (env overrides). SCHEDULES is a JSON list or the path of a JSON file, e.g.
+# [{"name": "isw-daily", "portal": "isw", "cron": "15 6 * * *", "report_types": ["24", "1"]}]
+SCHEDULES = os.getenv("SCHEDULES", "").strip()
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+SCHEDULE_JITTER_SECONDS = int(os.getenv("SCHEDULE_JITTER_SECONDS", "300"))  #< random delay added to every firing
+SCHEDULE_MAX_CATCHUP_DAYS = int(os.getenv("SCHEDULE_MAX_CATCHUP_DAYS", "30"))  #< longest window one job pulls; also the first backfill
+SCHEDULE_CATCHUP_RECHECK_SECONDS = int(os.getenv("SCHEDULE_CATCHUP_RECHECK_SECONDS", "60"))  #< pause between catch-up windows
+
+
+class Cron:
+    """Five-field cron expression – minute hour day-of-month month day-of-week – in server local time.
+    Fields take *, numbers, a-b ranges, /steps and comma lists; Sunday is 0 or 7."""
+
+    _RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse(f, lo, hi) for f, (lo, hi) in zip(fields, self._RANGES))
+        self.weekdays = {d % 7 for d in weekdays}
+        self._any_day, self._any_weekday = fields[2] == "*", fields[4] == "*"
+
+    @staticmethod
+    def _parse(spec: str, lo: int, hi: int) -> set[int]:
+        values = set()
+        for part in spec.split(","):
+            span, _, step = part.partition("/")
+            if span == "*":
+                first, last = lo, hi
+            elif "-" in span:
+                first, last = (int(v) for v in span.split("-", 1))
+            else:
+                first = int(span)
+                last = hi if step else first
+            if not lo <= first <= last <= hi:
+                raise ValueError(f"cron field {spec!r} is outside {lo}-{hi}")
+            values.update(range(first, last + 1, int(step or 1)))
+        return values
+
+    def _day_matches(self, day: datetime) -> bool:
+        in_month = day.day in self.days
+        in_week = (day.weekday() + 1) % 7 in self.weekdays  #< Python's Monday=0, cron's Sunday=0
+        if self._any_day or self._any_weekday:
+            return in_month and in_week  #< one of them is "*", so this is just the other one
+        return in_month or in_week  #< both restricted: cron fires on either
+
+    def next_after(self, moment: datetime) -> datetime:
+        t = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while t <= limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"cron expression {self.expression!r} never fires")
+
+
+@dataclass
+class Schedule:
+    name: str
+    portal: str
+    cron: Cron
+    report_types: list[str] = field(default_factory=list)   #< ISW codes or names; empty for NIP
+    lag_days: int = 1                                        #< newest day to pull is today - lag_days
+    max_catchup_days: int = SCHEDULE_MAX_CATCHUP_DAYS
+    jitter_seconds: int = SCHEDULE_JITTER_SECONDS
+    options: dict = field(default_factory=dict)              #< extra job parameters, e.g. download_mode, ingest
+    next_run: Optional[datetime] = None
+    last_run: Optional[datetime] = None
+    last_window: Optional[tuple[date, date]] = None
+    last_job_id: Optional[str] = None
+    catching_up: bool = False  #< the last window stopped short of today - lag_days; the next one follows soon
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Schedule":
+        known = {"name", "portal", "cron", "report_types", "lag_days", "max_catchup_days", "jitter_seconds"}
+        return cls(
+            name=data.get("name") or f"{data['portal']}:{data['cron']}",
+            portal=data["portal"],
+            cron=Cron(data["cron"]),
+            report_types=[str(t) for t in data.get("report_types", [])],
+            lag_days=int(data.get("lag_days", 1)),
+            max_catchup_days=int(data.get("max_catchup_days", SCHEDULE_MAX_CATCHUP_DAYS)),
+            jitter_seconds=int(data.get("jitter_seconds", SCHEDULE_JITTER_SECONDS)),
+            options={k: v for k, v in data.items() if k not in known},
+        )
+
+
+def load_schedules(source: str = SCHEDULES) -> list[Schedule]:
+    if not source:
+        return []
+    text = source if source.lstrip().startswith("[") else Path(source).read_text(encoding="utf-8")
+    return [Schedule.from_dict(entry) for entry in json.loads(text)]
+
+
+class Scheduler:
+    """Fires each schedule on its cron (plus jitter), pulling everything between the schedule's
+    coverage – the manifest's synced_to of its report types – and today - lag_days.
+
+    A missed or failed firing leaves coverage behind, so the next one (or the catch-up pass at
+    start-up) fetches the missing days in one job, i.e. one portal session. A gap longer than
+    max_catchup_days is pulled in adjoining windows of at most that length, one job after another,
+    each starting on the last synced day so that mark_synced extends coverage every time."""
+
+    def __init__(self, schedules: list[Schedule], sync_keys: Callable[[Schedule], list[str]],
+                 submit: Callable[[Schedule, date, date], Optional[str]], is_active: Callable[[str], bool]):
+        self.schedules = schedules
+        self.sync_keys = sync_keys    #< report types the manifest tracks for a schedule
+        self.submit = submit          #< enqueue a job for the window; returns its id (None if refused)
+        self.is_active = is_active    #< is this job still queued or running?
+        self._task: Optional[asyncio.Task] = None
+
+    def coverage(self, schedule: Schedule) -> Optional[date]:
+        synced = [manifest.synced_to(schedule.portal, key) for key in self.sync_keys(schedule)]
+        return None if not synced or any(s is None for s in synced) else min(synced)
+
+    def target(self, schedule: Schedule, today: Optional[date] = None) -> date:
+        return (today or date.today()) - timedelta(days=schedule.lag_days)
+
+    def window(self, schedule: Schedule, today: Optional[date] = None) -> Optional[tuple[date, date]]:
+        """Next days to pull, or None when the schedule is covered up to today - lag_days.
+
+        The window starts on the oldest synced_to of the schedule's report types – re-checked, like
+        incremental=true, since the portal may publish more files for it later – and spans at most
+        max_catchup_days. Without any sync yet it is the last max_catchup_days up to the target."""
+        end = self.target(schedule, today)
+        span = timedelta(days=max(1, schedule.max_catchup_days) - 1)
+        synced = [manifest.synced_to(schedule.portal, key) for key in self.sync_keys(schedule)]
+        known = [s for s in synced if s is not None]
+        if known and len(known) == len(synced) and min(known) >= end:
+            return None
+        start = min(known) if known else end - span
+        return start, min(end, start + span)
+
+    def _plan(self, schedule: Schedule, after: datetime) -> None:
+        schedule.next_run = schedule.cron.next_after(after) + timedelta(seconds=random.uniform(0, schedule.jitter_seconds))
+
+    def fire(self, schedule: Schedule) -> None:
+        schedule.last_run = datetime.now()
+        if schedule.last_job_id and self.is_active(schedule.last_job_id):
+            logging.info(f"Schedule {schedule.name}: previous job {schedule.last_job_id} still running – skipped")
+            return
+        window = self.window(schedule)
+        if window is None:
+            schedule.catching_up = False
+            logging.info(f"Schedule {schedule.name}: already covered")
+            return
+        if schedule.catching_up and window == schedule.last_window:
+            schedule.catching_up = False  #< the last window's job did not sync; try again on the cron, not in a tight loop
+            logging.warning(f"Schedule {schedule.name}: {window[0]}..{window[1]} did not sync – retrying at the next firing")
+            return
+        start, end = window
+        job_id = self.submit(schedule, start, end)
+        schedule.catching_up = job_id is not None and end < self.target(schedule)
+        schedule.last_window = window
+        schedule.last_job_id = job_id or schedule.last_job_id
+        days = (end - start).days + 1
+        logging.info(f"Schedule {schedule.name}: {start}..{end} ({days} day{'s' if days != 1 else ''}) -> job {job_id}")
+
+    async def _run(self) -> None:
+        now = datetime.now()
+        for schedule in self.schedules:
+            try:
+                behind = self.window(schedule) is not None
+            except Exception as e:
+                logging.error(f"Schedule {schedule.name}: coverage check failed: {e}")
+                behind = False
+            if behind:
+                # behind after downtime or failed runs: catch up soon, spread out by jitter
+                schedule.next_run = now + timedelta(seconds=random.uniform(0, schedule.jitter_seconds))
+            else:
+                self._plan(schedule, now)
+
+        while True:
+            schedule = min(self.schedules, key=lambda s: s.next_run)
+            delay = (schedule.next_run - datetime.now()).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(min(delay, 60))  #< re-check every minute so clock changes are noticed
+                continue
+            try:
+                self.fire(schedule)
+            except Exception as e:
+                logging.error(f"Schedule {schedule.name} failed to fire: {e}")
+                schedule.catching_up = False
+            if schedule.catching_up:
+                # more windows to go: look again shortly – fire() waits while the current job still runs
+                schedule.next_run = datetime.now() + timedelta(seconds=SCHEDULE_CATCHUP_RECHECK_SECONDS)
+            else:
+                self._plan(schedule, datetime.now())
+
+    def start(self) -> None:
+        if self.schedules and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="scheduler")
+            logging.info(f"Scheduler started – {len(self.schedules)} schedules")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def status(self) -> list[dict]:
+        rows = []
+        for s in self.schedules:
+            try:
+                covered, pending, error = self.coverage(s), self.window(s), None
+            except Exception as e:
+                covered, pending, error = None, None, str(e)
+            rows.append({
+                "name": s.name, "portal": s.portal, "cron": s.cron.expression, "report_types": s.report_types,
+                "covered_to": str(covered) if covered else None,
+                "pending_window": [str(d) for d in pending] if pending else None,
+                "next_run": s.next_run.isoformat(timespec="seconds") if s.next_run else None,
+                "last_run": s.last_run.isoformat(timespec="seconds") if s.last_run else None,
+                "last_window": [str(d) for d in s.last_window] if s.last_window else None,
+                "last_job_id": s.last_job_id,
+                "catching_up": s.catching_up,
+                "error": error,
+            })
+        return rows
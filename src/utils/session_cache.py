@@ -0,0 +1,51 @@
+from pathlib import Path
+from typing import Optional
+from src.utils.settings import STATE_DIR
+import hashlib
+import logging
+import os
+import time
+
+# Where Playwright storage_state snapshots are kept and how long they are trusted
+SESSION_DIR = Path(os.getenv("SESSION_CACHE_DIR", STATE_DIR / "sessions"))
+SESSION_TTL = int(os.getenv("SESSION_TTL_SECONDS", "1800"))
+
+
+class SessionCache:
+    """Authenticated portal sessions (Playwright storage_state) keyed by portal and user."""
+
+    def __init__(self, directory: Path = SESSION_DIR, ttl: int = SESSION_TTL):
+        self.directory = Path(directory)
+        self.ttl = ttl
+
+    def _path(self, portal: str, user: str) -> Path:
+        user_key = hashlib.sha1(user.encode("utf-8")).hexdigest()[:16]  #< keep usernames out of file names
+        return self.directory / f"{portal}_{user_key}.json"
+
+    def load(self, portal: str, user: str) -> Optional[str]:
+        """Return the storage_state path for this portal/user, or None if missing or stale."""
+        path = self._path(portal, user)
+        if not path.exists():
+            return None
+        if time.time() - path.stat().st_mtime > self.ttl:
+            self.invalidate(portal, user)
+            return None
+        return str(path)
+
+    async def save(self, portal: str, user: str, context) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(portal, user)
+        tmp_path = path.with_suffix(".tmp")
+        await context.storage_state(path=str(tmp_path))
+        os.replace(tmp_path, path)  #< atomic swap so concurrent jobs never read half a file
+        logging.info(f"Session cached for {portal}")
+
+    def invalidate(self, portal: str, user: str) -> None:
+        try:
+            self._path(portal, user).unlink()
+            logging.info(f"Session expired for {portal} – cache cleared")
+        except FileNotFoundError:
+            pass
+
+
+session_cache = SessionCache()
@@ -0,0 +1,62 @@
+from pathlib import Path
+from pydantic import field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+import os
+
+_ROOT = Path(__file__).resolve().parents[2]
+
+# Local bot state – log, manifest, checkpoints, saved sessions – lives outside the source tree (env override)
+STATE_DIR = Path(os.getenv("STATE_DIR", Path.home() / ".transaction-reports"))
+
+
+class PortalSettings(BaseSettings):
+    """Connection settings of one portal, read from its <PORTAL>_* variables (environment or .env).
+    Nothing is required here – missing() says what a portal still needs before its bot can load."""
+
+    model_config = SettingsConfigDict(env_file=(_ROOT / ".env", _ROOT / "src" / ".env"), extra="ignore")
+
+    enabled: bool = True    #< <PORTAL>_ENABLED=false runs a replica without this portal
+    portal_url: str = ""
+    user: str = ""
+    pw: str = ""
+    accounts: str = ""      #< "user1:pass1,user2:pass2"; the single USER/PW pair is used otherwise
+
+    @field_validator("portal_url", "user", "pw", "accounts", mode="before")
+    @classmethod
+    def _unquote(cls, value):
+        return value.strip().strip('"').strip("'") if isinstance(value, str) else value
+
+    @property
+    def prefix(self) -> str:
+        return self.model_config["env_prefix"].upper()
+
+    def credentials(self) -> list[tuple[str, str]]:
+        if self.accounts:
+            pairs = [entry.split(":", 1) for entry in self.accounts.split(",") if ":" in entry]
+            return [(user.strip(), password.strip()) for user, password in pairs if user.strip()]
+        return [(self.user, self.pw)] if self.user and self.pw else []
+
+    def missing(self) -> list[str]:
+        missing = [] if self.portal_url else [f"{self.prefix}PORTAL_URL"]
+        if not self.credentials():
+            missing.append(f"{self.prefix}USER/{self.prefix}PW or {self.prefix}ACCOUNTS")
+        return missing
+
+
+class NipSettings(PortalSettings):
+    model_config = SettingsConfigDict(env_prefix="NIP_")
+
+
+class IswSettings(PortalSettings):
+    model_config = SettingsConfigDict(env_prefix="ISW_")
+
+
+_SETTINGS_CLASSES = {"nip": NipSettings, "isw": IswSettings}
+_settings: dict[str, PortalSettings] = {}
+
+
+def portal_settings(portal: str) -> PortalSettings:
+    """The settings of a portal, read once per process."""
+    if portal not in _settings:
+        _settings[portal] = _SETTINGS_CLASSES[portal]()
+    return _settings[portal]
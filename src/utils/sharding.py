@@ -0,0 +1,108 @@
+from datetime import date, timedelta
+from typing import Awaitable, Callable
+from src.enums import ShardUnit
+from src.utils.jobs import bump_progress, report_progress
+from src.utils.logger import new_message_buffer
+import asyncio
+import logging
+import os
+
+# Shards of one job running at once (env override); each shard takes its own browser context
+SHARD_PARALLELISM = int(os.getenv("SHARD_PARALLELISM", "2"))
+
+ShardRunner = Callable[[date, date], Awaitable[dict]]
+
+# How per-type statuses combine across shards: the first one any shard reports wins
+_TYPE_STATUS_ORDER = ("failed", "partial", "success", "warning", "no report available")
+
+
+def split_range(start_date: date, end_date: date, unit: ShardUnit) -> list[tuple[date, date]]:
+    """Split an inclusive date range into consecutive day or week shards."""
+    step = timedelta(days=7 if unit == ShardUnit.week else 1)
+    shards = []
+    shard_start = start_date
+    while shard_start <= end_date:
+        shard_end = min(shard_start + step - timedelta(days=1), end_date)
+        shards.append((shard_start, shard_end))
+        shard_start = shard_end + timedelta(days=1)
+    return shards
+
+
+def merge_report_types(shard_results: list[dict]) -> list[dict]:
+    """Combine the ISW per-type breakdowns of all shards by report code: counts add up and a
+    failure in any shard marks the type failed, so it is never counted as synced."""
+    merged: dict[str, dict] = {}
+    for shard in shard_results:
+        for r in shard.get("report_types", []):
+            entry = merged.setdefault(r["report_code"], {"report_code": r["report_code"], "statuses": set(),
+                                                         "files_downloaded": 0, "files_skipped": 0, "files_failed": 0})
+            entry["statuses"].add(r.get("status"))
+            for count in ("files_downloaded", "files_skipped", "files_failed"):
+                entry[count] += r.get(count, 0)
+    for entry in merged.values():
+        statuses = entry.pop("statuses")
+        entry["status"] = next((s for s in _TYPE_STATUS_ORDER if s in statuses), "failed")
+    return list(merged.values())
+
+
+async def run_shards(shards: list[tuple[date, date]], run_shard: ShardRunner, parallelism: int = SHARD_PARALLELISM) -> dict:
+    """Run `run_shard` for every shard with at most `parallelism` at once and merge the results.
+
+    A shard counts as failed when it raises or returns no/"failed" status (the bots' error path)."""
+    semaphore = asyncio.Semaphore(max(1, parallelism))
+    report_progress(shards_total=len(shards), shards_done=0)
+
+    async def one(shard_start: date, shard_end: date) -> dict:
+        async with semaphore:
+            label = f"{shard_start}..{shard_end}"
+            try:
+                result = await run_shard(shard_start, shard_end)
+                error = None if result.get("status") not in (None, "failed") else result.get("error") or "run ended with an error"
+            except Exception as e:
+                logging.error(f"Shard {label} failed: {e}")
+                result, error = {}, str(e)
+            bump_progress("shards_done")
+            shard_result = {
+                "start_date": str(shard_start),
+                "end_date": str(shard_end),
+                "status": "failed" if error else result.get("status"),
+                "files_downloaded": result.get("files_downloaded", result.get("total_saved", 0)),
+                "files_skipped": result.get("files_skipped", 0),
+                "files_failed": result.get("files_failed", 0),
+                "error": error,
+                "messages": [f"[{label}] {m}" for m in result.get("messages", [])],
+            }
+            if "report_types" in result:
+                shard_result["report_types"] = result["report_types"]  #< ISW per-type breakdown
+            if "timings" in result:
+                shard_result["timings"] = result["timings"]
+            if "wait_timings" in result:
+                shard_result["wait_timings"] = result["wait_timings"]
+            return shard_result
+
+    shard_results = await asyncio.gather(*(one(s, e) for s, e in shards))
+    messages = new_message_buffer()
+    for r in shard_results:
+        messages.extend(r.pop("messages"))
+    failed = sum(1 for r in shard_results if r["status"] == "failed")
+    total = sum(r["files_downloaded"] for r in shard_results)
+
+    if failed == len(shard_results):
+        status = "failed"
+    elif failed or any(r["status"] == "partial" for r in shard_results):
+        status = "partial"
+    else:
+        status = "success" if total > 0 else "warning"
+
+    merged = {
+        "status": status,
+        "files_downloaded": total,
+        "files_skipped": sum(r["files_skipped"] for r in shard_results),
+        "files_failed": sum(r["files_failed"] for r in shard_results),
+        "shards_failed": failed,
+        "messages": messages,
+        "shards": shard_results,
+    }
+    if any("report_types" in r for r in shard_results):
+        merged["report_types"] = merge_report_types(shard_results)
+    return merged
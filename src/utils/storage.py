@@ -0,0 +1,188 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Optional
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+
+# Where downloaded reports end up (env overrides)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").strip().lower()   #< local | s3
+STORAGE_NAMING = os.getenv("STORAGE_NAMING", "original").strip().lower()  #< original | content (hash added to the name)
+S3_BUCKET = os.getenv("S3_BUCKET", "").strip()
+S3_PREFIX = os.getenv("S3_PREFIX", "").strip().strip("/")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "").strip() or None  #< MinIO or another S3-compatible stand-in
+CHUNK_SIZE = 1024 * 1024
+S3_PART_SIZE = 8 * 1024 * 1024  #< multipart chunk; S3 wants at least 5 MiB per part
+
+
+@dataclass
+class StoredFile:
+    name: str
+    location: str                #< local path or s3:// URI, as recorded in the manifest
+    size: int
+    sha256: str
+    path: Optional[Path] = None  #< local file, when the backend keeps one
+
+
+def content_name(filename: str, sha256: str) -> str:
+    """Content-addressed name: identical files share it, different files never collide.
+    The original name stays in front so dates in it can still be parsed."""
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}_{sha256[:12]}{ext}"
+
+
+async def file_chunks(path: Path, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    with open(path, "rb") as fh:
+        while chunk := await asyncio.to_thread(fh.read, chunk_size):
+            yield chunk
+
+
+class LocalStorage:
+    """A directory. Files are written to a hidden .part file and renamed into place when complete."""
+
+    def __init__(self, directory: Path, naming: str = STORAGE_NAMING):
+        self.directory = Path(directory)
+        self.naming = naming
+
+    @property
+    def location(self) -> str:
+        return str(self.directory)
+
+    async def save_stream(self, filename: str, chunks: AsyncIterator[bytes]) -> StoredFile:
+        """Write `chunks` to storage, hashing and counting bytes on the way."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        part_path = self.directory / f".{uuid.uuid4().hex}.part"
+        digest, size = hashlib.sha256(), 0
+        try:
+            with open(part_path, "wb") as fh:
+                async for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    fh.write(chunk)
+            return await self._commit(part_path, filename, digest.hexdigest(), size)
+        except BaseException:
+            part_path.unlink(missing_ok=True)  #< never leave half-written files behind
+            raise
+
+    async def save_file(self, filename: str, source: Path) -> StoredFile:
+        """Take over a finished file (e.g. Playwright's temp copy of a download).
+        On the same filesystem it is hashed and renamed – no second copy – otherwise streamed."""
+        source = Path(source)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if source.stat().st_dev != self.directory.stat().st_dev:
+            return await self.save_stream(filename, file_chunks(source))
+
+        digest, size = hashlib.sha256(), 0
+        async for chunk in file_chunks(source):
+            digest.update(chunk)
+            size += len(chunk)
+        return await self._commit(source, filename, digest.hexdigest(), size)
+
+    async def _same_content(self, path: Path, sha256: str, size: int) -> bool:
+        if path.stat().st_size != size:
+            return False
+        digest = hashlib.sha256()
+        async for chunk in file_chunks(path):
+            digest.update(chunk)
+        return digest.hexdigest() == sha256
+
+    async def _commit(self, source: Path, filename: str, sha256: str, size: int) -> StoredFile:
+        name = content_name(filename, sha256) if self.naming == "content" else filename
+        target = self.directory / name
+        if target.exists() and self.naming != "content" and not await self._same_content(target, sha256, size):
+            # another report under the same name: keep both, the new one content-addressed
+            name = content_name(filename, sha256)
+            target = self.directory / name
+        if target.exists():
+            source.unlink(missing_ok=True)  #< same bytes already stored
+        else:
+            os.replace(source, target)
+        return StoredFile(name=name, location=str(target), size=size, sha256=sha256, path=target)
+
+
+class S3Storage:
+    """An S3-compatible bucket (boto3 is only needed for this backend). Objects are uploaded
+    in parts while the hash is computed, and only become visible once the upload completes."""
+
+    def __init__(self, bucket: str, prefix: str = "", naming: str = STORAGE_NAMING, endpoint_url: Optional[str] = S3_ENDPOINT_URL):
+        if not bucket:
+            raise ValueError("STORAGE_BACKEND=s3 needs S3_BUCKET")
+        import boto3  #< optional dependency
+        self.bucket = bucket
+        self.prefix = prefix
+        self.naming = naming
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    @property
+    def location(self) -> str:
+        return f"s3://{self.bucket}/{self.prefix}"
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}/{name}" if self.prefix else name
+
+    async def save_stream(self, filename: str, chunks: AsyncIterator[bytes]) -> StoredFile:
+        # the content-addressed key is only known at the end, so upload under a temporary key first
+        key = self._key(f".incoming/{uuid.uuid4().hex}" if self.naming == "content" else filename)
+        digest, size, buffer, parts, upload_id = hashlib.sha256(), 0, bytearray(), [], None
+        try:
+            async for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                buffer += chunk
+                if len(buffer) >= S3_PART_SIZE:
+                    if upload_id is None:
+                        upload_id = (await asyncio.to_thread(self.client.create_multipart_upload, Bucket=self.bucket, Key=key))["UploadId"]
+                    parts.append(await self._upload_part(key, upload_id, len(parts) + 1, bytes(buffer)))
+                    buffer.clear()
+
+            if upload_id is None:
+                await asyncio.to_thread(self.client.put_object, Bucket=self.bucket, Key=key, Body=bytes(buffer))
+            else:
+                if buffer:
+                    parts.append(await self._upload_part(key, upload_id, len(parts) + 1, bytes(buffer)))
+                await asyncio.to_thread(self.client.complete_multipart_upload, Bucket=self.bucket, Key=key,
+                                        UploadId=upload_id, MultipartUpload={"Parts": parts})
+        except BaseException:
+            if upload_id is not None:
+                await asyncio.to_thread(self.client.abort_multipart_upload, Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+
+        sha256 = digest.hexdigest()
+        name = filename
+        if self.naming == "content":
+            name = content_name(filename, sha256)
+            await asyncio.to_thread(self.client.copy_object, Bucket=self.bucket, Key=self._key(name),
+                                    CopySource={"Bucket": self.bucket, "Key": key})
+            await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=key)
+        return StoredFile(name=name, location=f"s3://{self.bucket}/{self._key(name)}", size=size, sha256=sha256)
+
+    async def _upload_part(self, key: str, upload_id: str, number: int, body: bytes) -> dict:
+        response = await asyncio.to_thread(self.client.upload_part, Bucket=self.bucket, Key=key,
+                                           UploadId=upload_id, PartNumber=number, Body=body)
+        return {"PartNumber": number, "ETag": response["ETag"]}
+
+    async def save_file(self, filename: str, source: Path) -> StoredFile:
+        return await self.save_stream(filename, file_chunks(Path(source)))
+
+
+def get_storage(local_dir: Path, namespace: str):
+    """Storage for one portal's downloads: `local_dir`, or `namespace` under S3_PREFIX in the bucket."""
+    if STORAGE_BACKEND == "s3":
+        return S3Storage(S3_BUCKET, "/".join(p for p in (S3_PREFIX, namespace) if p))
+    if STORAGE_BACKEND != "local":
+        logging.warning(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r} – using the local directory")
+    return LocalStorage(local_dir)
+
+
+def storage_location(local_dir: Path, namespace: str) -> str:
+    if STORAGE_BACKEND == "s3":
+        return "s3://" + "/".join(p for p in (S3_BUCKET, S3_PREFIX, namespace) if p)
+    return str(local_dir)
+
+
+async def save_download(storage, dl, filename: Optional[str] = None) -> StoredFile:
+    """Store a finished Playwright download. The Python API has no read stream for downloads,
+    so the browser's temp file is handed to storage directly instead of being copied by save_as."""
+    return await storage.save_file(filename or dl.suggested_filename, Path(await dl.path()))
@@ -0,0 +1,63 @@
+from typing import Optional
+
+# JS run in the page/frame over every download element: one round trip returns the
+# whole table. Columns are found by header text, falling back to what the cell looks like.
+# `key` uses the same normalisation as manifest.item_key_for_url so listings match the manifest.
+_ROWS_JS = """(els) => {
+    const DATE = /\\b(\\d{1,2}[\\/.-]\\d{1,2}[\\/.-]\\d{2,4}|\\d{4}-\\d{2}-\\d{2})\\b/;
+    const SIZE = /^\\s*\\d+(?:[.,]\\d+)?\\s*(?:B|KB|MB|GB|bytes)\\s*$/i;
+    const FILE = /[^\\s\\/]+\\.(zip|csv|xlsx?|pdf|txt)\\b/i;
+    const clean = (s) => (s || '').replace(/\\s+/g, ' ').trim();
+    const headers = new Map();
+
+    const columns = (table) => {
+        if (!table) return {};
+        if (!headers.has(table)) {
+            const found = {};
+            table.querySelectorAll('thead th, thead td').forEach((th, i) => {
+                const h = clean(th.innerText).toLowerCase();
+                if (found.filename === undefined && /file|name/.test(h)) found.filename = i;
+                if (found.date === undefined && /date/.test(h)) found.date = i;
+                if (found.type === undefined && /type|category/.test(h)) found.type = i;
+                if (found.size === undefined && /size/.test(h)) found.size = i;
+            });
+            headers.set(table, found);
+        }
+        return headers.get(table);
+    };
+
+    return els.map((el) => {
+        const a = el.closest('a') || el.querySelector('a');
+        const href = a && a.getAttribute('href');
+        const linked = href && !href.startsWith('javascript:') && !href.endsWith('#');
+        const target = linked ? href : (el.getAttribute('data-href') || el.getAttribute('data-url'));
+        const url = target ? new URL(target, document.baseURI).href : null;  //< relative data-href too, so httpx can fetch it
+        const row = el.closest('tr');
+        const text = clean(row ? row.innerText : el.innerText);
+        const cells = row ? Array.from(row.cells).map((c) => clean(c.innerText)) : [];
+        const cols = columns(row && row.closest('table'));
+        const pick = (name, test) => cols[name] !== undefined ? cells[cols[name]] : cells.find((c) => test.test(c));
+
+        const filename = (a && a.getAttribute('download')) || pick('filename', FILE) || null;
+        const dateCell = pick('date', DATE);
+        return {
+            key: linked ? url.replace(/;jsessionid=[^?#]*/i, '') : 'row:' + text,
+            url: url || null,
+            filename: filename ? (filename.match(FILE) || [filename])[0] : null,
+            date: dateCell ? (dateCell.match(DATE) || [dateCell])[0] : null,
+            type: cols.type !== undefined ? cells[cols.type] : null,
+            size: pick('size', SIZE) || null,
+            text,
+        };
+    });
+}"""
+
+
+async def extract_rows(frame, selector: str, report_type: Optional[str] = None) -> list[dict]:
+    """Metadata for every download element matching `selector`, in a single evaluate.
+    Each row has key, url, filename, date, type, size and the raw row text."""
+    rows = await frame.eval_on_selector_all(selector, _ROWS_JS)
+    if report_type is not None:
+        for row in rows:
+            row["type"] = row["type"] or report_type
+    return rows
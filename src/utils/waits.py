@@ -0,0 +1,115 @@
+from typing import Awaitable, Callable, Optional
+from src.utils.metrics import registry
+import logging
+import os
+import time
+
+# Default ceiling for every condition wait (env override). A wait that hits its
+# ceiling is not an error – the bot carries on, exactly as after the old fixed sleeps.
+WAIT_CEILING_MS = int(os.getenv("WAIT_CEILING_MS", "15000"))
+
+Action = Optional[Callable[[], Awaitable]]
+
+# Resolves on a DataTables/KTDatatable draw event or on the first change to the table body
+_ARM_REDRAW_JS = """(selector) => {
+    window.__botRedrawn = false;
+    const done = () => { window.__botRedrawn = true; };
+    if (window.jQuery) {
+        window.jQuery(document).one('draw.dt datatable-on-layout-updated kt-datatable--on-layout-updated', done);
+    }
+    const body = document.querySelector(selector);
+    if (body) {
+        const observer = new MutationObserver(() => { observer.disconnect(); done(); });
+        observer.observe(body, { childList: true, subtree: true });
+    }
+}"""
+
+
+class _ActionFailed(Exception):
+    """Carries an error raised by a wait's action past the ceiling handling: only the wait
+    itself may time out quietly, a click or navigation that fails must still fail."""
+
+    def __init__(self, error: Exception):
+        super().__init__(str(error))
+        self.error = error
+
+
+async def _run_action(action: Action) -> None:
+    try:
+        await action()
+    except Exception as e:
+        raise _ActionFailed(e) from e
+
+
+class Waits:
+    """Event-driven replacements for fixed `wait_for_timeout` sleeps.
+    Every wait is capped by a ceiling and its real duration is recorded in `timings`."""
+
+    def __init__(self, ceiling_ms: int = WAIT_CEILING_MS):
+        self.ceiling_ms = ceiling_ms
+        self.timings: list[dict] = []
+
+    async def _timed(self, name: str, coro, ceiling_ms: int) -> float:
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            await coro
+        except _ActionFailed as e:
+            raise e.error
+        except Exception as e:
+            if "Timeout" not in type(e).__name__:
+                raise
+            timed_out = True
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.timings.append({"wait": name, "ms": elapsed_ms, "ceiling_hit": timed_out})
+        registry.observe("bot_wait_seconds", elapsed_ms / 1000, wait=name)
+        if timed_out:
+            registry.inc("bot_wait_ceiling_hits_total", wait=name)
+        logging.debug(f"wait {name}: {elapsed_ms} ms{' (ceiling)' if timed_out else ''}")
+        return elapsed_ms
+
+    async def element(self, locator, state: str = "visible", name: str = "element", ceiling_ms: Optional[int] = None) -> float:
+        """Wait for an element state: attached, detached, visible or hidden."""
+        ceiling_ms = ceiling_ms or self.ceiling_ms
+        return await self._timed(name, locator.wait_for(state=state, timeout=ceiling_ms), ceiling_ms)
+
+    async def predicate(self, frame, expression: str, arg=None, name: str = "predicate", ceiling_ms: Optional[int] = None) -> float:
+        """Wait until a JS predicate evaluated in the page/frame is truthy."""
+        ceiling_ms = ceiling_ms or self.ceiling_ms
+        return await self._timed(name, frame.wait_for_function(expression, arg=arg, timeout=ceiling_ms), ceiling_ms)
+
+    async def redraw(self, frame, action: Action, tbody_selector: str = "tbody", name: str = "table redraw", ceiling_ms: Optional[int] = None) -> float:
+        """Run `action` and wait for the table to draw its new rows."""
+        ceiling_ms = ceiling_ms or self.ceiling_ms
+        await frame.evaluate(_ARM_REDRAW_JS, tbody_selector)
+        await action()
+        return await self._timed(name, frame.wait_for_function("() => window.__botRedrawn === true", timeout=ceiling_ms), ceiling_ms)
+
+    async def xhr(self, page, action: Action, url_part: Optional[str] = None, name: str = "xhr", ceiling_ms: Optional[int] = None) -> float:
+        """Run `action` and wait for the XHR/fetch response it triggers (optionally matching `url_part`)."""
+        ceiling_ms = ceiling_ms or self.ceiling_ms
+
+        def matches(response) -> bool:
+            return (response.request.resource_type in ("xhr", "fetch")
+                    and (url_part is None or url_part in response.url))
+
+        async def run():
+            async with page.expect_response(matches, timeout=ceiling_ms):
+                await _run_action(action)
+
+        return await self._timed(name, run(), ceiling_ms)
+
+    async def frame_load(self, page, frame_name: str, action: Action = None, name: Optional[str] = None, ceiling_ms: Optional[int] = None) -> float:
+        """Wait for the named frame to (re)load – after `action` when one is given."""
+        ceiling_ms = ceiling_ms or self.ceiling_ms
+
+        async def run():
+            if action is not None:
+                async with page.expect_event("framenavigated", predicate=lambda f: f.name == frame_name, timeout=ceiling_ms):
+                    await _run_action(action)
+            else:
+                while page.frame(name=frame_name) is None:
+                    await page.wait_for_event("frameattached", timeout=ceiling_ms)
+            await page.frame(name=frame_name).wait_for_load_state("load", timeout=ceiling_ms)
+
+        return await self._timed(name or f"frame {frame_name}", run(), ceiling_ms)
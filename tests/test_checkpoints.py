@@ -0,0 +1,102 @@
+from src.utils import checkpoints as checkpoints_module
+from src.utils.checkpoints import CheckpointScope, CheckpointStore, PageCheckpoint
+from src.utils.jobs import Job, current_job
+import pytest
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    fresh = CheckpointStore(tmp_path / "checkpoints.sqlite3")
+    monkeypatch.setattr(checkpoints_module, "checkpoints", fresh)
+    return fresh
+
+
+@pytest.fixture
+def job():
+    job = Job(portal="isw", params={"report_types": ["24"]})
+    token = current_job.set(job)
+    yield job
+    current_job.reset(token)
+
+
+def test_store_keeps_state_until_the_job_finishes(store):
+    store.begin("job-1", "nip", {"start_date": "2026-10-01"})
+    store.update("job-1", "transaction:2026-10-01..2026-10-16", pages_done=3)
+    store.update("job-1", "shards", done=["2026-10-01..2026-10-07"])
+    saved = store.get("job-1")
+    assert saved["status"] == "running" and saved["params"] == {"start_date": "2026-10-01"}
+    assert saved["state"] == {"transaction:2026-10-01..2026-10-16": {"pages_done": 3}, "shards": {"done": ["2026-10-01..2026-10-07"]}}
+
+    store.finish("job-1", completed=False)
+    assert [c["job_id"] for c in store.interrupted()] == ["job-1"]
+
+    store.begin("job-1", "nip", {"start_date": "2026-10-01"})  #< resume keeps the state
+    assert store.get("job-1")["status"] == "running"
+    assert store.get("job-1")["state"]["transaction:2026-10-01..2026-10-16"] == {"pages_done": 3}
+
+    store.finish("job-1", completed=True)
+    assert store.get("job-1") is None and store.interrupted() == []
+
+
+def test_update_of_an_unknown_job_is_ignored(store):
+    store.update("missing", "scope", pages_done=1)
+    assert store.get("missing") is None
+
+
+def test_interrupt_running_after_a_restart(tmp_path):
+    path = tmp_path / "checkpoints.sqlite3"
+    before = CheckpointStore(path)
+    before.begin("job-1", "isw", {})
+    before.begin("job-2", "isw", {})
+    before.finish("job-2", completed=True)
+
+    after = CheckpointStore(path)
+    assert after.interrupt_running() == 1
+    assert [c["job_id"] for c in after.interrupted()] == ["job-1"]
+
+
+def test_scope_outside_a_job_only_remembers_in_memory(store):
+    scope = CheckpointScope("24:2026-10-01..2026-10-16")
+    scope.update(pages_done=2)
+    assert scope.job_id is None and scope.get("pages_done") == 2
+
+
+def test_scope_resumes_from_the_saved_state(store, job):
+    store.begin(job.checkpoint_id, job.portal, job.params)
+    CheckpointScope("24:2026-10-01..2026-10-16").update(pages_done=4)
+
+    resumed = CheckpointScope("24:2026-10-01..2026-10-16")
+    assert resumed.get("pages_done") == 4
+    assert CheckpointScope("1:2026-10-01..2026-10-16").get("pages_done", 0) == 0
+
+
+def test_page_checkpoint_waits_for_every_file_of_a_page(store, job):
+    store.begin(job.checkpoint_id, job.portal, job.params)
+    pages = PageCheckpoint(CheckpointScope("24"))
+    pages.page(1, ["a", "b"])
+    pages.page(2, [])          #< everything on it was already in the manifest
+    pages.page(3, ["c"])
+    pages.saved("a")
+    assert pages.settle() == 0
+
+    pages.saved("c")           #< a later page finishing first does not move past page 1
+    assert pages.settle() == 0
+
+    pages.saved("b")
+    assert pages.settle() == 3
+    assert store.get(job.checkpoint_id)["state"]["24"] == {"pages_done": 3}
+
+
+def test_page_checkpoint_keeps_failed_pages_open_for_the_resume(store, job):
+    store.begin(job.checkpoint_id, job.portal, job.params)
+    pages = PageCheckpoint(CheckpointScope("24"))
+    pages.page(1, ["a"])
+    pages.page(2, ["b"])       #< its download failed even after retries
+    pages.page(3, ["c"])
+    for key in ("a", "c"):
+        pages.saved(key)
+    assert pages.settle() == 1
+    store.finish(job.checkpoint_id, completed=False)
+
+    resumed = PageCheckpoint(CheckpointScope("24"))
+    assert resumed.done == 1   #< the resume starts after page 1 and picks up page 2 again
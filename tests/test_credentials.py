@@ -0,0 +1,117 @@
+from src.utils import credentials
+from src.utils.credentials import CredentialPool, TokenBucket
+import asyncio
+import pytest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(credentials.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(credentials.asyncio, "sleep", clock.sleep)
+    return clock
+
+
+def test_bucket_hands_out_the_burst_then_meters_at_the_rate(clock):
+    async def run():
+        bucket = TokenBucket(rate=2, burst=3)
+        return [await bucket.acquire() for _ in range(5)]
+
+    waits = asyncio.run(run())
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3:] == pytest.approx([0.5, 0.5])
+
+
+def test_bucket_refills_while_idle_up_to_the_burst(clock):
+    async def run():
+        bucket = TokenBucket(rate=1, burst=2)
+        await bucket.acquire()
+        await bucket.acquire()
+        clock.now += 60
+        return [await bucket.acquire() for _ in range(3)]
+
+    assert asyncio.run(run()) == pytest.approx([0.0, 0.0, 1.0])
+
+
+def test_bucket_hold_pauses_and_empties_it(clock):
+    async def run():
+        bucket = TokenBucket(rate=10, burst=5)
+        bucket.hold(30)
+        return await bucket.acquire()
+
+    assert asyncio.run(run()) == pytest.approx(30.1)
+
+
+def test_bucket_disabled_by_zero_rate(clock):
+    async def run():
+        bucket = TokenBucket(rate=0, burst=1)
+        return [await bucket.acquire() for _ in range(100)]
+
+    assert set(asyncio.run(run())) == {0.0} and clock.slept == []
+
+
+def test_pool_requires_accounts():
+    with pytest.raises(ValueError):
+        CredentialPool("nip", [])
+
+
+def test_lease_spreads_runs_over_the_least_busy_accounts():
+    async def run():
+        pool = CredentialPool("nip", [("a", "1"), ("b", "2")], concurrency=2, rate=0)
+        async with pool.lease() as first, pool.lease() as second, pool.lease() as third:
+            return first.user, second.user, third.user, [a.active for a in pool.accounts]
+
+    first, second, third, active = asyncio.run(run())
+    assert {first, second} == {"a", "b"} and third in ("a", "b")
+    assert sorted(active) == [1, 2]
+
+
+def test_lease_waits_for_a_free_slot():
+    async def run():
+        pool = CredentialPool("nip", [("a", "1")], concurrency=1, rate=0)
+        order = []
+
+        async def job(name, hold):
+            async with pool.lease():
+                order.append(f"{name} start")
+                await asyncio.sleep(hold)
+                order.append(f"{name} end")
+
+        await asyncio.gather(job("one", 0.05), job("two", 0))
+        return order, pool.accounts[0].active
+
+    order, active = asyncio.run(run())
+    assert order == ["one start", "one end", "two start", "two end"] and active == 0
+
+
+def test_cooldown_skips_the_account_and_waits_when_all_cool_down():
+    async def run():
+        pool = CredentialPool("isw", [("a", "1"), ("b", "2")], concurrency=1, rate=0, cooldown=60)
+        pool.cooldown(pool.accounts[0], "http 429")
+        async with pool.lease() as account:
+            skipped = account.user
+        pool.cooldown(pool.accounts[1], "http 429", seconds=0.05)
+        pool.accounts[0].cooldown_until = 0
+        pool.cooldown(pool.accounts[0], "http 429", seconds=0.1)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        async with pool.lease() as account:
+            return skipped, account.user, loop.time() - started, pool.status()
+
+    skipped, user, waited, status = asyncio.run(run())
+    assert skipped == "b"
+    assert user == "b" and 0.03 <= waited < 0.1
+    assert [s["account"] for s in status] == [1, 2] and status[1]["active"] == 1
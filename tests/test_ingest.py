@@ -0,0 +1,29 @@
+from src.utils.ingest import ingest_archive
+import pyarrow.parquet as pq
+import zipfile
+
+
+def test_members_with_the_same_stem_keep_their_own_rows(tmp_path):
+    archive = tmp_path / "WAYA MFB_20250804_095959.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("a/x.csv", "Amount\n1\n2\n")
+        zf.writestr("b/x.csv", "Amount\n3\n")
+        zf.writestr("x.csv", "Amount\n4\n")
+        zf.writestr("a_x.csv", "Amount\n5\n")
+
+    result = ingest_archive(archive, tmp_path / "parquet")
+    files = sorted((tmp_path / "parquet" / "date=2025-08-04").iterdir())
+    assert result["rows"] == 5 and len(files) == len(result["files"]) == 4
+    members = {f.name: pq.read_table(f).column("_source_member").to_pylist() for f in files}
+    assert sorted(m for rows in members.values() for m in rows) == ["a/x.csv", "a/x.csv", "a_x.csv", "b/x.csv", "x.csv"]
+    assert all(len(set(rows)) == 1 for rows in members.values())
+
+
+def test_rows_are_partitioned_by_their_date_column(tmp_path):
+    archive = tmp_path / "report_20250804_1.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("t.csv", "Transaction Date,Amount\n03/08/2025,1\n04/08/2025,2\n04/08/2025,3\n")
+
+    ingest_archive(archive, tmp_path / "parquet")
+    counts = {p.parent.name: pq.read_table(p).num_rows for p in (tmp_path / "parquet").glob("*/*.parquet")}
+    assert counts == {"date=2025-08-03": 1, "date=2025-08-04": 2}
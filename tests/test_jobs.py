@@ -0,0 +1,43 @@
+from src.enums import JobStatus
+from src.utils.jobs import JobQueue
+import asyncio
+import pytest
+
+
+def _finish(runner):
+    async def run():
+        queue = JobQueue(workers=1)
+        await queue.start()
+        job = queue.submit("nip", {}, runner)
+        await queue._queue.join()
+        await queue.stop()
+        return job
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("status, expected", [("success", JobStatus.succeeded), ("warning", JobStatus.succeeded),
+                                              ("partial", JobStatus.partial)])
+def test_job_status_follows_the_result(status, expected):
+    async def runner():
+        return {"status": status}
+
+    job = _finish(runner)
+    assert job.status == expected and job.error is None and job.finished
+
+
+def test_a_failed_result_fails_the_job():
+    async def runner():
+        return {"status": "failed", "error": "browser failed to launch"}
+
+    job = _finish(runner)
+    assert job.status == JobStatus.failed and job.error == "browser failed to launch"
+    assert job.events[-1]["event"] == "done" and job.events[-1]["status"] == "failed"
+
+
+def test_a_raising_runner_fails_the_job():
+    async def runner():
+        raise RuntimeError("boom")
+
+    job = _finish(runner)
+    assert job.status == JobStatus.failed and job.error.startswith("boom")
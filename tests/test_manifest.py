@@ -0,0 +1,46 @@
+from datetime import date
+from src.utils.manifest import Manifest, item_key_for_url
+import pytest
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return Manifest(tmp_path / "manifest.sqlite3")
+
+
+def test_mark_synced_extends_only_adjoining_windows(manifest):
+    manifest.mark_synced("nip", "transaction", date(2026, 10, 1), date(2026, 10, 5))
+    assert manifest.synced_to("nip", "transaction") == date(2026, 10, 5)
+
+    manifest.mark_synced("nip", "transaction", date(2026, 10, 6), date(2026, 10, 8))   #< next day: joins
+    assert manifest.synced_to("nip", "transaction") == date(2026, 10, 8)
+
+    manifest.mark_synced("nip", "transaction", date(2026, 10, 8), date(2026, 10, 9))   #< overlaps the synced day: joins
+    assert manifest.synced_to("nip", "transaction") == date(2026, 10, 9)
+
+    manifest.mark_synced("nip", "transaction", date(2026, 10, 11), date(2026, 10, 20))  #< leaves a gap: ignored
+    assert manifest.synced_to("nip", "transaction") == date(2026, 10, 9)
+
+    manifest.mark_synced("nip", "transaction", date(2026, 10, 1), date(2026, 10, 3))   #< older window: no step back
+    assert manifest.synced_to("nip", "transaction") == date(2026, 10, 9)
+
+
+def test_incremental_start_rechecks_the_synced_day(manifest):
+    assert manifest.incremental_start("isw", ["24"], date(2026, 10, 1)) == date(2026, 10, 1)
+    manifest.mark_synced("isw", "24", date(2026, 10, 1), date(2026, 10, 9))
+    assert manifest.incremental_start("isw", ["24"], date(2026, 10, 1)) == date(2026, 10, 9)
+    assert manifest.incremental_start("isw", ["24"], date(2026, 10, 12)) == date(2026, 10, 12)
+    # a type never synced pulls the whole requested window
+    assert manifest.incremental_start("isw", ["24", "1"], date(2026, 10, 1)) == date(2026, 10, 1)
+
+
+def test_incremental_window_joins_what_mark_synced_accepts(manifest):
+    manifest.mark_synced("nip", "transaction", date(2026, 10, 1), date(2026, 10, 9))
+    start = manifest.incremental_start("nip", ["transaction"], date(2026, 10, 1))
+    manifest.mark_synced("nip", "transaction", start, date(2026, 10, 15))
+    assert manifest.synced_to("nip", "transaction") == date(2026, 10, 15)
+
+
+def test_item_key_drops_the_session_id():
+    assert item_key_for_url("https://x/report.do;jsessionid=ABC?id=1") == "https://x/report.do?id=1"
+    assert item_key_for_url("https://x/report.do?id=1") == "https://x/report.do?id=1"
@@ -0,0 +1,94 @@
+from src.utils import pagination
+from src.utils.pagination import _PAGE_PARAM, _all_rows_url, _page_url, jump_to_results_page
+import asyncio
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def page_size(monkeypatch):
+    monkeypatch.setattr(pagination, "ISW_PAGE_SIZE", 1000)
+    monkeypatch.setattr(pagination, "ISW_PAGE_SIZE_PARAM", "")
+
+
+@pytest.mark.parametrize("name", ["page", "PageNo", "pagenum", "p", "start", "offset", "first", "d-16544-p"])
+def test_page_param_matches_page_and_offset_names(name):
+    assert _PAGE_PARAM.match(name)
+
+
+@pytest.mark.parametrize("name", ["pageSize", "type", "period", "d-16544-s", "pages"])
+def test_page_param_leaves_other_names_alone(name):
+    assert not _PAGE_PARAM.match(name)
+
+
+def test_all_rows_url_sets_the_size_and_drops_the_page():
+    url = _all_rows_url("https://isw.example/reportSearch.do?type=24&pageSize=20&page=2")
+    assert url == "https://isw.example/reportSearch.do?type=24&pageSize=1000"
+
+
+def test_all_rows_url_drops_offsets_too():
+    url = _all_rows_url("https://isw.example/search?rows=50&start=50&d-16544-p=2&from=2026-10-01")
+    assert url == "https://isw.example/search?from=2026-10-01&rows=1000"
+
+
+def test_all_rows_url_without_a_size_param_is_none():
+    assert _all_rows_url("https://isw.example/reportSearch.do?type=24&page=2") is None
+
+
+def test_all_rows_url_uses_the_forced_param_name(monkeypatch):
+    monkeypatch.setattr(pagination, "ISW_PAGE_SIZE_PARAM", "maxRows")
+    assert _all_rows_url("https://isw.example/reportSearch.do?type=24&page=2") == "https://isw.example/reportSearch.do?type=24&maxRows=1000"
+
+
+def test_page_url_rewrites_the_page_number():
+    assert _page_url("https://isw.example/search?type=24&d-16544-p=2", 7) == "https://isw.example/search?type=24&d-16544-p=7"
+
+
+def test_page_url_needs_a_page_number():
+    assert _page_url("https://isw.example/search?type=24&start=20", 7) is None
+    assert _page_url("https://isw.example/search?token=abc", 7) is None
+
+
+class FakeLink:
+    def __init__(self, frame):
+        self.frame = frame
+
+    @property
+    def first(self):
+        return self
+
+    async def count(self) -> int:
+        return 1 if self.frame.next_href else 0
+
+    async def get_attribute(self, name: str):
+        return self.frame.next_href
+
+    async def click(self):
+        self.frame.clicks += 1
+
+
+class FakeFrame:
+    def __init__(self, url: str, next_href: str):
+        self.url, self.next_href, self.clicks, self.loaded = url, next_href, 0, None
+
+    def locator(self, selector: str):
+        return FakeLink(self)
+
+    async def goto(self, url: str):
+        self.loaded = url
+
+
+class FakeWaits:
+    async def frame_load(self, page, frame_name, action, name=None):
+        await action()
+
+
+def test_jump_to_results_page_loads_the_page_directly():
+    frame = FakeFrame("https://isw.example/reportSearch.do", "reportSearch.do?type=24&page=2")
+    reached = asyncio.run(jump_to_results_page(None, frame, FakeWaits(), "body", 5))
+    assert reached == 5 and frame.loaded == "https://isw.example/reportSearch.do?type=24&page=5" and frame.clicks == 0
+
+
+def test_jump_to_results_page_clicks_without_a_page_number():
+    frame = FakeFrame("https://isw.example/reportSearch.do", "reportSearch.do?type=24&start=20")
+    reached = asyncio.run(jump_to_results_page(None, frame, FakeWaits(), "body", 4))
+    assert reached == 4 and frame.loaded is None and frame.clicks == 3
@@ -0,0 +1,132 @@
+from datetime import date, datetime
+from src.utils import scheduler as scheduler_module
+from src.utils.manifest import Manifest
+from src.utils.scheduler import Cron, Schedule, Scheduler, load_schedules
+import asyncio
+import pytest
+
+
+def test_cron_weekdays_skip_to_monday():
+    # 2026-10-17 is a Saturday
+    assert Cron("15 6 * * 1-5").next_after(datetime(2026, 10, 17, 7, 0)) == datetime(2026, 10, 19, 6, 15)
+
+
+def test_cron_steps_and_day_of_month():
+    assert Cron("*/20 * 1 * *").next_after(datetime(2026, 10, 17, 7, 0)) == datetime(2026, 11, 1, 0, 0)
+    assert Cron("*/20 * * * *").next_after(datetime(2026, 10, 17, 7, 0)) == datetime(2026, 10, 17, 7, 20)
+
+
+def test_cron_leap_day_and_sunday_as_seven():
+    assert Cron("0 0 29 2 *").next_after(datetime(2026, 3, 1)) == datetime(2028, 2, 29)
+    assert Cron("0 12 * * 7").next_after(datetime(2026, 10, 17)) == datetime(2026, 10, 18, 12, 0)
+
+
+def test_cron_day_of_month_or_weekday_when_both_restricted():
+    # cron fires on the 1st of the month or on a Monday
+    assert Cron("0 0 1 * 1").next_after(datetime(2026, 10, 17)) == datetime(2026, 10, 19)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* 24 * * *", "* * 0 * *", "5-1 * * * *"])
+def test_cron_rejects_bad_expressions(expression):
+    with pytest.raises(ValueError):
+        Cron(expression)
+
+
+def test_load_schedules_keeps_extra_keys_as_options():
+    [schedule] = load_schedules('[{"portal": "isw", "cron": "15 6 * * *", "report_types": [24], "download_mode": "http"}]')
+    assert schedule.name == "isw:15 6 * * *"
+    assert schedule.report_types == ["24"]
+    assert schedule.options == {"download_mode": "http"}
+
+
+@pytest.fixture
+def manifest(tmp_path, monkeypatch):
+    fresh = Manifest(tmp_path / "manifest.sqlite3")
+    monkeypatch.setattr(scheduler_module, "manifest", fresh)
+    return fresh
+
+
+def _scheduler(schedule: Schedule, keys=("transaction",)) -> Scheduler:
+    return Scheduler([schedule], lambda s: list(keys), submit=None, is_active=lambda job_id: False)
+
+
+def test_window_without_sync_is_the_last_catchup_days(manifest):
+    schedule = Schedule(name="nip", portal="nip", cron=Cron("0 7 * * *"), max_catchup_days=30)
+    assert _scheduler(schedule).window(schedule, date(2026, 10, 17)) == (date(2026, 9, 17), date(2026, 10, 16))
+
+
+def test_window_is_none_when_covered(manifest):
+    schedule = Schedule(name="nip", portal="nip", cron=Cron("0 7 * * *"))
+    manifest.mark_synced("nip", "transaction", date(2026, 10, 1), date(2026, 10, 16))
+    assert _scheduler(schedule).window(schedule, date(2026, 10, 17)) is None
+
+
+def test_catchup_windows_adjoin_until_coverage_reaches_the_target(manifest):
+    # far behind: every window must extend coverage, not pull the same last 30 days again
+    schedule = Schedule(name="nip", portal="nip", cron=Cron("0 7 * * *"), max_catchup_days=30)
+    manifest.mark_synced("nip", "transaction", date(2026, 7, 1), date(2026, 8, 1))
+    scheduler = _scheduler(schedule)
+    windows = []
+    while (window := scheduler.window(schedule, date(2026, 10, 17))) is not None:
+        windows.append(window)
+        manifest.mark_synced("nip", "transaction", *window)
+        assert len(windows) < 10
+    assert windows == [(date(2026, 8, 1), date(2026, 8, 30)), (date(2026, 8, 30), date(2026, 9, 28)),
+                       (date(2026, 9, 28), date(2026, 10, 16))]
+    assert manifest.synced_to("nip", "transaction") == date(2026, 10, 16)
+
+
+def test_window_starts_at_the_least_synced_report_type(manifest):
+    schedule = Schedule(name="isw", portal="isw", cron=Cron("0 7 * * *"), max_catchup_days=30)
+    manifest.mark_synced("isw", "24", date(2026, 10, 1), date(2026, 10, 10))
+    manifest.mark_synced("isw", "1", date(2026, 10, 1), date(2026, 10, 16))
+    assert _scheduler(schedule, ("24", "1")).window(schedule, date(2026, 10, 17)) == (date(2026, 10, 10), date(2026, 10, 16))
+
+
+def test_fire_submits_window_and_follows_up_while_catching_up(manifest):
+    schedule = Schedule(name="nip", portal="nip", cron=Cron("0 7 * * *"), max_catchup_days=10)
+    manifest.mark_synced("nip", "transaction", date(2000, 1, 1), date.today().replace(day=1).replace(year=date.today().year - 1))
+    submitted = []
+    scheduler = Scheduler([schedule], lambda s: ["transaction"], lambda s, start, end: submitted.append((start, end)) or "job-1",
+                          is_active=lambda job_id: False)
+    scheduler.fire(schedule)
+    assert len(submitted) == 1 and schedule.last_job_id == "job-1" and schedule.catching_up
+
+    # the job did not sync: the same window again goes back to the cron instead of looping
+    scheduler.fire(schedule)
+    assert len(submitted) == 1 and not schedule.catching_up
+
+
+def test_fire_skips_while_previous_job_is_active(manifest):
+    schedule = Schedule(name="nip", portal="nip", cron=Cron("0 7 * * *"), last_job_id="job-0")
+    submitted = []
+    scheduler = Scheduler([schedule], lambda s: ["transaction"], lambda s, start, end: submitted.append((start, end)),
+                          is_active=lambda job_id: True)
+    scheduler.fire(schedule)
+    assert submitted == []
+
+
+def test_a_broken_schedule_does_not_stop_the_others(manifest):
+    good = Schedule(name="nip", portal="nip", cron=Cron("0 7 * * *"))
+    bad = Schedule(name="isw", portal="isw", cron=Cron("0 7 * * *"), report_types=["nope"])
+
+    def sync_keys(schedule):
+        if schedule.report_types == ["nope"]:
+            raise ValueError("report_types must list ISW report codes or names")
+        return ["transaction"]
+
+    submitted = []
+    scheduler = Scheduler([good, bad], sync_keys, lambda s, start, end: submitted.append(s.name) or "job-1",
+                          is_active=lambda job_id: False)
+    rows = {row["name"]: row for row in scheduler.status()}
+    assert rows["isw"]["error"] and rows["nip"]["error"] is None and rows["nip"]["pending_window"]
+
+    async def first_pass():
+        scheduler.start()
+        await asyncio.sleep(0.05)
+        task = scheduler._task
+        await scheduler.stop()
+        return task
+
+    task = asyncio.run(first_pass())
+    assert task.cancelled() and good.next_run is not None and bad.next_run is not None
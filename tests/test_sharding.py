@@ -0,0 +1,94 @@
+from datetime import date
+from src.enums import ShardUnit
+from src.utils.sharding import merge_report_types, run_shards, split_range
+import asyncio
+
+
+def test_split_range_by_day_and_week():
+    assert split_range(date(2026, 10, 1), date(2026, 10, 3), ShardUnit.day) == [
+        (date(2026, 10, 1), date(2026, 10, 1)), (date(2026, 10, 2), date(2026, 10, 2)), (date(2026, 10, 3), date(2026, 10, 3))]
+    assert split_range(date(2026, 10, 1), date(2026, 10, 16), ShardUnit.week) == [
+        (date(2026, 10, 1), date(2026, 10, 7)), (date(2026, 10, 8), date(2026, 10, 14)), (date(2026, 10, 15), date(2026, 10, 16))]
+    assert split_range(date(2026, 10, 2), date(2026, 10, 1), ShardUnit.day) == []
+
+
+def _run(results: dict, parallelism: int = 2) -> dict:
+    """run_shards over one day per entry of `results`; a value that is an exception is raised by that shard."""
+    shards = [(date(2026, 10, day), date(2026, 10, day)) for day in sorted(results)]
+
+    async def run_shard(start: date, end: date) -> dict:
+        result = results[start.day]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return asyncio.run(run_shards(shards, run_shard, parallelism))
+
+
+def test_all_shards_succeed():
+    merged = _run({1: {"status": "success", "files_downloaded": 2, "messages": ["ok"]},
+                   2: {"status": "warning", "files_downloaded": 0, "files_skipped": 3}})
+    assert merged["status"] == "success" and merged["files_downloaded"] == 2 and merged["files_skipped"] == 3
+    assert merged["shards_failed"] == 0 and list(merged["messages"]) == ["[2026-10-01..2026-10-01] ok"]
+    assert "report_types" not in merged
+
+
+def test_nothing_downloaded_is_a_warning():
+    assert _run({1: {"status": "warning"}, 2: {"status": "no report available"}})["status"] == "warning"
+
+
+def test_one_failed_shard_makes_the_run_partial_and_keeps_its_error():
+    merged = _run({1: {"status": "success", "files_downloaded": 1},
+                   2: {"status": "failed", "error": "login rejected"},
+                   3: RuntimeError("browser crashed")})
+    assert merged["status"] == "partial" and merged["shards_failed"] == 2
+    assert [s["error"] for s in merged["shards"]] == [None, "login rejected", "browser crashed"]
+
+
+def test_failed_shard_without_error_text_still_counts_as_failed():
+    merged = _run({1: {"status": "failed"}, 2: {}})
+    assert merged["status"] == "failed" and merged["shards_failed"] == 2
+    assert {s["error"] for s in merged["shards"]} == {"run ended with an error"}
+
+
+def test_partial_shard_makes_the_run_partial():
+    assert _run({1: {"status": "success", "files_downloaded": 1}, 2: {"status": "partial", "files_failed": 1}})["status"] == "partial"
+
+
+def test_parallelism_caps_running_shards():
+    running, peak = 0, 0
+
+    async def run_shard(start: date, end: date) -> dict:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"status": "success", "files_downloaded": 1}
+
+    shards = [(date(2026, 10, day), date(2026, 10, day)) for day in range(1, 7)]
+    merged = asyncio.run(run_shards(shards, run_shard, parallelism=2))
+    assert peak == 2 and merged["files_downloaded"] == 6
+
+
+def test_merge_report_types_adds_counts_and_keeps_the_worst_status():
+    merged = merge_report_types([
+        {"report_types": [{"report_code": "24", "status": "success", "files_downloaded": 2},
+                          {"report_code": "1", "status": "no report available"}]},
+        {"report_types": [{"report_code": "24", "status": "failed", "files_failed": 1},
+                          {"report_code": "1", "status": "success", "files_downloaded": 1, "files_skipped": 4}]},
+        {},
+    ])
+    assert merged == [
+        {"report_code": "24", "files_downloaded": 2, "files_skipped": 0, "files_failed": 1, "status": "failed"},
+        {"report_code": "1", "files_downloaded": 1, "files_skipped": 4, "files_failed": 0, "status": "success"},
+    ]
+
+
+def test_run_shards_merges_isw_report_types():
+    merged = _run({1: {"status": "success", "files_downloaded": 1,
+                       "report_types": [{"report_code": "24", "status": "success", "files_downloaded": 1}]},
+                   2: RuntimeError("timeout")})
+    assert merged["report_types"] == [
+        {"report_code": "24", "files_downloaded": 1, "files_skipped": 0, "files_failed": 0, "status": "success"}]
+    assert merged["status"] == "partial"
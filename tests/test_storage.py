@@ -0,0 +1,47 @@
+from src.utils.storage import LocalStorage, content_name
+import asyncio
+import hashlib
+
+
+async def _chunks(data: bytes):
+    yield data
+
+
+def _save(storage: LocalStorage, filename: str, data: bytes):
+    return asyncio.run(storage.save_stream(filename, _chunks(data)))
+
+
+def test_original_name_is_kept(tmp_path):
+    stored = _save(LocalStorage(tmp_path), "report.zip", b"one")
+    assert stored.name == "report.zip" and (tmp_path / "report.zip").read_bytes() == b"one"
+    assert stored.sha256 == hashlib.sha256(b"one").hexdigest() and stored.size == 3
+
+
+def test_same_name_other_content_does_not_overwrite(tmp_path):
+    storage = LocalStorage(tmp_path)
+    first = _save(storage, "report.zip", b"one")
+    second = _save(storage, "report.zip", b"two")
+    assert second.name == content_name("report.zip", second.sha256)
+    assert (tmp_path / first.name).read_bytes() == b"one" and (tmp_path / second.name).read_bytes() == b"two"
+
+
+def test_same_name_same_content_is_stored_once(tmp_path):
+    storage = LocalStorage(tmp_path)
+    _save(storage, "report.zip", b"one")
+    again = _save(storage, "report.zip", b"one")
+    assert again.name == "report.zip"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["report.zip"]
+
+
+def test_content_naming_dedupes_identical_files(tmp_path):
+    storage = LocalStorage(tmp_path, naming="content")
+    first = _save(storage, "a.csv", b"rows")
+    second = _save(storage, "a.csv", b"rows")
+    assert first.location == second.location and len(list(tmp_path.iterdir())) == 1
+
+
+def test_save_file_takes_over_the_source(tmp_path):
+    source = tmp_path / "download.tmp"
+    source.write_bytes(b"data")
+    stored = asyncio.run(LocalStorage(tmp_path / "out").save_file("report.zip", source))
+    assert not source.exists() and stored.path.read_bytes() == b"data"